@@ -0,0 +1,244 @@
+import numpy as np
+from datetime import timedelta
+from decimal import Decimal, ROUND_HALF_UP
+from functools import lru_cache
+
+
+CENT = Decimal('0.01')
+DAYS_PER_INSTALLMENT = 30
+
+# Distinct (rate, tenure) pairs kept in the annuity factor cache
+ANNUITY_CACHE_SIZE = 4096
+
+
+def to_money(value):
+    """Round a number to paisa (2 decimal places) using half-up rounding"""
+    return Decimal(str(value)).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def monthly_rate(annual_rate):
+    """Convert an annual percentage rate into a monthly fraction"""
+    return float(annual_rate) / (12 * 100)
+
+
+@lru_cache(maxsize=ANNUITY_CACHE_SIZE)
+def annuity_factor(annual_rate, tenure_months):
+    """
+    EMI per rupee of principal: R x (1+R)^N / [(1+R)^N - 1]
+    Only depends on rate and tenure, so it is cached across quotes
+    """
+    r = monthly_rate(annual_rate)
+    n = int(tenure_months)
+
+    if r == 0:
+        return 1 / n
+
+    growth = (1 + r) ** n
+    return r * growth / (growth - 1)
+
+
+def calculate_emi(principal, annual_rate, tenure_months):
+    """
+    Standard reducing-balance EMI
+    EMI = [P x R x (1+R)^N] / [(1+R)^N - 1]
+    """
+    return to_money(float(principal) * annuity_factor(float(annual_rate), int(tenure_months)))
+
+
+def quote_emi(principal, annual_rate, tenure_months):
+    """EMI with the total payment and interest over the whole tenure"""
+    emi = calculate_emi(principal, annual_rate, tenure_months)
+    principal = to_money(principal)
+    total_payment = emi * int(tenure_months)
+
+    return {
+        'principal': principal,
+        'rate': to_money(annual_rate),
+        'tenure': int(tenure_months),
+        'emi': emi,
+        'total_payment': total_payment,
+        'total_interest': total_payment - principal,
+    }
+
+
+def _round_cents(values):
+    """Half-up rounding of a float array of rupees into integer paisa"""
+    return np.floor(np.asarray(values) * 100 + 0.5).astype(np.int64)
+
+
+def from_cents(cents):
+    """Convert an integer amount of paisa back into a 2-place Decimal"""
+    return Decimal(int(cents)).scaleb(-2)
+
+
+class AmortizationSchedule:
+    """
+    Principal/interest/balance table for a loan, held as integer paisa arrays
+    so every row adds up exactly (principal + interest == emi)
+    """
+
+    def __init__(self, emi_number, emi_amount, principal_amount, interest_amount, remaining_balance):
+        self.emi_number = emi_number
+        self.emi_amount = emi_amount
+        self.principal_amount = principal_amount
+        self.interest_amount = interest_amount
+        self.remaining_balance = remaining_balance
+
+    def __len__(self):
+        return len(self.emi_number)
+
+    @property
+    def total_interest(self):
+        return from_cents(self.interest_amount.sum())
+
+    def due_dates(self, start_date):
+        """Due dates are spaced every 30 days from the start date"""
+        return [start_date + timedelta(days=DAYS_PER_INSTALLMENT * int(n)) for n in self.emi_number]
+
+    def rows(self, start_date):
+        """Yield one dict per installment with Decimal amounts"""
+        for index, due_date in enumerate(self.due_dates(start_date)):
+            yield {
+                'emi_number': int(self.emi_number[index]),
+                'due_date': due_date,
+                'emi_amount': from_cents(self.emi_amount[index]),
+                'principal_amount': from_cents(self.principal_amount[index]),
+                'interest_amount': from_cents(self.interest_amount[index]),
+                'remaining_balance': from_cents(self.remaining_balance[index]),
+            }
+
+
+def amortize(principal, annual_rate, tenure_months, emi=None, first_number=1):
+    """
+    Build the whole amortization table in one vectorized pass.
+
+    Interest for installment k is charged on the closed-form balance
+    B(k-1) = P(1+r)^(k-1) - EMI((1+r)^(k-1) - 1) / r, rounded to paisa.
+    The final installment absorbs the rounding residue so the loan
+    closes at exactly zero.
+    """
+    n = int(tenure_months)
+    r = monthly_rate(annual_rate)
+    emi = to_money(emi) if emi is not None else calculate_emi(principal, annual_rate, n)
+
+    P = float(principal)
+    E = float(emi)
+    k = np.arange(n, dtype=np.float64)
+
+    if r == 0:
+        opening_balance = P - E * k
+    else:
+        growth = np.power(1 + r, k)
+        opening_balance = P * growth - E * (growth - 1) / r
+
+    interest = _round_cents(np.maximum(opening_balance, 0) * r)
+    emi_cents = np.full(n, int(emi.scaleb(2)), dtype=np.int64)
+    principal_cents = emi_cents - interest
+    balance = int(to_money(principal).scaleb(2)) - np.cumsum(principal_cents)
+
+    if n:
+        principal_cents[-1] += balance[-1]
+        emi_cents[-1] = principal_cents[-1] + interest[-1]
+        balance[-1] = 0
+
+    return AmortizationSchedule(
+        emi_number=np.arange(first_number, first_number + n),
+        emi_amount=emi_cents,
+        principal_amount=principal_cents,
+        interest_amount=interest,
+        remaining_balance=balance,
+    )
+
+
+PREPAYMENT_STRATEGIES = ('reduce_emi', 'reduce_tenure')
+
+
+def _balances(principal, r, emi, k):
+    """Closed-form outstanding balance after k installments (k may be an array)"""
+    if r == 0:
+        return principal - emi * k
+    growth = np.power(1 + r, k)
+    return principal * growth - emi * (growth - 1) / r
+
+
+def simulate_prepayments(principal, annual_rate, tenure_months, emi, months, amounts, strategy):
+    """
+    Evaluate many prepayment scenarios for one loan in a single vectorized pass.
+
+    A scenario prepays `amount` right after installment `month` has been paid.
+    Only the part of the schedule from that installment onward is recomputed:
+    the balance at `month` comes from the closed form and the remainder is
+    re-amortized either with a lower EMI over the same tenure ('reduce_emi')
+    or with the same EMI over fewer months ('reduce_tenure'). A prepayment
+    that covers the outstanding balance forecloses the loan.
+    """
+    if strategy not in PREPAYMENT_STRATEGIES:
+        raise ValueError(f"Unknown prepayment strategy: {strategy}")
+
+    P = float(principal)
+    r = monthly_rate(annual_rate)
+    n = int(tenure_months)
+    E = float(emi)
+    k = np.asarray(months, dtype=np.float64)
+    amounts = np.asarray(amounts, dtype=np.float64)
+    left = n - k
+
+    outstanding = _balances(P, r, E, k)
+    # Interest still due without prepayment: remaining payments less principal repaid
+    original_interest = E * left - (outstanding - _balances(P, r, E, float(n)))
+
+    balance = np.maximum(outstanding - amounts, 0)
+    foreclosed = balance <= 0.005
+
+    if strategy == 'reduce_emi':
+        factors = np.array([annuity_factor(float(annual_rate), int(m)) for m in left])
+        new_emi = np.floor(balance * factors * 100 + 0.5) / 100
+        new_tenure = left
+        closing = _balances(balance, r, new_emi, left)
+        new_interest = new_emi * left - (balance - closing)
+    else:
+        new_emi = np.full_like(balance, E)
+        if r == 0:
+            new_tenure = np.ceil(balance / E)
+        else:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                new_tenure = np.ceil(np.round(-np.log1p(-balance * r / E) / np.log1p(r), 9))
+        new_tenure = np.maximum(new_tenure, 1)
+        # Every installment but the last is a full EMI; the last clears the balance
+        before_last = _balances(balance, r, E, new_tenure - 1)
+        new_interest = E * (new_tenure - 1) + before_last * (1 + r) - balance
+
+    new_emi = np.where(foreclosed, 0, new_emi)
+    new_tenure = np.where(foreclosed, 0, new_tenure)
+    new_interest = np.where(foreclosed, 0, new_interest)
+
+    return [
+        {
+            'month': int(k[i]),
+            'amount': to_money(amounts[i]),
+            'strategy': strategy,
+            'outstanding_before': to_money(outstanding[i]),
+            'outstanding_after': to_money(balance[i]),
+            'foreclosed': bool(foreclosed[i]),
+            'new_emi': to_money(new_emi[i]),
+            'remaining_tenure': int(new_tenure[i]),
+            'months_saved': int(left[i] - new_tenure[i]),
+            'interest_saved': to_money(original_interest[i] - new_interest[i]),
+        }
+        for i in range(len(k))
+    ]
+
+
+def simulate_prepayment(principal, annual_rate, tenure_months, emi, month, amount, strategy):
+    """Single prepayment scenario plus the recomputed schedule from installment month+1"""
+    result = simulate_prepayments(principal, annual_rate, tenure_months, emi, [month], [amount], strategy)[0]
+    if result['foreclosed']:
+        result['schedule'] = []
+        return result
+
+    schedule = amortize(
+        result['outstanding_after'], annual_rate, result['remaining_tenure'],
+        emi=result['new_emi'], first_number=month + 1,
+    )
+    result['schedule'] = schedule
+    return result
@@ -4,6 +4,25 @@ from decimal import Decimal
 from datetime import datetime
 import random
 
+from .model_registry import active_credit_model
+from .rule_tables import RuleSet, active_rules
+
+
+# (DataFrame column, queryset lookup) pairs loaded by CreditScorer.load_features
+BATCH_FEATURE_COLUMNS = [
+    ('id', 'id'),
+    ('loan_amount', 'loan_amount'),
+    ('down_payment', 'down_payment'),
+    ('monthly_income', 'monthly_income'),
+    ('interest_rate', 'interest_rate'),
+    ('tenure_months', 'tenure_months'),
+    ('vehicle_price', 'vehicle__price'),
+    ('employment_type', 'employment_type'),
+    ('date_of_birth', 'customer__date_of_birth'),
+    ('monthly_emi', 'monthly_emi'),
+]
+BATCH_FEATURE_FIELDS = [lookup for _, lookup in BATCH_FEATURE_COLUMNS]
+
 
 class CreditScorer:
     """
@@ -11,15 +30,16 @@ class CreditScorer:
     Evaluates loan applications and detects fraud risk
     """
     
-    def __init__(self):
-        self.weights = {
-            'income_to_loan_ratio': 0.25,
-            'down_payment_percentage': 0.20,
-            'employment_stability': 0.15,
-            'age_factor': 0.15,
-            'loan_to_value_ratio': 0.15,
-            'tenure_appropriateness': 0.10,
-        }
+    def __init__(self, model=None, use_model=True, rules=None):
+        # Thresholds and weights come from a versioned rule table (ai_engine/rules/)
+        self.rules = RuleSet.load(rules) if isinstance(rules, str) else (rules or active_rules())
+        # Trained model scores when available; the rules remain the fallback
+        self.model = (model or active_credit_model()) if use_model else None
+        self.version = self.rules.version + (f'+model-{self.model.version}' if self.model else '')
+        self.weights = dict(self.rules.weights)
+        # Compiled single-value lookups, bound once to keep per-call overhead low
+        self.bands = {name: band.score for name, band in self.rules.bands.items()}
+        self.employment = self.rules.employment
     
     def score_application(self, loan_application):
         """
@@ -29,34 +49,158 @@ class CreditScorer:
         try:
             # Extract features
             features = self.extract_features(loan_application)
-            
-            # Calculate individual scores
-            scores = {}
-            scores['income_score'] = self.calculate_income_score(features)
-            scores['down_payment_score'] = self.calculate_down_payment_score(features)
-            scores['employment_score'] = self.calculate_employment_score(features)
-            scores['age_score'] = self.calculate_age_score(features)
-            scores['ltv_score'] = self.calculate_ltv_score(features)
-            scores['tenure_score'] = self.calculate_tenure_score(features)
-            
-            # Calculate weighted credit score (0-1000)
-            credit_score = self.calculate_weighted_score(scores)
-            
-            # Detect fraud risk
-            fraud_risk = self.detect_fraud_risk(features, scores)
-            
-            # Determine risk level
-            risk_level = self.determine_risk_level(credit_score, fraud_risk)
-            
-            # Generate recommendation
-            recommendation = self.generate_recommendation(credit_score, risk_level, scores)
-            
-            return int(credit_score), risk_level, recommendation
+            return self.score_extracted(features)
             
         except Exception as e:
             print(f"Error in credit scoring: {str(e)}")
             return 500, "medium", "Manual review required due to scoring error"
     
+    def score_extracted(self, features):
+        """Score a feature dict produced by extract_features"""
+        # Calculate individual scores
+        scores = {}
+        scores['income_score'] = self.calculate_income_score(features)
+        scores['down_payment_score'] = self.calculate_down_payment_score(features)
+        scores['employment_score'] = self.calculate_employment_score(features)
+        scores['age_score'] = self.calculate_age_score(features)
+        scores['ltv_score'] = self.calculate_ltv_score(features)
+        scores['tenure_score'] = self.calculate_tenure_score(features)
+        
+        # Calculate weighted credit score (0-1000)
+        credit_score = self.calculate_weighted_score(scores)
+        if self.model is not None:
+            try:
+                credit_score = self.model.score(features, scores)
+            except Exception as e:
+                print(f"Error in model scoring, using rules: {str(e)}")
+        
+        # Detect fraud risk
+        fraud_risk = self.detect_fraud_risk(features, scores)
+        
+        # Determine risk level
+        risk_level = self.determine_risk_level(credit_score, fraud_risk)
+        
+        # Generate recommendation
+        recommendation = self.generate_recommendation(credit_score, risk_level, scores)
+        
+        return int(credit_score), risk_level, recommendation
+    
+    def score_batch(self, queryset):
+        """
+        Score many applications at once.
+        Returns a DataFrame indexed by application id with the same
+        credit_score, risk_level and recommendation as score_application.
+        """
+        return self.score_features(self.load_features(queryset))
+    
+    def load_features(self, queryset):
+        """
+        Load the features of many applications into one DataFrame with a
+        single query joining vehicle and customer
+        """
+        frame = self.load_source_features(queryset)
+        frame['customer_age'] = self.calculate_ages(frame.pop('date_of_birth'))
+        return frame
+    
+    @classmethod
+    def load_source_features(cls, queryset):
+        """load_features with the customer's date of birth in place of the age"""
+        rows = list(queryset.values_list(*BATCH_FEATURE_FIELDS))
+        frame = pd.DataFrame.from_records(rows, columns=[name for name, _ in BATCH_FEATURE_COLUMNS])
+        frame = frame.set_index('id')
+        
+        for column in ['loan_amount', 'down_payment', 'monthly_income', 'interest_rate', 'vehicle_price']:
+            frame[column] = frame[column].map(float).astype(np.float64)
+        frame['tenure_months'] = frame['tenure_months'].astype(np.int64)
+        frame['monthly_emi'] = frame['monthly_emi'].map(lambda emi: float(emi) if emi else 0).astype(np.float64)
+        
+        return cls.add_derived_features(frame)
+    
+    @staticmethod
+    def calculate_ages(dates_of_birth):
+        """Vectorized calculate_age over a Series of dates (None -> default age)"""
+        today = datetime.now().date()
+        known = dates_of_birth.notna().to_numpy()
+        dates = pd.to_datetime(dates_of_birth.where(dates_of_birth.notna(), None))
+        
+        years = dates.dt.year.fillna(0).to_numpy(dtype=np.int64)
+        months = dates.dt.month.fillna(0).to_numpy(dtype=np.int64)
+        days = dates.dt.day.fillna(0).to_numpy(dtype=np.int64)
+        
+        birthday_pending = (today.month < months) | ((today.month == months) & (today.day < days))
+        ages = today.year - years - birthday_pending.astype(np.int64)
+        return np.where(known, ages, 30)
+    
+    @staticmethod
+    def add_derived_features(frame):
+        """Vectorized version of the ratios computed in extract_features"""
+        def ratio(numerator, denominator, positive):
+            numerator = frame[numerator].to_numpy(dtype=np.float64)
+            denominator = frame[denominator].to_numpy(dtype=np.float64)
+            result = np.zeros(len(frame))
+            np.divide(numerator, denominator, out=result, where=frame[positive].to_numpy() > 0)
+            return result
+        
+        frame['income_to_loan_ratio'] = ratio('monthly_income', 'loan_amount', 'loan_amount')
+        frame['down_payment_percentage'] = ratio('down_payment', 'vehicle_price', 'vehicle_price') * 100
+        frame['emi_to_income_ratio'] = ratio('monthly_emi', 'monthly_income', 'monthly_income') * 100
+        frame['loan_to_value_ratio'] = ratio('loan_amount', 'vehicle_price', 'vehicle_price') * 100
+        return frame
+    
+    def score_features(self, frame):
+        """Evaluate every sub-score, fraud rule and risk level over a feature DataFrame"""
+        f = {column: frame[column].to_numpy() for column in frame.columns}
+        
+        tables = self.rules.bands
+        scores = {
+            'income_score': (
+                tables['income_ratio'].lookup(f['income_to_loan_ratio'])
+                + tables['emi_affordability'].lookup(f['emi_to_income_ratio'])
+            ) / 2,
+            'down_payment_score': tables['down_payment'].lookup(f['down_payment_percentage']),
+            'employment_score': self.employment.lookup(frame['employment_type']),
+            'age_score': tables['age'].lookup(f['customer_age']),
+            'ltv_score': tables['ltv'].lookup(f['loan_to_value_ratio']),
+        }
+        
+        ideal_max = tables['tenure_ideal_max'].lookup(f['loan_amount'])
+        scores['tenure_score'] = tables['tenure_excess'].lookup(f['tenure_months'] - ideal_max)
+        scores = {name: np.asarray(values, dtype=np.float64) for name, values in scores.items()}
+        
+        credit_score = self.calculate_weighted_score(scores)
+        if self.model is not None:
+            try:
+                features = frame.assign(employment_score=scores['employment_score'])
+                credit_score = self.model.predict_proba(features[self.model.features].to_numpy(dtype=np.float64)) * 1000
+            except Exception as e:
+                print(f"Error in model scoring, using rules: {str(e)}")
+        
+        fraud_risk = np.minimum(100, (
+            np.where(f['income_to_loan_ratio'] > 0.5, 20, 0)
+            + np.where((f['down_payment_percentage'] < 5) & (f['loan_amount'] > 1000000), 25, 0)
+            + np.where(f['emi_to_income_ratio'] > 70, 15, 0)
+            + np.where((f['customer_age'] < 18) | (f['customer_age'] > 75), 30, 0)
+            + np.where((f['tenure_months'] < 6) | (f['tenure_months'] > 120), 10, 0)
+        ))
+        
+        risk_level = np.select(
+            [fraud_risk > 60,
+             (credit_score >= 750) & (fraud_risk < 30),
+             (credit_score >= 600) & (fraud_risk < 50),
+             credit_score >= 450],
+            ['high', 'low', 'medium', 'medium-high'], 'high',
+        )
+        
+        result = pd.DataFrame(scores, index=frame.index)
+        result['fraud_risk'] = fraud_risk
+        result['credit_score'] = credit_score.astype(np.int64)
+        result['risk_level'] = risk_level
+        result['recommendation'] = [
+            self.generate_recommendation(score, level, row)
+            for score, level, row in zip(credit_score, risk_level, result[list(scores)].to_dict('records'))
+        ]
+        return result
+    
     def extract_features(self, loan):
         """Extract relevant features from loan application"""
         features = {
@@ -81,11 +225,16 @@ class CreditScorer:
     
     def calculate_age(self, customer):
         """Calculate customer age"""
-        if customer.date_of_birth:
+        return self.age_on(customer.date_of_birth)
+    
+    @staticmethod
+    def age_on(date_of_birth):
+        """Age in whole years today for a date of birth (None -> default age)"""
+        if date_of_birth:
             today = datetime.now().date()
-            age = today.year - customer.date_of_birth.year
-            if today.month < customer.date_of_birth.month or (
-                today.month == customer.date_of_birth.month and today.day < customer.date_of_birth.day
+            age = today.year - date_of_birth.year
+            if today.month < date_of_birth.month or (
+                today.month == date_of_birth.month and today.day < date_of_birth.day
             ):
                 age -= 1
             return age
@@ -96,33 +245,10 @@ class CreditScorer:
         Score based on income to loan ratio and EMI affordability
         Higher income relative to loan = better score
         """
-        income_ratio = features['income_to_loan_ratio']
-        emi_ratio = features['emi_to_income_ratio']
-        
-        # Income ratio scoring (0-500)
-        if income_ratio >= 0.15:
-            ratio_score = 500
-        elif income_ratio >= 0.10:
-            ratio_score = 400
-        elif income_ratio >= 0.07:
-            ratio_score = 300
-        elif income_ratio >= 0.05:
-            ratio_score = 200
-        else:
-            ratio_score = 100
-        
-        # EMI affordability scoring (0-500)
-        # Ideal EMI should be less than 40% of monthly income
-        if emi_ratio <= 30:
-            emi_score = 500
-        elif emi_ratio <= 40:
-            emi_score = 400
-        elif emi_ratio <= 50:
-            emi_score = 300
-        elif emi_ratio <= 60:
-            emi_score = 200
-        else:
-            emi_score = 100
+        # Income ratio (0-500) and EMI affordability (0-500);
+        # ideal EMI should be less than 40% of monthly income
+        ratio_score = self.bands['income_ratio'](features['income_to_loan_ratio'])
+        emi_score = self.bands['emi_affordability'](features['emi_to_income_ratio'])
         
         return (ratio_score + emi_score) / 2
     
@@ -131,102 +257,36 @@ class CreditScorer:
         Score based on down payment percentage
         Higher down payment = lower risk = better score
         """
-        dp_percentage = features['down_payment_percentage']
-        
-        if dp_percentage >= 40:
-            return 500
-        elif dp_percentage >= 30:
-            return 450
-        elif dp_percentage >= 20:
-            return 400
-        elif dp_percentage >= 15:
-            return 350
-        elif dp_percentage >= 10:
-            return 300
-        else:
-            return 200
+        return self.bands['down_payment'](features['down_payment_percentage'])
     
     def calculate_employment_score(self, features):
         """
         Score based on employment type
         More stable employment = better score
         """
-        employment_type = features['employment_type'].lower()
-        
-        employment_scores = {
-            'government': 500,
-            'private_company': 450,
-            'business_owner': 400,
-            'self_employed': 350,
-            'freelancer': 300,
-            'other': 250,
-        }
-        
-        for emp_type, score in employment_scores.items():
-            if emp_type in employment_type:
-                return score
-        
-        return 300  # Default score
+        return self.employment(features['employment_type'])
     
     def calculate_age_score(self, features):
         """
         Score based on customer age
         Ideal age range: 25-50 years
         """
-        age = features['customer_age']
-        
-        if 25 <= age <= 45:
-            return 500
-        elif 22 <= age <= 55:
-            return 450
-        elif 20 <= age <= 60:
-            return 400
-        elif age > 60:
-            return 300
-        else:
-            return 350
+        return self.bands['age'](features['customer_age'])
     
     def calculate_ltv_score(self, features):
         """
         Score based on Loan-to-Value ratio
         Lower LTV = less risk = better score
         """
-        ltv = features['loan_to_value_ratio']
-        
-        if ltv <= 50:
-            return 500
-        elif ltv <= 60:
-            return 450
-        elif ltv <= 70:
-            return 400
-        elif ltv <= 80:
-            return 350
-        else:
-            return 250
+        return self.bands['ltv'](features['loan_to_value_ratio'])
     
     def calculate_tenure_score(self, features):
         """
         Score based on loan tenure appropriateness
         """
-        tenure_months = features['tenure_months']
-        loan_amount = features['loan_amount']
-        
-        # Ideal tenure based on loan amount
-        if loan_amount < 500000:  # Less than 5 lakhs
-            ideal_max = 36  # 3 years
-        elif loan_amount < 1000000:  # Less than 10 lakhs
-            ideal_max = 60  # 5 years
-        else:
-            ideal_max = 84  # 7 years
-        
-        if tenure_months <= ideal_max:
-            return 500
-        elif tenure_months <= ideal_max + 12:
-            return 400
-        elif tenure_months <= ideal_max + 24:
-            return 300
-        else:
-            return 200
+        # Ideal tenure grows with the loan amount (3, 5 or 7 years)
+        ideal_max = self.bands['tenure_ideal_max'](features['loan_amount'])
+        return self.bands['tenure_excess'](features['tenure_months'] - ideal_max)
     
     def calculate_weighted_score(self, scores):
         """
@@ -242,6 +302,8 @@ class CreditScorer:
         )
         
         # Normalize to 0-1000 scale
+        if isinstance(weighted_score, np.ndarray):
+            return np.minimum(1000, np.maximum(0, weighted_score * 2))
         final_score = min(1000, max(0, weighted_score * 2))
         
         return final_score
@@ -1,74 +1,135 @@
-from datetime import datetime, timedelta
+from collections import defaultdict
+
+from django.db.models import Count
+
+
 class FraudDetector:
     """
     Advanced fraud detection system
     Uses rule-based approach and pattern matching
     """
     
+    # (event, identity, window, limit, flag): flagged when the count of the
+    # event in the window exceeds the limit (see api/velocity.py)
+    VELOCITY_RULES = [
+        ('application', 'customer', '30d', 3, "Multiple loan applications in short period"),
+        ('application', 'phone', '24h', 2, "Multiple applications from the same phone number within a day"),
+        ('application', 'citizenship', '30d', 3, "Multiple applications with the same citizenship number within a month"),
+        ('application', 'ip', '1h', 5, "Many applications from the same IP address within an hour"),
+        ('login_failed', 'username', '24h', 5, "Repeated failed logins to the customer account"),
+        ('document', 'customer', '1h', 10, "Unusually many document uploads within an hour"),
+    ]
+    # Linked accounts (see api/identity_links.py) above which an application is flagged
+    LINKED_ACCOUNTS_LIMIT = 2
+    LINKED_EXPOSURE_LIMIT = 10000000
+    ALLOWED_MIME_TYPES = {'application/pdf', 'image/jpeg', 'image/png'}
+    
     def __init__(self):
         self.fraud_indicators = []
     
     def check_document_authenticity(self, documents):
         """
-        Check uploaded documents for potential fraud
+        Check uploaded documents for potential fraud, from the size and
+        sniffed type recorded at upload
         """
         fraud_flags = []
         
         for doc in documents:
+            if not doc.mime_type:
+                # Uploaded before metadata was recorded and not yet backfilled
+                from api.document_metadata import METADATA_FIELDS, capture_metadata
+                with doc.file.open('rb'):
+                    capture_metadata(doc)
+                doc.save(update_fields=METADATA_FIELDS)
+            
             # Check file size (too small might be fake)
-            if doc.file.size < 10000:  # Less than 10KB
+            if doc.file_size < 10000:  # Less than 10KB
                 fraud_flags.append(f"Document {doc.get_document_type_display()} file size is suspiciously small")
             
-            # Check file extension
-            allowed_extensions = ['.pdf', '.jpg', '.jpeg', '.png']
-            file_ext = doc.file.name.lower()[-4:]
-            if not any(ext in file_ext for ext in allowed_extensions):
+            # Check the format the content actually has, whatever the name says
+            if doc.mime_type not in self.ALLOWED_MIME_TYPES:
                 fraud_flags.append(f"Document {doc.get_document_type_display()} has unusual file format")
+            
+            # Same file or scan as one another customer submitted
+            if doc.duplicate_of_id:
+                fraud_flags.append(f"Document {doc.get_document_type_display()} was already submitted by another customer")
         
         return fraud_flags
     
-    def check_application_patterns(self, customer):
-        """
-        Check for suspicious application patterns
-        """
+    def count_rejected_applications(self, customer_ids):
+        """Rejected application counts of many customers with one query: {customer_id: rejected}"""
         from api.models import LoanApplication
         
+        rows = (
+            LoanApplication.objects
+            .filter(customer_id__in=list(customer_ids), status='rejected')
+            .values('customer_id')
+            .annotate(rejected=Count('id'))
+            .values_list('customer_id', 'rejected')
+        )
+        return dict(rows)
+    
+    def application_identities(self, applications):
+        """
+        Identities velocity is counted against and the customer's identity
+        cluster, for every application in a queryset:
+        {application_id: (customer_id, identities, (linked accounts, exposure))}
+        """
+        rows = applications.values_list(
+            'id', 'customer_id', 'customer__username', 'customer__phone', 'customer__citizenship_number', 'submitted_ip',
+            'customer__identity_cluster__size', 'customer__identity_cluster__exposure',
+        )
+        return {
+            app_id: (customer_id, {
+                'customer': customer_id, 'username': username, 'phone': phone,
+                'citizenship': citizenship_number, 'ip': ip,
+            }, (cluster_size or 1, cluster_exposure or 0))
+            for app_id, customer_id, username, phone, citizenship_number, ip, cluster_size, cluster_exposure in rows
+        }
+    
+    def velocity_queries(self, identities):
+        return [
+            (event, dimension, identities.get(dimension), window)
+            for event, dimension, window, limit, message in self.VELOCITY_RULES
+        ]
+    
+    def pattern_flags(self, identities, velocity, rejected_apps, cluster=(1, 0)):
         fraud_flags = []
+        cluster_size, cluster_exposure = cluster
         
-        # Check for multiple recent applications
-        recent_apps = LoanApplication.objects.filter(
-            customer=customer,
-            created_at__gte=datetime.now() - timedelta(days=30)
-        ).count()
-        
-        if recent_apps > 3:
-            fraud_flags.append("Multiple loan applications in short period")
+        # Check event velocity per customer, phone, citizenship number and IP
+        for event, dimension, window, limit, message in self.VELOCITY_RULES:
+            if velocity.get((event, dimension, identities.get(dimension), window), 0) > limit:
+                fraud_flags.append(message)
         
         # Check for rejected applications
-        rejected_apps = LoanApplication.objects.filter(
-            customer=customer,
-            status='rejected'
-        ).count()
-        
         if rejected_apps >= 2:
             fraud_flags.append("Multiple rejected applications in history")
         
+        # Check accounts linked through a shared phone, citizenship number or address
+        if cluster_size > self.LINKED_ACCOUNTS_LIMIT:
+            fraud_flags.append(f"Shares phone, citizenship number or address with {cluster_size - 1} other accounts")
+        if cluster_size > 1 and cluster_exposure > self.LINKED_EXPOSURE_LIMIT:
+            fraud_flags.append(f"Linked accounts hold Rs. {cluster_exposure:,.0f} in open loans")
+        
         return fraud_flags
     
-    def comprehensive_fraud_check(self, loan_application):
+    def check_application_patterns(self, customer):
         """
-        Perform comprehensive fraud check
+        Check for suspicious application patterns
         """
-        all_flags = []
-        
-        # Document check
-        doc_flags = self.check_document_authenticity(loan_application.documents.all())
-        all_flags.extend(doc_flags)
-        
-        # Pattern check
-        pattern_flags = self.check_application_patterns(loan_application.customer)
-        all_flags.extend(pattern_flags)
+        from api.velocity import velocities
         
+        identities = {
+            'customer': customer.pk, 'username': customer.username, 'phone': customer.phone,
+            'citizenship': customer.citizenship_number,
+        }
+        velocity = velocities(self.velocity_queries(identities))
+        rejected_apps = self.count_rejected_applications([customer.pk]).get(customer.pk, 0)
+        cluster = customer.identity_cluster
+        return self.pattern_flags(identities, velocity, rejected_apps, (cluster.size, cluster.exposure) if cluster else (1, 0))
+    
+    def fraud_result(self, all_flags):
         # Calculate fraud probability
         fraud_probability = min(100, len(all_flags) * 25)
         
@@ -76,4 +137,46 @@ class FraudDetector:
             'fraud_flags': all_flags,
             'fraud_probability': fraud_probability,
             'is_suspicious': fraud_probability > 50
-        }
\ No newline at end of file
+        }
+    
+    def comprehensive_fraud_check(self, loan_application):
+        """
+        Perform comprehensive fraud check
+        """
+        from api.models import LoanApplication
+        
+        return self.batch_fraud_check(LoanApplication.objects.filter(pk=loan_application.pk))[loan_application.pk]
+    
+    def batch_fraud_check(self, applications):
+        """
+        comprehensive_fraud_check for many applications (instances or a
+        queryset) with a fixed number of queries: application identities
+        and identity clusters, their documents, rejected counts and the
+        velocity counters (read in batches).
+        Returns {application_id: result}.
+        """
+        from api.models import Document, LoanApplication
+        from api.velocity import velocities
+        
+        if not hasattr(applications, 'values_list'):
+            applications = LoanApplication.objects.filter(pk__in=[app.pk for app in applications])
+        identities = self.application_identities(applications)
+        
+        documents = defaultdict(list)
+        document_rows = Document.objects.filter(application_id__in=list(identities)).only(
+            'application_id', 'document_type', 'file', 'file_size', 'mime_type', 'duplicate_of'
+        )
+        for doc in document_rows:
+            documents[doc.application_id].append(doc)
+        rejected = self.count_rejected_applications({customer_id for customer_id, _, _ in identities.values()})
+        velocity = velocities({
+            query for _, app_identities, _ in identities.values() for query in self.velocity_queries(app_identities)
+        })
+        
+        return {
+            app_id: self.fraud_result(
+                self.check_document_authenticity(documents[app_id])
+                + self.pattern_flags(app_identities, velocity, rejected.get(customer_id, 0), cluster)
+            )
+            for app_id, (customer_id, app_identities, cluster) in identities.items()
+        }
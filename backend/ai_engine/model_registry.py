@@ -0,0 +1,201 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+import joblib
+import numpy as np
+
+
+# Feature vector fed to the trained credit model, in column order
+MODEL_FEATURES = [
+    'loan_amount',
+    'down_payment',
+    'monthly_income',
+    'interest_rate',
+    'tenure_months',
+    'vehicle_price',
+    'customer_age',
+    'monthly_emi',
+    'income_to_loan_ratio',
+    'down_payment_percentage',
+    'emi_to_income_ratio',
+    'loan_to_value_ratio',
+    'employment_score',
+]
+
+
+class CompiledForest:
+    """
+    Random forest packed into padded NumPy arrays.
+
+    scikit-learn's predict_proba dispatches every tree through joblib, which
+    costs milliseconds for a single row. Walking all trees at once level by
+    level gives the same probabilities in tens of microseconds.
+    """
+
+    def __init__(self, forest, positive_class=1):
+        trees = [estimator.tree_ for estimator in forest.estimators_]
+        positive = list(forest.classes_).index(positive_class)
+        width = max(tree.node_count for tree in trees)
+
+        self.left = np.full((len(trees), width), -1, dtype=np.int64)
+        self.right = np.full((len(trees), width), -1, dtype=np.int64)
+        self.feature = np.zeros((len(trees), width), dtype=np.int64)
+        self.threshold = np.zeros((len(trees), width), dtype=np.float64)
+        self.value = np.zeros((len(trees), width), dtype=np.float64)
+
+        for index, tree in enumerate(trees):
+            count = tree.node_count
+            self.left[index, :count] = tree.children_left
+            self.right[index, :count] = tree.children_right
+            self.feature[index, :count] = np.maximum(tree.feature, 0)
+            self.threshold[index, :count] = tree.threshold
+            totals = tree.value[:, 0, :].sum(axis=1)
+            self.value[index, :count] = tree.value[:, 0, positive] / np.where(totals > 0, totals, 1)
+
+        self.depth = max(tree.max_depth for tree in trees)
+        self.tree_index = np.arange(len(trees))
+
+    def predict_proba(self, matrix):
+        """Probability of the positive class for each row of `matrix`"""
+        # Trees compare float32 inputs against float64 thresholds
+        matrix = np.asarray(matrix, dtype=np.float32).astype(np.float64)
+        rows = np.arange(len(matrix))[:, None]
+        node = np.zeros((len(matrix), len(self.tree_index)), dtype=np.int64)
+
+        for _ in range(self.depth):
+            left = self.left[self.tree_index, node]
+            go_left = matrix[rows, self.feature[self.tree_index, node]] <= self.threshold[self.tree_index, node]
+            node = np.where(left < 0, node, np.where(go_left, left, self.right[self.tree_index, node]))
+
+        return self.value[self.tree_index, node].mean(axis=1)
+
+
+class CreditModel:
+    """A trained credit model loaded from the registry"""
+
+    def __init__(self, artifact):
+        self.version = artifact['version']
+        self.features = artifact['features']
+        self.estimator = artifact['model']
+        self.metadata = artifact.get('metadata', {})
+        self.forest = CompiledForest(self.estimator)
+
+    def predict_proba(self, matrix):
+        """Probability of a good outcome for each row of a feature matrix"""
+        return self.forest.predict_proba(matrix)
+
+    def vector(self, features, scores):
+        values = dict(features, employment_score=scores['employment_score'])
+        return [float(values[name]) for name in self.features]
+
+    def score(self, features, scores):
+        """Credit score (0-1000) for one feature dict from CreditScorer"""
+        return float(self.predict_proba([self.vector(features, scores)])[0]) * 1000
+
+
+class ModelRegistry:
+    """
+    Versioned model artifacts on disk:
+        <root>/<name>/v0001.joblib, v0002.joblib, ...
+        <root>/<name>/LATEST  -> version served by default
+    """
+
+    def __init__(self, root, name='credit_model'):
+        self.directory = os.path.join(root, name)
+
+    def path(self, version):
+        return os.path.join(self.directory, f'v{version:04d}.joblib')
+
+    def versions(self):
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(
+            int(filename[1:-len('.joblib')])
+            for filename in os.listdir(self.directory)
+            if filename.startswith('v') and filename.endswith('.joblib')
+        )
+
+    def latest_version(self):
+        """Promoted version, or None until one is promoted"""
+        try:
+            with open(os.path.join(self.directory, 'LATEST')) as latest:
+                return int(latest.read().strip())
+        except (OSError, ValueError):
+            return None
+
+    def save(self, model, features, metadata=None, promote=False):
+        """Store a fitted estimator as the next version and optionally serve it"""
+        os.makedirs(self.directory, exist_ok=True)
+        versions = self.versions()
+        version = versions[-1] + 1 if versions else 1
+
+        metadata = dict(metadata or {}, trained_at=datetime.now().isoformat())
+        joblib.dump({'version': version, 'features': features, 'model': model, 'metadata': metadata},
+                    self.path(version))
+        with open(os.path.join(self.directory, f'v{version:04d}.json'), 'w') as summary:
+            json.dump(metadata, summary, indent=2, default=str)
+
+        if promote:
+            self.promote(version)
+        return version
+
+    def promote(self, version):
+        """Point LATEST at a version; written atomically since workers re-read it while serving"""
+        if version not in self.versions():
+            raise ValueError(f"No credit model v{version} in {self.directory}")
+        staging = os.path.join(self.directory, f'LATEST.{os.getpid()}')
+        with open(staging, 'w') as latest:
+            latest.write(str(version))
+        os.replace(staging, os.path.join(self.directory, 'LATEST'))
+
+    def load(self, version=None):
+        version = version or self.latest_version()
+        if version is None:
+            return None
+        return CreditModel(joblib.load(self.path(version)))
+
+
+_active_model = None
+_active_version = None
+_next_check = 0
+_active_lock = threading.Lock()
+
+
+def default_registry():
+    from django.conf import settings
+    return ModelRegistry(settings.MODEL_REGISTRY_DIR)
+
+
+def active_credit_model():
+    """
+    Model served by CreditScorer, loaded once per process (gunicorn warms it
+    in post_worker_init). The registry's LATEST pointer is re-read every
+    CREDIT_MODEL_RELOAD_SECONDS, so a promoted model replaces the loaded one
+    without restarting workers. Returns None when disabled or nothing is
+    trained, in which case the rule engine scores on its own.
+    """
+    global _active_model, _active_version, _next_check
+    now = time.monotonic()
+    if now < _next_check:
+        return _active_model
+
+    from django.conf import settings
+    with _active_lock:
+        if now >= _next_check:
+            if not settings.CREDIT_MODEL_ENABLED:
+                _active_model = _active_version = None
+            else:
+                registry = default_registry()
+                version = registry.latest_version()
+                if version != _active_version:
+                    try:
+                        _active_model = registry.load(version)
+                        _active_version = version
+                    except Exception as e:
+                        # Keep serving the loaded model and retry at the next check
+                        print(f"Error loading credit model v{version}: {str(e)}")
+            _next_check = now + settings.CREDIT_MODEL_RELOAD_SECONDS
+    return _active_model
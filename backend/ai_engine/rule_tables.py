@@ -0,0 +1,147 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+
+
+# Distinct employment type strings remembered before the memo is reset
+EMPLOYMENT_MEMO_SIZE = 10000
+
+
+class BandTable:
+    """
+    Step function over one feature, compiled from a rule table entry.
+
+    Breakpoints are written in ascending order as ">=t" (the next band
+    starts at t) or ">t" (the next band starts just above t). A value's band
+    is the number of breakpoints it has passed: batch lookups count them
+    with np.searchsorted, single lookups with bisect over the same thresholds.
+    """
+
+    def __init__(self, name, feature, breakpoints, scores):
+        if len(scores) != len(breakpoints) + 1:
+            raise ValueError(f"Band '{name}' needs one more score than breakpoints")
+
+        self.name = name
+        self.feature = feature
+        self.breakpoints = []
+        for breakpoint in breakpoints:
+            inclusive = breakpoint.startswith('>=')
+            if not inclusive and not breakpoint.startswith('>'):
+                raise ValueError(f"Band '{name}' has an invalid breakpoint: {breakpoint}")
+            threshold = json.loads(breakpoint[2 if inclusive else 1:])
+            if not isinstance(threshold, (int, float)):
+                raise ValueError(f"Band '{name}' has an invalid breakpoint: {breakpoint}")
+            if self.breakpoints and threshold < self.breakpoints[-1][0]:
+                raise ValueError(f"Band '{name}' breakpoints must be ascending")
+            self.breakpoints.append((threshold, inclusive))
+
+        self.scores = [float(score) if isinstance(score, float) else int(score) for score in scores]
+        # ">=t" is passed by values >= t, ">t" only by values > t
+        self.inclusive = [t for t, inclusive in self.breakpoints if inclusive]
+        self.exclusive = [t for t, inclusive in self.breakpoints if not inclusive]
+        self.inclusive_array = np.array(self.inclusive, dtype=np.float64)
+        self.exclusive_array = np.array(self.exclusive, dtype=np.float64)
+        self.scores_array = np.array(self.scores, dtype=np.float64)
+
+    def score(self, value):
+        """Score of a single feature value"""
+        return self.scores[bisect_right(self.inclusive, value) + bisect_left(self.exclusive, value)]
+
+    def lookup(self, values):
+        """Vectorized lookup over an array of feature values"""
+        values = np.asarray(values, dtype=np.float64)
+        band = (np.searchsorted(self.inclusive_array, values, side='right')
+                + np.searchsorted(self.exclusive_array, values, side='left'))
+        return self.scores_array[band]
+
+
+class EmploymentTable:
+    """
+    Employment type scores: the first key contained in the lower-cased
+    type wins. Results are memoized per distinct type string.
+    """
+
+    def __init__(self, scores, default):
+        self.scores = list(scores.items())
+        self.default = default
+        self.memo = {}
+
+    def __call__(self, employment_type):
+        try:
+            return self.memo[employment_type]
+        except KeyError:
+            pass
+        lowered = employment_type.lower()
+        score = next((score for key, score in self.scores if key in lowered), self.default)
+        if len(self.memo) >= EMPLOYMENT_MEMO_SIZE:
+            self.memo.clear()
+        self.memo[employment_type] = score
+        return score
+
+    def lookup(self, employment_types):
+        """Score a pandas Series of employment types, matching each distinct value once"""
+        scores = {value: self(value) for value in employment_types.unique()}
+        return employment_types.map(scores).to_numpy(dtype=np.float64)
+
+
+class RuleSet:
+    """A compiled rule table file: version, weights, bands and employment scores"""
+
+    def __init__(self, table, path=None):
+        self.path = path
+        self.version = table['version']
+        # Changes whenever any threshold does, even if the version is not bumped
+        self.fingerprint = hashlib.sha256(json.dumps(table, sort_keys=True).encode()).hexdigest()[:16]
+        self.weights = dict(table['weights'])
+        self.bands = {
+            name: BandTable(name, band['feature'], band['breakpoints'], band['scores'])
+            for name, band in table['bands'].items()
+        }
+        self.employment = EmploymentTable(table['employment']['scores'], table['employment']['default'])
+
+    def __getitem__(self, name):
+        return self.bands[name]
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as rules_file:
+            return cls(json.load(rules_file), path)
+
+
+_active_rules = None
+_active_mtime = None
+_next_check = 0
+_rules_lock = threading.Lock()
+
+
+def active_rules():
+    """
+    Rule set scoring uses by default, compiled once per process. The file's
+    modification time is checked every CREDIT_RULES_RELOAD_SECONDS so an
+    edited or replaced table is picked up without restarting workers.
+    """
+    global _active_rules, _active_mtime, _next_check
+    now = time.monotonic()
+    if _active_rules is not None and now < _next_check:
+        return _active_rules
+
+    from django.conf import settings
+    with _rules_lock:
+        path = settings.CREDIT_RULES_FILE
+        try:
+            mtime = os.stat(path).st_mtime_ns
+            if _active_rules is None or path != _active_rules.path or mtime != _active_mtime:
+                _active_rules = RuleSet.load(path)
+                _active_mtime = mtime
+        except (OSError, ValueError, KeyError) as e:
+            if _active_rules is None:
+                raise
+            # Keep serving the last good table while the file is missing or broken
+            print(f"Error loading credit rules from {path}: {str(e)}")
+        _next_check = now + settings.CREDIT_RULES_RELOAD_SECONDS
+    return _active_rules
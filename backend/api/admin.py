@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import User, Vehicle, LoanApplication, Document, EMISchedule, Payment, Notification, ChatMessage
+from .models import User, IdentityCluster, Vehicle, LoanApplication, ScoringJob, Document, EMISchedule, Payment, Notification, OutboxMessage, ChatMessage
 
 @admin.register(User)
 class UserAdmin(admin.ModelAdmin):
@@ -7,6 +7,11 @@ class UserAdmin(admin.ModelAdmin):
     list_filter = ['user_type', 'created_at']
     search_fields = ['username', 'email', 'first_name', 'last_name']
 
+@admin.register(IdentityCluster)
+class IdentityClusterAdmin(admin.ModelAdmin):
+    list_display = ['id', 'size', 'exposure', 'updated_at']
+    ordering = ['-size']
+
 @admin.register(Vehicle)
 class VehicleAdmin(admin.ModelAdmin):
     list_display = ['name', 'brand', 'model', 'year', 'vehicle_type', 'price', 'is_available']
@@ -19,10 +24,16 @@ class LoanApplicationAdmin(admin.ModelAdmin):
     list_filter = ['status', 'created_at']
     search_fields = ['application_number', 'customer__username']
 
+@admin.register(ScoringJob)
+class ScoringJobAdmin(admin.ModelAdmin):
+    list_display = ['application', 'status', 'attempts', 'created_at', 'finished_at']
+    list_filter = ['status', 'created_at']
+
 @admin.register(Document)
 class DocumentAdmin(admin.ModelAdmin):
-    list_display = ['application', 'document_type', 'status', 'uploaded_at']
-    list_filter = ['document_type', 'status']
+    list_display = ['application', 'document_type', 'mime_type', 'file_size', 'status', 'uploaded_at']
+    list_filter = ['document_type', 'status', 'mime_type', ('duplicate_of', admin.EmptyFieldListFilter)]
+    readonly_fields = ['file_size', 'mime_type', 'page_count', 'width', 'height', 'sha256', 'phash', 'duplicate_of']
 
 @admin.register(EMISchedule)
 class EMIScheduleAdmin(admin.ModelAdmin):
@@ -42,4 +53,10 @@ class NotificationAdmin(admin.ModelAdmin):
 @admin.register(ChatMessage)
 class ChatMessageAdmin(admin.ModelAdmin):
     list_display = ['user', 'intent', 'created_at']
-    list_filter = ['intent', 'created_at']
\ No newline at end of file
+    list_filter = ['intent', 'created_at']
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ['channel', 'recipient', 'item_count', 'status', 'attempts', 'next_attempt_at', 'sent_at']
+    list_filter = ['channel', 'status']
+    search_fields = ['recipient', 'subject', 'coalesce_key']
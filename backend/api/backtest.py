@@ -0,0 +1,147 @@
+import time
+from importlib import import_module
+
+import numpy as np
+import pandas as pd
+
+from ai_engine.credit_scorer import CreditScorer
+from .feature_store import feature_frame
+from .models import LoanApplication
+
+
+# Scalar rules that score_features re-implements with NumPy. A candidate
+# overriding any of them is replayed row by row so the override is honoured.
+VECTORIZED_RULES = [
+    'calculate_income_score',
+    'calculate_down_payment_score',
+    'calculate_employment_score',
+    'calculate_age_score',
+    'calculate_ltv_score',
+    'calculate_tenure_score',
+    'detect_fraud_risk',
+    'determine_risk_level',
+]
+
+# Score histogram buckets (0-1000 in steps of 50)
+SCORE_BINS = np.arange(0, 1051, 50)
+
+RISK_LEVELS = ['low', 'medium', 'medium-high', 'high']
+
+
+def load_scorer_class(path):
+    """Import a CreditScorer subclass from a dotted path such as 'risk.candidates.TighterTenure'"""
+    if not path:
+        return CreditScorer
+    module_name, _, class_name = path.rpartition('.')
+    scorer_class = getattr(import_module(module_name), class_name)
+    if not issubclass(scorer_class, CreditScorer):
+        raise TypeError(f"{path} is not a CreditScorer subclass")
+    return scorer_class
+
+
+def build_candidate(scorer_path=None, weights=None, use_model=True, rules_path=None):
+    scorer = load_scorer_class(scorer_path)(use_model=use_model, rules=rules_path)
+    unknown = set(weights or {}) - set(scorer.weights)
+    if unknown:
+        raise ValueError(f"Unknown weights: {', '.join(sorted(unknown))}")
+    scorer.weights.update(weights or {})
+    return scorer
+
+
+def is_vectorizable(scorer):
+    return all(getattr(type(scorer), name) is getattr(CreditScorer, name) for name in VECTORIZED_RULES)
+
+
+def first_line(recommendation):
+    return (recommendation or '').split('\n', 1)[0]
+
+
+def backtest_shard(loan_ids, scorer_path=None, weights=None, use_model=True, rules_path=None):
+    """
+    Score one shard of applications with the candidate and pair the results
+    with the stored scores. Runs inside a pool worker.
+    """
+    started = time.perf_counter()
+    scorer = build_candidate(scorer_path, weights, use_model, rules_path)
+    loans = LoanApplication.objects.filter(id__in=loan_ids)
+    frame = feature_frame(loan_ids)
+
+    if is_vectorizable(scorer):
+        results = scorer.score_features(frame)[['credit_score', 'risk_level', 'recommendation']]
+    else:
+        results = pd.DataFrame.from_records(
+            [scorer.score_extracted(features) for features in frame.to_dict('records')],
+            columns=['credit_score', 'risk_level', 'recommendation'], index=frame.index,
+        )
+
+    stored = pd.DataFrame.from_records(
+        list(loans.values_list('id', 'credit_score', 'fraud_risk_level', 'ai_recommendation')),
+        columns=['id', 'stored_score', 'stored_risk', 'stored_recommendation'],
+    ).set_index('id')
+
+    shard = stored.join(results, how='inner')
+    return {
+        'stored_score': shard['stored_score'].to_numpy(dtype=np.float64),
+        'stored_risk': shard['stored_risk'].fillna('').to_numpy(dtype=object),
+        'stored_recommendation': shard['stored_recommendation'].map(first_line).to_numpy(dtype=object),
+        'credit_score': shard['credit_score'].to_numpy(dtype=np.int64),
+        'risk_level': shard['risk_level'].to_numpy(dtype=object),
+        'recommendation': shard['recommendation'].map(first_line).to_numpy(dtype=object),
+        'rows': len(shard),
+        'seconds': time.perf_counter() - started,
+    }
+
+
+def summarize_backtest(shards):
+    """Compare candidate scores with the stored ones across all shards"""
+    merged = {key: np.concatenate([shard[key] for shard in shards]) for key in shards[0] if key not in ('rows', 'seconds')}
+    scored = ~np.isnan(merged['stored_score'])
+    stored_score = merged['stored_score'][scored]
+    candidate_score = merged['credit_score'][scored]
+    delta = candidate_score - stored_score
+
+    def distribution(values):
+        if not len(values):
+            return {}
+        return {
+            'mean': round(float(np.mean(values)), 1),
+            'p10': float(np.percentile(values, 10)),
+            'p50': float(np.percentile(values, 50)),
+            'p90': float(np.percentile(values, 90)),
+        }
+
+    risk = pd.crosstab(
+        pd.Categorical(merged['stored_risk'][scored]), pd.Categorical(merged['risk_level'][scored]),
+        rownames=['stored'], colnames=['candidate'],
+    )
+    recommendation_changed = merged['stored_recommendation'][scored] != merged['recommendation'][scored]
+    recommendations = pd.crosstab(
+        merged['stored_recommendation'][scored][recommendation_changed],
+        merged['recommendation'][scored][recommendation_changed],
+        rownames=['stored'], colnames=['candidate'],
+    )
+
+    return {
+        'applications': int(len(merged['credit_score'])),
+        'compared': int(scored.sum()),
+        'unscored': int((~scored).sum()),
+        'stored_distribution': distribution(stored_score),
+        'candidate_distribution': distribution(candidate_score),
+        'histogram': {
+            'bins': SCORE_BINS[:-1].tolist(),
+            'stored': np.histogram(stored_score, SCORE_BINS)[0].tolist(),
+            'candidate': np.histogram(candidate_score, SCORE_BINS)[0].tolist(),
+        },
+        'score_changed': int((delta != 0).sum()),
+        'mean_delta': round(float(delta.mean()), 2) if len(delta) else 0,
+        'risk_transitions': {
+            stored: {candidate: int(count) for candidate, count in row.items() if count}
+            for stored, row in risk.to_dict('index').items()
+        },
+        'risk_changed': int((merged['stored_risk'][scored] != merged['risk_level'][scored]).sum()),
+        'recommendation_changed': int(recommendation_changed.sum()),
+        'recommendation_transitions': [
+            {'stored': stored, 'candidate': candidate, 'count': int(count)}
+            for (stored, candidate), count in recommendations.stack().items() if count
+        ],
+    }
@@ -0,0 +1,12 @@
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+
+def cache_is_shared():
+    """
+    Whether the default cache is seen by every process (Redis, Memcached,
+    database, file). LocMemCache lives inside one process, so entries
+    another worker invalidated or updated may be stale there.
+    """
+    return not isinstance(caches['default'], (LocMemCache, DummyCache))
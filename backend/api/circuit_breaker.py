@@ -0,0 +1,76 @@
+import threading
+import time
+
+from django.conf import settings
+
+from .metrics import counter
+
+
+circuit_opens = counter('provider_circuit_opens_total', 'Times a provider circuit breaker opened, by provider')
+
+
+class CircuitBreaker:
+    """
+    Stops calling a provider after `failure_threshold` consecutive failures.
+    Once `reset_timeout` seconds have passed a single trial call is let
+    through: success closes the circuit again, failure reopens it.
+    Kept per process, like the metrics.
+    """
+
+    def __init__(self, name, failure_threshold, reset_timeout):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        return 'open' if self.retry_after() > 0 else 'half_open'
+
+    def retry_after(self):
+        """Seconds until the open circuit lets a trial call through"""
+        if self.opened_at is None:
+            return 0
+        return max(self.opened_at + self.reset_timeout - time.monotonic(), 0)
+
+    def allow(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if self.retry_after() > 0 or self.trial_running:
+                return False
+            self.trial_running = True
+            return True
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial_running = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                circuit_opens.inc(provider=self.name)
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker(name):
+    """The process-wide circuit breaker of a provider"""
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(
+                name, settings.PROVIDER_FAILURE_THRESHOLD, settings.PROVIDER_RESET_TIMEOUT
+            )
+        return _breakers[name]
@@ -0,0 +1,105 @@
+from collections import defaultdict
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Q
+
+from .bulk import bulk_update_rows, bulk_update_values
+from .document_metadata import METADATA_FIELDS, capture_metadata, hash_bands
+from .models import Document
+
+
+# Largest Hamming distance between two perceptual hashes treated as the same
+# image. Hashes this close always agree on at least one of the four 16-bit
+# bands, so exact band lookups find every near duplicate (multi-index hashing).
+NEAR_DUPLICATE_DISTANCE = 3
+
+BAND_FIELDS = ['phash_band0', 'phash_band1', 'phash_band2', 'phash_band3']
+
+
+def hamming(a, b):
+    return bin((a ^ b) & 0xFFFFFFFFFFFFFFFF).count('1')
+
+
+def find_duplicate(document, customer_id):
+    """
+    Id of the earliest document from another customer with the same content,
+    or failing that the earliest one with a near-identical image. One query
+    on the sha256 and band indexes.
+    """
+    lookups = [Q(sha256=document.sha256)] if document.sha256 else []
+    if document.phash is not None:
+        lookups += [Q(**{field: band}) for field, band in zip(BAND_FIELDS, hash_bands(document.phash))]
+    if not lookups:
+        return None
+
+    candidates = (
+        Document.objects.filter(reduce(or_, lookups))
+        .exclude(application__customer_id=customer_id)
+        .exclude(pk=document.pk)
+        .order_by('uploaded_at', 'id')
+        .values_list('id', 'sha256', 'phash')
+    )
+    near = None
+    for candidate_id, sha256, phash in candidates:
+        if sha256 == document.sha256:
+            return candidate_id
+        if near is None and phash is not None and document.phash is not None \
+                and hamming(phash, document.phash) <= NEAR_DUPLICATE_DISTANCE:
+            near = candidate_id
+    return near
+
+
+def link_duplicates():
+    """
+    Recompute duplicate_of for the whole corpus in one pass over the hash
+    columns, with in-memory sha256 and band indexes. Returns how many
+    documents changed.
+    """
+    rows = Document.objects.order_by('uploaded_at', 'id').values_list(
+        'id', 'application__customer_id', 'sha256', 'phash', 'duplicate_of_id'
+    )
+    by_sha256 = defaultdict(list)
+    by_band = defaultdict(list)
+    changed = []
+
+    for position, (document_id, customer_id, sha256, phash, current) in enumerate(rows):
+        band_keys = list(enumerate(hash_bands(phash))) if phash is not None else []
+        match = next((other_id for other_id, other_customer in by_sha256.get(sha256, ()) if other_customer != customer_id), None)
+        if match is None and band_keys:
+            near = [
+                (other_position, other_id)
+                for band_key in band_keys
+                for other_position, other_id, other_customer, other_phash in by_band.get(band_key, ())
+                if other_customer != customer_id and hamming(phash, other_phash) <= NEAR_DUPLICATE_DISTANCE
+            ]
+            match = min(near)[1] if near else None
+
+        if match != current:
+            changed.append([match, document_id])
+        if sha256:
+            by_sha256[sha256].append((document_id, customer_id))
+        for band_key in band_keys:
+            by_band[band_key].append((position, document_id, customer_id, phash))
+
+    with transaction.atomic():
+        return bulk_update_values(Document, ['duplicate_of'], changed)
+
+
+def record_metadata(document_ids):
+    """
+    Stream the files of documents and store their metadata and hashes.
+    Runs inside a pool worker; returns (recorded, missing files).
+    """
+    batch, missing = [], 0
+    for document in Document.objects.filter(id__in=document_ids).only('id', 'file'):
+        try:
+            with document.file.open('rb'):
+                capture_metadata(document)
+        except (FileNotFoundError, ValueError):
+            missing += 1
+            continue
+        batch.append(document)
+    with transaction.atomic():
+        return bulk_update_rows(Document, batch, METADATA_FIELDS), missing
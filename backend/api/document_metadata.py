@@ -0,0 +1,136 @@
+import hashlib
+import re
+
+from PIL import Image
+
+
+# Leading bytes of the formats documents are uploaded in, checked in order
+MAGIC_NUMBERS = [
+    (b'%PDF-', 'application/pdf'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+    (b'II*\x00', 'image/tiff'),
+    (b'MM\x00*', 'image/tiff'),
+    (b'PK\x03\x04', 'application/zip'),
+]
+
+# Bytes of the upload kept for sniffing
+HEADER_SIZE = 64 * 1024
+
+CHUNK_SIZE = 256 * 1024
+
+PDF_PAGE = re.compile(rb'/Type\s*/Page(?![A-Za-z])')
+PDF_PAGE_COUNT = re.compile(rb'/Type\s*/Pages\b[^>]*?/Count\s+(\d+)|/Count\s+(\d+)[^>]*?/Type\s*/Pages\b')
+
+# Bytes carried over between chunks so markers split across them still match
+PDF_OVERLAP = 64
+
+# Rows and columns of the difference hash
+HASH_SIZE = 8
+
+METADATA_FIELDS = [
+    'file_size', 'mime_type', 'page_count', 'width', 'height', 'sha256',
+    'phash', 'phash_band0', 'phash_band1', 'phash_band2', 'phash_band3',
+]
+
+
+def hash_bands(phash):
+    """The four 16-bit slices of a perceptual hash that are indexed for near-duplicate lookups"""
+    if phash is None:
+        return [None] * 4
+    unsigned = phash & 0xFFFFFFFFFFFFFFFF
+    return [(unsigned >> shift) & 0xFFFF for shift in (48, 32, 16, 0)]
+
+
+def sniff_mime_type(header):
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'image/webp'
+    return next((mime_type for magic, mime_type in MAGIC_NUMBERS if header.startswith(magic)), 'application/octet-stream')
+
+
+def dhash(image):
+    """
+    64-bit difference hash: whether each pixel of a 9x8 grayscale thumbnail
+    is brighter than its right-hand neighbour. Re-scans, re-compressions and
+    resizes of the same page land within a few bits of each other.
+    """
+    image.draft('L', (HASH_SIZE * 8, HASH_SIZE * 8))
+    pixels = list(image.convert('L').resize((HASH_SIZE + 1, HASH_SIZE), Image.LANCZOS).getdata())
+    value = 0
+    for row in range(HASH_SIZE):
+        for column in range(HASH_SIZE):
+            left = pixels[row * (HASH_SIZE + 1) + column]
+            value = (value << 1) | (left > pixels[row * (HASH_SIZE + 1) + column + 1])
+    # Stored in a signed 64-bit column
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def image_details(file):
+    """(width, height, perceptual hash) of an image file, or Nones if Pillow cannot decode it"""
+    try:
+        file.seek(0)
+        with Image.open(file) as image:
+            return image.width, image.height, dhash(image)
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError):
+        return None, None, None
+
+
+def extract_metadata(file):
+    """
+    Size, sniffed MIME type, page or pixel counts, SHA-256 and (for images)
+    perceptual hash of an uploaded file, streamed once in chunks. Images
+    are decoded a second time for their pixels. Returns a dict of
+    METADATA_FIELDS.
+    """
+    file.seek(0)
+    digest = hashlib.sha256()
+    size = 0
+    header = b''
+    pages = 0
+    declared_pages = None
+    tail = b''
+
+    for chunk in iter(lambda: file.read(CHUNK_SIZE), b''):
+        digest.update(chunk)
+        size += len(chunk)
+        if len(header) < HEADER_SIZE:
+            header += chunk[:HEADER_SIZE - len(header)]
+        if header.startswith(b'%PDF-'):
+            window = tail + chunk
+            # Only count matches that end in the new bytes, so none is counted twice
+            pages += sum(1 for match in PDF_PAGE.finditer(window) if match.end() > len(tail))
+            for match in PDF_PAGE_COUNT.finditer(window):
+                if match.end() > len(tail):
+                    count = int(match.group(1) or match.group(2))
+                    declared_pages = max(declared_pages or 0, count)
+            tail = window[-PDF_OVERLAP:]
+
+    mime_type = sniff_mime_type(header)
+    metadata = {
+        'file_size': size,
+        'mime_type': mime_type,
+        'page_count': None,
+        'width': None,
+        'height': None,
+        'sha256': digest.hexdigest(),
+        'phash': None,
+    }
+    if mime_type == 'application/pdf':
+        # The root page tree's /Count survives compressed object streams that hide page objects
+        metadata['page_count'] = declared_pages or pages or None
+    elif mime_type.startswith('image/'):
+        metadata['width'], metadata['height'], metadata['phash'] = image_details(file)
+        metadata['page_count'] = 1
+
+    metadata.update(zip(METADATA_FIELDS[-4:], hash_bands(metadata['phash'])))
+    file.seek(0)
+    return metadata
+
+
+def capture_metadata(document):
+    """Fill in a document's metadata fields from its file"""
+    for field, value in extract_metadata(document.file).items():
+        setattr(document, field, value)
+    return document
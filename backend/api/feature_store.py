@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+from django.db import transaction
+
+from ai_engine.credit_scorer import CreditScorer
+from .models import ApplicationFeatures, LoanApplication
+from .parallel import chunked
+
+
+# Columns of application_features, in the order they are read back
+FEATURE_FIELDS = [
+    'loan_amount',
+    'down_payment',
+    'monthly_income',
+    'interest_rate',
+    'tenure_months',
+    'monthly_emi',
+    'vehicle_price',
+    'employment_type',
+    'customer_date_of_birth',
+    'income_to_loan_ratio',
+    'down_payment_percentage',
+    'emi_to_income_ratio',
+    'loan_to_value_ratio',
+]
+
+# LoanApplication fields the stored features are derived from
+SOURCE_FIELDS = {
+    'loan_amount', 'down_payment', 'monthly_income', 'interest_rate', 'tenure_months',
+    'monthly_emi', 'employment_type', 'vehicle', 'vehicle_id', 'customer', 'customer_id',
+}
+
+# Applications recomputed per query and upsert
+REFRESH_BATCH_SIZE = 2000
+
+
+def refresh_features(loan_ids, batch_size=REFRESH_BATCH_SIZE):
+    """Recompute and upsert the stored features of applications from the source tables"""
+    refreshed = 0
+    for chunk in chunked(loan_ids, batch_size):
+        frame = CreditScorer.load_source_features(LoanApplication.objects.filter(id__in=chunk))
+        frame = frame.rename(columns={'date_of_birth': 'customer_date_of_birth'})
+        rows = [
+            ApplicationFeatures(application_id=loan_id, **values)
+            for loan_id, values in zip(frame.index, frame[FEATURE_FIELDS].to_dict('records'))
+        ]
+        with transaction.atomic():
+            ApplicationFeatures.objects.bulk_create(
+                rows, update_conflicts=True, unique_fields=['application'],
+                update_fields=FEATURE_FIELDS + ['updated_at'],
+            )
+        refreshed += len(rows)
+    return refreshed
+
+
+def update_birth_date(customer):
+    """A changed date of birth only touches one stored column"""
+    return ApplicationFeatures.objects.filter(application__customer=customer).update(
+        customer_date_of_birth=customer.date_of_birth
+    )
+
+
+def feature_frame(loan_ids):
+    """
+    Features of many applications as the DataFrame CreditScorer.load_features
+    builds, read from the narrow feature table alone. Applications without a
+    stored row (e.g. created with bulk_create) are filled in first.
+    """
+    loan_ids = list(loan_ids)
+    rows = list(ApplicationFeatures.objects.filter(application_id__in=loan_ids).values_list('application_id', *FEATURE_FIELDS))
+    if len(rows) < len(loan_ids):
+        missing = set(loan_ids) - {row[0] for row in rows}
+        refresh_features(list(missing))
+        rows += ApplicationFeatures.objects.filter(application_id__in=missing).values_list('application_id', *FEATURE_FIELDS)
+
+    frame = pd.DataFrame.from_records(rows, columns=['id'] + FEATURE_FIELDS).set_index('id')
+    frame['tenure_months'] = frame['tenure_months'].astype(np.int64)
+    frame['customer_age'] = CreditScorer.calculate_ages(frame.pop('customer_date_of_birth'))
+    return frame
+
+
+def feature_matrix(loan_ids, columns):
+    """(application ids, float64 matrix with one row per application) for numeric feature columns"""
+    frame = feature_frame(loan_ids)
+    return frame.index.to_numpy(), frame[columns].to_numpy(dtype=np.float64)
+
+
+def stored_features(loan):
+    """The feature dict extract_features returns, from one primary-key lookup"""
+    row = ApplicationFeatures.objects.filter(application_id=loan.id).values(*FEATURE_FIELDS).first()
+    if row is None:
+        refresh_features([loan.id])
+        row = ApplicationFeatures.objects.filter(application_id=loan.id).values(*FEATURE_FIELDS).first()
+    row['customer_age'] = CreditScorer.age_on(row.pop('customer_date_of_birth'))
+    return row
@@ -0,0 +1,173 @@
+from collections import defaultdict
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .bulk import bulk_update_values
+from .models import IdentityCluster, IdentityKey, LoanApplication, User
+from .velocity import identity_digest, normalize
+
+
+# User fields that link accounts, by identity kind
+IDENTITY_FIELDS = {
+    'phone': 'phone',
+    'citizenship': 'citizenship_number',
+    'address': 'address',
+}
+
+# Addresses with fewer words (e.g. just a city) are too common to link accounts
+MIN_ADDRESS_WORDS = 3
+
+# Applications that count towards a cluster's exposure
+EXPOSURE_STATUSES = ['submitted', 'under_review', 'documents_verified', 'approved', 'disbursed']
+
+
+def user_identifiers(user):
+    return {kind: getattr(user, field) for kind, field in IDENTITY_FIELDS.items()}
+
+
+def identity_keys(identifiers):
+    """{kind: digest} of the filled-in values of {kind: identifier}"""
+    keys = {}
+    for kind, value in identifiers.items():
+        value = normalize(kind, value or '')
+        if not value or (kind == 'address' and len(value.split()) < MIN_ADDRESS_WORDS):
+            continue
+        keys[kind] = identity_digest(kind, value)
+    return keys
+
+
+def exposure_subquery():
+    return Coalesce(
+        Subquery(
+            LoanApplication.objects
+            .filter(customer__identity_cluster=OuterRef('pk'), status__in=EXPOSURE_STATUSES)
+            .values('customer__identity_cluster')
+            .annotate(total=Sum('loan_amount'))
+            .values('total')
+        ),
+        Value(0), output_field=DecimalField(max_digits=14, decimal_places=2),
+    )
+
+
+def refresh_clusters(cluster_ids):
+    """Recount the members and exposure of clusters with one UPDATE"""
+    IdentityCluster.objects.filter(id__in=list(cluster_ids)).update(
+        size=Subquery(
+            User.objects.filter(identity_cluster=OuterRef('pk'))
+            .values('identity_cluster').annotate(members=Count('id')).values('members')
+        ),
+        exposure=exposure_subquery(),
+    )
+
+
+def refresh_exposure(customer_id):
+    """Called when a customer's application is created or changes status or amount"""
+    IdentityCluster.objects.filter(members__id=customer_id).update(exposure=exposure_subquery())
+
+
+def link_user(user):
+    """
+    Store the user's identifier digests and merge the user into the cluster
+    of every account sharing one of them.
+
+    Union by size: the largest cluster involved absorbs the others, so an
+    account is relabelled at most O(log n) times and finding an account's
+    cluster is a plain column read. Links are never split here; changed
+    identifiers only stop creating new links (rebuildidentities recomputes
+    the clusters from scratch).
+    """
+    keys = identity_keys(user_identifiers(user))
+    with transaction.atomic():
+        IdentityKey.objects.filter(user=user).exclude(kind__in=list(keys)).delete()
+        IdentityKey.objects.bulk_create(
+            [IdentityKey(user=user, kind=kind, digest=digest) for kind, digest in keys.items()],
+            update_conflicts=True, unique_fields=['user', 'kind'], update_fields=['digest'],
+        )
+        if not keys:
+            return user.identity_cluster_id
+
+        linked = list(
+            IdentityKey.objects
+            .filter(reduce(or_, [Q(kind=kind, digest=digest) for kind, digest in keys.items()]))
+            .exclude(user=user)
+            .values_list('user_id', 'user__identity_cluster_id')
+            .distinct()
+        )
+        if not linked:
+            return user.identity_cluster_id
+
+        cluster_ids = {cluster_id for _, cluster_id in linked if cluster_id}
+        if user.identity_cluster_id:
+            cluster_ids.add(user.identity_cluster_id)
+        clusters = list(IdentityCluster.objects.select_for_update().filter(id__in=cluster_ids).order_by('-size', 'id'))
+        target = clusters[0] if clusters else IdentityCluster.objects.create()
+
+        merged = [cluster.id for cluster in clusters[1:]]
+        if merged:
+            User.objects.filter(identity_cluster__in=merged).update(identity_cluster=target)
+            IdentityCluster.objects.filter(id__in=merged).delete()
+        unclustered = [user_id for user_id, cluster_id in linked if not cluster_id] + [user.pk]
+        User.objects.filter(id__in=unclustered).update(identity_cluster=target)
+
+        refresh_clusters([target.id])
+    user.identity_cluster_id = target.id
+    return target.id
+
+
+def rebuild_clusters():
+    """
+    Recompute every cluster from the stored identifier digests with an
+    in-memory union-find, replacing the incrementally maintained ones.
+    Returns (clusters, linked accounts).
+    """
+    parent = {}
+
+    def find(node):
+        root = node
+        while parent.get(root, root) != root:
+            root = parent[root]
+        while node != root:
+            parent[node], node = root, parent[node]
+        return root
+
+    by_key = defaultdict(list)
+    for user_id, kind, digest in IdentityKey.objects.values_list('user_id', 'kind', 'digest').iterator(chunk_size=10000):
+        by_key[kind, digest].append(user_id)
+    for user_ids in by_key.values():
+        first = find(user_ids[0])
+        for user_id in user_ids[1:]:
+            root = find(user_id)
+            if root != first:
+                parent[root] = first
+
+    components = defaultdict(list)
+    for user_id in {user_id for user_ids in by_key.values() for user_id in user_ids}:
+        components[find(user_id)].append(user_id)
+    components = [members for members in components.values() if len(members) > 1]
+
+    with transaction.atomic():
+        User.objects.filter(identity_cluster__isnull=False).update(identity_cluster=None)
+        IdentityCluster.objects.all().delete()
+        clusters = IdentityCluster.objects.bulk_create([IdentityCluster(size=len(members)) for members in components])
+        bulk_update_values(User, ['identity_cluster'], [
+            [cluster.id, user_id] for cluster, members in zip(clusters, components) for user_id in members
+        ])
+        IdentityCluster.objects.update(exposure=exposure_subquery())
+
+    return len(components), sum(len(members) for members in components)
+
+
+def index_users(users):
+    """Store the identifier digests of many (user_id, {kind: identifier}) pairs, replacing previous ones"""
+    rows = [
+        IdentityKey(user_id=user_id, kind=kind, digest=digest)
+        for user_id, identifiers in users for kind, digest in identity_keys(identifiers).items()
+    ]
+    with transaction.atomic():
+        IdentityKey.objects.filter(user__in=[user_id for user_id, _ in users]).delete()
+        IdentityKey.objects.bulk_create(rows, batch_size=5000)
+    return len(rows)
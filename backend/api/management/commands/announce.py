@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.models import User
+from api.notifications import notify_users
+from api.parallel import chunked
+
+
+class Command(BaseCommand):
+    help = "Send a notification to every active user of a type, queueing its emails and SMS for deliveroutbox"
+
+    def add_arguments(self, parser):
+        parser.add_argument('title')
+        parser.add_argument('message')
+        parser.add_argument('--user-type', default='customer',
+                            choices=[user_type for user_type, _ in User.USER_TYPES] + ['all'])
+        parser.add_argument('--no-email', action='store_true', help="Only notify in the app and by SMS")
+        parser.add_argument('--no-sms', action='store_true', help="Only notify in the app and by email")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Users notified per transaction")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        users = User.objects.filter(is_active=True).order_by('id')
+        if options['user_type'] != 'all':
+            users = users.filter(user_type=options['user_type'])
+
+        notified = 0
+        for chunk in chunked(users.iterator(chunk_size=options['batch_size']), options['batch_size']):
+            notify_users(
+                chunk, options['title'], options['message'],
+                email=not options['no_email'], sms=not options['no_sms'], batch_size=options['batch_size'],
+            )
+            notified += len(chunk)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Notified {notified} users in {elapsed:.2f}s; deliveroutbox sends the queued emails and SMS"
+        ))
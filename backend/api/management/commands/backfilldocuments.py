@@ -0,0 +1,52 @@
+import time
+from concurrent.futures import as_completed
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from api.document_index import link_duplicates, record_metadata
+from api.models import Document
+from api.parallel import chunked, process_pool
+
+
+class Command(BaseCommand):
+    help = (
+        "Record size, type, page/pixel counts, SHA-256 and perceptual hashes of documents "
+        "uploaded before they were captured, then link duplicates across the corpus"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Re-read every document, not only those without metadata")
+        parser.add_argument('--batch-size', type=int, default=500, help="Documents read and written per task")
+        parser.add_argument('--workers', type=int, default=4, help="Processes streaming files")
+        parser.add_argument('--skip-links', action='store_true', help="Do not recompute duplicate_of")
+
+    def handle(self, *args, **options):
+        documents = Document.objects.all()
+        if not options['all']:
+            # Images decoded before perceptual hashes were stored have a width but no hash
+            documents = documents.filter(
+                Q(mime_type='') | Q(mime_type__startswith='image/', width__isnull=False, phash__isnull=True)
+            )
+        document_ids = list(documents.order_by('id').values_list('id', flat=True))
+
+        started = time.perf_counter()
+        recorded = missing = 0
+        with process_pool(options['workers']) as pool:
+            futures = [pool.submit(record_metadata, chunk) for chunk in chunked(document_ids, options['batch_size'])]
+            for future in as_completed(futures):
+                done, absent = future.result()
+                recorded += done
+                missing += absent
+                self.stderr.write(f"  {recorded + missing}/{len(document_ids)} documents")
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"Recorded metadata for {recorded} documents in {elapsed:.2f}s"))
+        if missing:
+            self.stdout.write(self.style.WARNING(f"{missing} documents have no file in storage"))
+
+        if not options['skip_links']:
+            started = time.perf_counter()
+            linked = link_duplicates()
+            elapsed = time.perf_counter() - started
+            self.stdout.write(self.style.SUCCESS(f"Updated duplicate links of {linked} documents in {elapsed:.2f}s"))
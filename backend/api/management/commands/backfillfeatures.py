@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.feature_store import REFRESH_BATCH_SIZE, refresh_features
+from api.models import LoanApplication
+
+
+class Command(BaseCommand):
+    help = "Build or rebuild the application feature store from the loan, vehicle and customer tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--missing', action='store_true', help="Only add applications without stored features")
+        parser.add_argument('--batch-size', type=int, default=REFRESH_BATCH_SIZE, help="Applications per upsert")
+
+    def handle(self, *args, **options):
+        loans = LoanApplication.objects.all()
+        if options['missing']:
+            loans = loans.filter(features__isnull=True)
+        loan_ids = list(loans.order_by('id').values_list('id', flat=True))
+
+        started = time.perf_counter()
+        refreshed = refresh_features(loan_ids, batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Stored features for {refreshed} applications in {elapsed:.2f}s ({refreshed / max(elapsed, 1e-9):.0f}/s)"
+        ))
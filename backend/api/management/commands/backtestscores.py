@@ -0,0 +1,112 @@
+import json
+import os
+import time
+from concurrent.futures import as_completed
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.backtest import RISK_LEVELS, backtest_shard, build_candidate, is_vectorizable, summarize_backtest
+from api.models import LoanApplication
+from api.parallel import chunked, process_pool
+
+
+class Command(BaseCommand):
+    help = "Replay stored applications through a candidate scorer and compare with the stored scores"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rules', help="Candidate rule table (JSON) in place of CREDIT_RULES_FILE")
+        parser.add_argument('--weights', help="Candidate weights as a JSON object or a path to a JSON file")
+        parser.add_argument('--scorer', help="Dotted path to a CreditScorer subclass with changed rules")
+        parser.add_argument('--rules-only', action='store_true', help="Ignore the trained model in the candidate")
+        parser.add_argument('--status', nargs='+', help="Only replay applications in these statuses")
+        parser.add_argument('--shard-size', type=int, default=20000, help="Applications per worker task")
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Worker processes")
+        parser.add_argument('--json', action='store_true', help="Print the comparison as JSON")
+
+    def handle(self, *args, **options):
+        weights = self.load_weights(options['weights'])
+        try:
+            scorer = build_candidate(options['scorer'], weights, not options['rules_only'], options['rules'])
+        except (ImportError, AttributeError, TypeError, ValueError, KeyError, OSError) as e:
+            raise CommandError(str(e))
+
+        if options['status']:
+            loans = LoanApplication.objects.filter(status__in=options['status'])
+        else:
+            loans = LoanApplication.objects.exclude(status='draft')
+        loan_ids = list(loans.order_by('id').values_list('id', flat=True))
+        if not loan_ids:
+            raise CommandError("No applications to replay")
+
+        shards = list(chunked(loan_ids, options['shard_size']))
+        self.stderr.write(
+            f"Replaying {len(loan_ids)} applications in {len(shards)} shards on {options['workers']} workers "
+            f"({'vectorized' if is_vectorizable(scorer) else 'row by row'}, version {scorer.version})"
+        )
+
+        task = (options['scorer'], weights, not options['rules_only'], options['rules'])
+        started = time.perf_counter()
+        results, done = [], 0
+        with process_pool(options['workers']) as pool:
+            futures = {pool.submit(backtest_shard, shard, *task): index for index, shard in enumerate(shards)}
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                done += result['rows']
+                elapsed = time.perf_counter() - started
+                self.stderr.write(
+                    f"  shard {futures[future] + 1}/{len(shards)}: {result['rows']} rows in {result['seconds']:.2f}s "
+                    f"| {done}/{len(loan_ids)} ({done / elapsed:.0f}/s)"
+                )
+
+        summary = summarize_backtest(results)
+        summary['seconds'] = round(time.perf_counter() - started, 2)
+
+        if options['json']:
+            self.stdout.write(json.dumps(summary, indent=2))
+            return
+        self.report(summary)
+
+    def load_weights(self, value):
+        if not value:
+            return {}
+        try:
+            if os.path.exists(value):
+                with open(value) as weights_file:
+                    return json.load(weights_file)
+            return json.loads(value)
+        except ValueError as e:
+            raise CommandError(f"Invalid weights: {e}")
+
+    def report(self, summary):
+        self.stdout.write(
+            f"\nCompared {summary['compared']} of {summary['applications']} applications "
+            f"({summary['unscored']} had no stored score) in {summary['seconds']:.2f}s"
+        )
+
+        self.stdout.write(f"\n{'':<10} {'mean':>8} {'p10':>8} {'p50':>8} {'p90':>8}")
+        for label, key in [('stored', 'stored_distribution'), ('candidate', 'candidate_distribution')]:
+            stats = summary[key]
+            if stats:
+                self.stdout.write(
+                    f"{label:<10} {stats['mean']:>8} {stats['p10']:>8.0f} {stats['p50']:>8.0f} {stats['p90']:>8.0f}"
+                )
+
+        self.stdout.write(f"\n{'Score':<10} {'stored':>10} {'candidate':>10}")
+        histogram = summary['histogram']
+        for start, stored, candidate in zip(histogram['bins'], histogram['stored'], histogram['candidate']):
+            if stored or candidate:
+                self.stdout.write(f"{start:>4}-{start + 49:<5} {stored:>10} {candidate:>10}")
+
+        self.stdout.write(f"\nRisk level transitions (rows: stored, columns: candidate)")
+        self.stdout.write(f"{'':<12}" + ''.join(f"{level:>12}" for level in RISK_LEVELS))
+        for stored, row in summary['risk_transitions'].items():
+            self.stdout.write(f"{stored or '(none)':<12}" + ''.join(f"{row.get(level, 0):>12}" for level in RISK_LEVELS))
+
+        self.stdout.write(
+            f"\nScores changed: {summary['score_changed']} (mean delta {summary['mean_delta']:+}), "
+            f"risk level changed: {summary['risk_changed']}, "
+            f"recommendation changed: {summary['recommendation_changed']}"
+        )
+        for change in summary['recommendation_transitions']:
+            self.stdout.write(f"  {change['count']:>8}  {change['stored']} -> {change['candidate']}")
@@ -0,0 +1,54 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.engine import compare, run_suite
+
+
+class Command(BaseCommand):
+    help = "Benchmark the scoring, fraud and chatbot engines on a synthetic book and emit JSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--applications', type=int, default=1000, help="In-memory applications per benchmark")
+        parser.add_argument('--db-applications', type=int, default=200,
+                            help="Applications saved (and rolled back) for DB-backed benchmarks")
+        parser.add_argument('--repeat', type=int, default=5, help="Timed passes over each sample")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', help="Write the JSON results to this file")
+        parser.add_argument('--compare', help="Previous JSON results to compare against")
+
+    def handle(self, *args, **options):
+        previous = None
+        if options['compare']:
+            try:
+                with open(options['compare']) as previous_file:
+                    previous = json.load(previous_file)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Cannot read {options['compare']}: {e}")
+
+        report = run_suite(
+            applications=options['applications'],
+            db_applications=options['db_applications'],
+            repeat=options['repeat'],
+            seed=options['seed'],
+        )
+        output = json.dumps(report, indent=2)
+
+        if options['output']:
+            with open(options['output'], 'w') as output_file:
+                output_file.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+        self.stderr.write(f"\n{'Benchmark':<34} {'per item':>12} {'items/s':>12} {'queries':>8}")
+        for name, result in report['results'].items():
+            self.stderr.write(
+                f"{name:<34} {result['per_item_us']:>10.1f}us {result['items_per_sec']:>12,.0f} "
+                f"{result['queries_per_item']:>8}"
+            )
+
+        if previous:
+            self.stderr.write(f"\nAgainst {(previous.get('commit') or 'unknown')[:10]}:")
+            for name, before, after, change in compare(previous, report):
+                style = self.style.ERROR if change > 10 else self.style.SUCCESS if change < -10 else str
+                self.stderr.write(style(f"{name:<34} {before:>10.1f}us -> {after:>10.1f}us ({change:+.1f}%)"))
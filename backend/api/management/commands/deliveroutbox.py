@@ -0,0 +1,54 @@
+import os
+import socket
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.metrics import publish_snapshot
+from api.notifications import close_connections
+from api.outbox import claim_messages, deliver_messages, requeue_stale_messages
+
+
+class Command(BaseCommand):
+    help = "Deliver queued notification emails and SMS in batches, retrying failures with backoff"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help="Messages claimed per batch")
+        parser.add_argument('--poll-interval', type=float, default=1.0, help="Seconds to sleep when nothing is due")
+        parser.add_argument('--stale-after', type=int, default=300,
+                            help="Requeue messages claimed longer ago than this many seconds")
+        parser.add_argument('--once', action='store_true', help="Exit once nothing is due")
+
+    def handle(self, *args, **options):
+        worker = f"{socket.gethostname()}:{os.getpid()}"
+        process = f'deliveroutbox@{worker}'
+
+        try:
+            while True:
+                publish_snapshot(process)
+                requeued = requeue_stale_messages(options['stale_after'])
+                if requeued:
+                    self.stdout.write(self.style.WARNING(f"Requeued {requeued} stale messages"))
+
+                messages = claim_messages(worker, options['batch_size'])
+                if not messages:
+                    # Don't hold the SMTP connection open while idle; servers drop it anyway
+                    close_connections()
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                started = time.perf_counter()
+                sent, failed, deferred = deliver_messages(messages)
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f"Sent {sent}/{len(messages)} messages in {elapsed:.2f}s"
+                    + (f", {failed} to retry or failed" if failed else "")
+                    + (f", {deferred} deferred" if deferred else "")
+                )
+        except KeyboardInterrupt:
+            pass
+        finally:
+            close_connections()
+            publish_snapshot(process, force=True)
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ai_engine.model_registry import default_registry
+
+
+class Command(BaseCommand):
+    help = "Serve a trained credit model; running workers pick it up within CREDIT_MODEL_RELOAD_SECONDS"
+
+    def add_arguments(self, parser):
+        parser.add_argument('version', type=int, nargs='?', help="Version to serve (default: the newest)")
+
+    def handle(self, *args, **options):
+        registry = default_registry()
+        versions = registry.versions()
+        if not versions:
+            raise CommandError("No trained credit models; run traincreditmodel first")
+
+        version = options['version'] or versions[-1]
+        try:
+            registry.promote(version)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(f"Serving credit model v{version}"))
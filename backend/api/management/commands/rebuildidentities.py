@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.identity_links import IDENTITY_FIELDS, index_users, rebuild_clusters
+from api.models import User
+from api.parallel import chunked
+
+
+class Command(BaseCommand):
+    help = "Re-index the phone, citizenship and address identifiers of every account and recompute the identity clusters"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help="Accounts indexed per write")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        rows = User.objects.order_by('id').values_list('id', *IDENTITY_FIELDS.values())
+        users = ((row[0], dict(zip(IDENTITY_FIELDS, row[1:]))) for row in rows.iterator(chunk_size=options['batch_size']))
+        indexed = 0
+        for chunk in chunked(users, options['batch_size']):
+            indexed += index_users(chunk)
+
+        clusters, linked = rebuild_clusters()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {indexed} identifiers; {linked} accounts form {clusters} clusters ({elapsed:.2f}s)"
+        ))
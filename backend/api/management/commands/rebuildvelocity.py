@@ -0,0 +1,46 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from api.models import Document, LoanApplication
+from api.velocity import WINDOWS, MemoryBackend, application_identities, bucket_counts, velocity_backend
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the application and document upload velocity counters from the stored rows "
+        "(login counters only exist from the moment they are recorded)"
+    )
+
+    def handle(self, *args, **options):
+        backend = velocity_backend()
+        if isinstance(backend, MemoryBackend):
+            raise CommandError("VELOCITY_BACKEND 'memory' keeps counters per process; rebuilding them here has no effect")
+
+        started = time.perf_counter()
+        since = timezone.now() - timedelta(seconds=max(span for span, _ in WINDOWS.values()))
+        applications = LoanApplication.objects.filter(created_at__gte=since).values_list(
+            'customer_id', 'customer__phone', 'customer__citizenship_number', 'submitted_ip', 'created_at'
+        )
+        documents = Document.objects.filter(uploaded_at__gte=since).values_list('application__customer_id', 'uploaded_at')
+
+        events = [
+            ('application', application_identities(customer_id, phone, citizenship_number, ip), created_at.timestamp())
+            for customer_id, phone, citizenship_number, ip, created_at in applications.iterator(chunk_size=5000)
+        ] + [
+            ('document', {'customer': customer_id}, uploaded_at.timestamp())
+            for customer_id, uploaded_at in documents.iterator(chunk_size=5000)
+        ]
+        counts = bucket_counts(events)
+
+        with transaction.atomic():
+            backend.clear(['application', 'document'])
+            backend.load(counts)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {len(counts)} velocity buckets from {len(events)} events in {elapsed:.2f}s"
+        ))
@@ -0,0 +1,73 @@
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import LoanApplication
+from api.parallel import chunked, process_pool
+from api.schedules import reprice_loans
+
+
+# Loans that still carry an interest obligation
+LIVE_STATUSES = ['submitted', 'under_review', 'documents_verified', 'approved', 'disbursed']
+
+
+class Command(BaseCommand):
+    help = "Reprice loans to a new interest rate and regenerate their unpaid EMI installments"
+
+    def add_arguments(self, parser):
+        parser.add_argument('rate', help="New annual interest rate in percent, e.g. 11.5")
+        parser.add_argument('--status', nargs='+', default=LIVE_STATUSES,
+                            help="Loan statuses to reprice (default: all live loans)")
+        parser.add_argument('--current-rate', help="Only reprice loans currently at this rate")
+        parser.add_argument('--loans', nargs='+', help="Only reprice these loan application IDs")
+        parser.add_argument('--batch-size', type=int, default=500, help="Loans per transaction")
+        parser.add_argument('--workers', type=int, default=1, help="Worker processes for parallel chunks")
+        parser.add_argument('--dry-run', action='store_true', help="Only count the matching loans")
+
+    def handle(self, *args, **options):
+        rate = self.parse_rate(options['rate'])
+
+        loans = LoanApplication.objects.filter(status__in=options['status'])
+        if options['current_rate']:
+            loans = loans.filter(interest_rate=self.parse_rate(options['current_rate']))
+        if options['loans']:
+            loans = loans.filter(id__in=options['loans'])
+
+        loan_ids = list(loans.order_by('id').values_list('id', flat=True))
+        if options['dry_run']:
+            self.stdout.write(f"{len(loan_ids)} loans would be repriced to {rate}%")
+            return
+
+        chunks = list(chunked(loan_ids, options['batch_size']))
+        started = time.perf_counter()
+        repriced = 0
+
+        if options['workers'] > 1:
+            with process_pool(options['workers']) as pool:
+                for count in pool.map(reprice_loans, chunks, [rate] * len(chunks)):
+                    repriced += count
+                    self.report_progress(repriced, len(loan_ids), started)
+        else:
+            for chunk in chunks:
+                repriced += reprice_loans(chunk, rate)
+                self.report_progress(repriced, len(loan_ids), started)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Repriced {repriced} loans to {rate}% in {elapsed:.2f}s "
+            f"({repriced / elapsed if elapsed else 0:.1f} loans/s)"
+        ))
+
+    def parse_rate(self, value):
+        try:
+            rate = Decimal(value)
+        except InvalidOperation:
+            raise CommandError(f"Invalid interest rate: {value}")
+        if rate < 0 or rate >= 100:
+            raise CommandError(f"Interest rate must be between 0 and 100, got {value}")
+        return rate
+
+    def report_progress(self, done, total, started):
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"  {done}/{total} loans ({done / elapsed if elapsed else 0:.1f} loans/s)")
@@ -0,0 +1,59 @@
+import os
+import socket
+import time
+
+from django.core.management.base import BaseCommand
+
+from ai_engine.model_registry import active_credit_model
+from api.parallel import chunked, process_pool
+from api.scoring_jobs import claim_jobs, process_jobs, requeue_stale_jobs
+
+
+class Command(BaseCommand):
+    help = "Drain queued AI scoring jobs in batches (no external broker needed)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Jobs claimed per batch")
+        parser.add_argument('--workers', type=int, default=1, help="Worker processes scoring each batch")
+        parser.add_argument('--poll-interval', type=float, default=2.0, help="Seconds to sleep when the queue is empty")
+        parser.add_argument('--stale-after', type=int, default=600,
+                            help="Requeue running jobs older than this many seconds")
+        parser.add_argument('--once', action='store_true', help="Exit once the queue is empty")
+
+    def handle(self, *args, **options):
+        worker = f"{socket.gethostname()}:{os.getpid()}"
+        # Load the model before forking so every process shares it
+        active_credit_model()
+        pool = process_pool(options['workers']) if options['workers'] > 1 else None
+
+        try:
+            while True:
+                requeued, failed = requeue_stale_jobs(options['stale_after'])
+                if requeued or failed:
+                    self.stdout.write(self.style.WARNING(
+                        f"Requeued {requeued} stale jobs" + (f", failed {failed} out of attempts" if failed else "")
+                    ))
+
+                job_ids = claim_jobs(worker, options['batch_size'])
+                if not job_ids:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                started = time.perf_counter()
+                if pool:
+                    shard_size = -(-len(job_ids) // options['workers'])
+                    done = sum(pool.map(process_jobs, chunked(job_ids, shard_size)))
+                else:
+                    done = process_jobs(job_ids)
+
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f"Scored {done}/{len(job_ids)} jobs in {elapsed:.2f}s ({len(job_ids) / elapsed:.0f} jobs/s)"
+                )
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if pool:
+                pool.shutdown()
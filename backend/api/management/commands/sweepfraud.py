@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from ai_engine.fraud_detector import FraudDetector
+from api.bulk import bulk_update_values
+from api.models import LoanApplication
+from api.parallel import chunked
+
+
+# Applications still waiting for a decision
+PENDING_STATUSES = ['submitted', 'under_review', 'documents_verified']
+
+FRAUD_FIELDS = ['fraud_flags', 'fraud_probability', 'fraud_checked_at']
+
+
+class Command(BaseCommand):
+    help = "Run the fraud checks over pending applications in bulk and store the flags"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--status', nargs='+', default=PENDING_STATUSES, help="Application statuses to sweep")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Applications checked per batch")
+        parser.add_argument('--dry-run', action='store_true', help="Check without saving")
+
+    def handle(self, *args, **options):
+        detector = FraudDetector()
+        loan_ids = list(
+            LoanApplication.objects.filter(status__in=options['status']).order_by('id').values_list('id', flat=True)
+        )
+
+        started = time.perf_counter()
+        checked = suspicious = 0
+        for chunk in chunked(loan_ids, options['batch_size']):
+            results = detector.batch_fraud_check(LoanApplication.objects.filter(id__in=chunk))
+            checked_at = timezone.now()
+
+            if not options['dry_run']:
+                with transaction.atomic():
+                    bulk_update_values(LoanApplication, FRAUD_FIELDS, [
+                        [result['fraud_flags'], result['fraud_probability'], checked_at, loan_id]
+                        for loan_id, result in results.items()
+                    ])
+
+            checked += len(results)
+            suspicious += sum(result['is_suspicious'] for result in results.values())
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f"  {checked}/{len(loan_ids)} applications ({checked / elapsed:.0f}/s)")
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {checked} applications in {elapsed:.2f}s, {suspicious} suspicious"
+        ))
@@ -0,0 +1,78 @@
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, Q
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import train_test_split
+
+from ai_engine.credit_scorer import CreditScorer
+from ai_engine.model_registry import MODEL_FEATURES, default_registry
+from api.feature_store import feature_frame
+from api.models import LoanApplication
+
+
+# Applications with a known outcome: approved/disbursed loans are good unless
+# they have overdue installments, rejected applications are bad
+GOOD_STATUSES = ['approved', 'disbursed']
+BAD_STATUSES = ['rejected']
+
+
+class Command(BaseCommand):
+    help = "Train the credit model on historical loan outcomes and store it in the model registry"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--trees', type=int, default=100, help="Number of trees in the forest")
+        parser.add_argument('--max-depth', type=int, default=8, help="Maximum depth of each tree")
+        parser.add_argument('--test-size', type=float, default=0.2, help="Share of samples held out for AUC")
+        parser.add_argument('--min-samples', type=int, default=50, help="Refuse to train on fewer outcomes")
+        parser.add_argument('--promote', action='store_true',
+                            help="Serve the new model right away (running workers pick it up within "
+                                 "CREDIT_MODEL_RELOAD_SECONDS); otherwise use promotecreditmodel")
+
+    def handle(self, *args, **options):
+        scorer = CreditScorer(use_model=False)
+        loans = (
+            LoanApplication.objects
+            .filter(status__in=GOOD_STATUSES + BAD_STATUSES)
+            .annotate(overdue=Count('emi_schedules', filter=Q(emi_schedules__status='overdue')))
+        )
+        outcomes = dict(
+            (loan_id, int(status in GOOD_STATUSES and not overdue))
+            for loan_id, status, overdue in loans.values_list('id', 'status', 'overdue')
+        )
+        if len(outcomes) < options['min_samples']:
+            raise CommandError(f"Only {len(outcomes)} applications with a known outcome; need {options['min_samples']}")
+
+        frame = feature_frame(list(outcomes))
+        frame['employment_score'] = frame['employment_type'].map(
+            lambda employment_type: scorer.calculate_employment_score({'employment_type': employment_type})
+        )
+        X = frame[MODEL_FEATURES].to_numpy(dtype=np.float64)
+        y = frame.index.map(outcomes).to_numpy(dtype=np.int64)
+        if len(set(y)) < 2:
+            raise CommandError("Training data only contains one outcome class")
+
+        X_train, X_test, y_train, y_test = train_test_split(
+            X, y, test_size=options['test_size'], stratify=y, random_state=42
+        )
+        model = RandomForestClassifier(
+            n_estimators=options['trees'], max_depth=options['max_depth'], min_samples_leaf=5,
+            class_weight='balanced', n_jobs=-1, random_state=42,
+        )
+        model.fit(X_train, y_train)
+        auc = roc_auc_score(y_test, model.predict_proba(X_test)[:, 1])
+
+        model.fit(X, y)
+        model.n_jobs = 1
+        version = default_registry().save(model, MODEL_FEATURES, {
+            'samples': len(y),
+            'good_rate': float(y.mean()),
+            'holdout_auc': float(auc),
+            'trees': options['trees'],
+            'max_depth': options['max_depth'],
+        }, promote=options['promote'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Trained credit model v{version} on {len(y)} applications (holdout AUC {auc:.3f})"
+            + ("" if options['promote'] else f"; run promotecreditmodel {version} to serve it")
+        ))
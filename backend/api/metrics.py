@@ -0,0 +1,160 @@
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import MetricSnapshot
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+    kind = 'counter'
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self.values = defaultdict(float)
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            self.values[key] += amount
+
+    def value(self, **labels):
+        return self.values.get(tuple(sorted(labels.items())), 0)
+
+    def samples(self):
+        with self.lock:
+            return [(self.name, dict(key), value) for key, value in self.values.items()]
+
+
+class Histogram:
+    """Cumulative histogram of observed values (e.g. seconds) with optional labels"""
+    kind = 'histogram'
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [count per bucket, sum, count]
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            state = self.values.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+
+    def count(self, **labels):
+        state = self.values.get(tuple(sorted(labels.items())))
+        return state[2] if state else 0
+
+    def samples(self):
+        samples = []
+        with self.lock:
+            for key, (bucket_counts, total, count) in self.values.items():
+                labels = dict(key)
+                for bound, bucket_count in zip(self.buckets, bucket_counts):
+                    samples.append((f'{self.name}_bucket', {**labels, 'le': f'{bound:g}'}, bucket_count))
+                samples.append((f'{self.name}_bucket', {**labels, 'le': '+Inf'}, count))
+                samples.append((f'{self.name}_sum', labels, total))
+                samples.append((f'{self.name}_count', labels, count))
+        return samples
+
+
+class Registry:
+    """
+    In-process metric registry rendered in the Prometheus text format.
+    Every web worker keeps its own values, so scrape each worker; processes
+    without an HTTP server publish snapshots that the web workers render
+    alongside their own (see publish_snapshot).
+    """
+
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def register(self, metric_class, name, help_text, **kwargs):
+        with self.lock:
+            if name not in self.metrics:
+                self.metrics[name] = metric_class(name, help_text, **kwargs)
+            return self.metrics[name]
+
+    def snapshot(self):
+        """{name: [kind, help, samples]} of every metric, in a JSON-serializable form"""
+        with self.lock:
+            metrics = list(self.metrics.values())
+        return {metric.name: [metric.kind, metric.help_text, metric.samples()] for metric in metrics}
+
+    def render(self, snapshots=()):
+        """
+        This process's metrics plus the (process, snapshot) pairs of other
+        processes, whose samples get a `process` label
+        """
+        families = self.snapshot()
+        for process, snapshot in snapshots:
+            for name, (kind, help_text, samples) in snapshot.items():
+                family = families.setdefault(name, [kind, help_text, []])
+                family[2].extend((sample, {**labels, 'process': process}, value) for sample, labels, value in samples)
+
+        lines = []
+        for name, (kind, help_text, samples) in families.items():
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for sample, labels, value in samples:
+                lines.append(f'{sample}{_format_labels(labels)} {value:g}')
+        return '\n'.join(lines) + '\n'
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    body = ','.join(f'{key}="{value}"' for key, value in sorted(labels.items()))
+    return '{' + body + '}'
+
+
+registry = Registry()
+
+
+_next_publish = 0
+
+
+def publish_snapshot(process, force=False):
+    """
+    Store this process's metrics for the web workers to expose, at most
+    every METRICS_SNAPSHOT_SECONDS unless `force`. Snapshots of processes
+    that stopped publishing are deleted once older than METRICS_SNAPSHOT_MAX_AGE.
+    """
+    global _next_publish
+    if not force and time.monotonic() < _next_publish:
+        return
+    _next_publish = time.monotonic() + settings.METRICS_SNAPSHOT_SECONDS
+    MetricSnapshot.objects.update_or_create(process=process, defaults={'samples': registry.snapshot()})
+    MetricSnapshot.objects.filter(
+        updated_at__lt=timezone.now() - timedelta(seconds=settings.METRICS_SNAPSHOT_MAX_AGE)
+    ).delete()
+
+
+def recent_snapshots():
+    """(process, snapshot) pairs published within METRICS_SNAPSHOT_MAX_AGE"""
+    return MetricSnapshot.objects.filter(
+        updated_at__gte=timezone.now() - timedelta(seconds=settings.METRICS_SNAPSHOT_MAX_AGE)
+    ).order_by('process').values_list('process', 'samples')
+
+
+def counter(name, help_text):
+    return registry.register(Counter, name, help_text)
+
+
+def histogram(name, help_text, buckets=Histogram.DEFAULT_BUCKETS):
+    return registry.register(Histogram, name, help_text, buckets=buckets)
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='emischedule',
+            index=models.Index(fields=['due_date', 'status'], name='emi_due_date_status_idx'),
+        ),
+    ]
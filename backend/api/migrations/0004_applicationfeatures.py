@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:53
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_scoringjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApplicationFeatures',
+            fields=[
+                ('application', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='features', serialize=False, to='api.loanapplication')),
+                ('loan_amount', models.FloatField()),
+                ('down_payment', models.FloatField()),
+                ('monthly_income', models.FloatField()),
+                ('interest_rate', models.FloatField()),
+                ('tenure_months', models.IntegerField()),
+                ('monthly_emi', models.FloatField()),
+                ('vehicle_price', models.FloatField()),
+                ('employment_type', models.CharField(max_length=50)),
+                ('customer_date_of_birth', models.DateField(blank=True, null=True)),
+                ('income_to_loan_ratio', models.FloatField()),
+                ('down_payment_percentage', models.FloatField()),
+                ('emi_to_income_ratio', models.FloatField()),
+                ('loan_to_value_ratio', models.FloatField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'application_features',
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_applicationfeatures'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='loanapplication',
+            name='fraud_checked_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='loanapplication',
+            name='fraud_flags',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='loanapplication',
+            name='fraud_probability',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+    ]
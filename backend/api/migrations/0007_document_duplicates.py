@@ -0,0 +1,44 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:59
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_document_metadata'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='duplicate_of',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='duplicates', to='api.document'),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='phash',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='phash_band0',
+            field=models.IntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='phash_band1',
+            field=models.IntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='phash_band2',
+            field=models.IntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='phash_band3',
+            field=models.IntegerField(blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-18 06:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_document_duplicates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='loanapplication',
+            name='submitted_ip',
+            field=models.GenericIPAddressField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='VelocityBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64)),
+                ('window', models.CharField(max_length=8)),
+                ('bucket', models.BigIntegerField()),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'velocity_buckets',
+                'indexes': [models.Index(fields=['window', 'bucket'], name='velocity_bucket_expiry_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='velocitybucket',
+            constraint=models.UniqueConstraint(fields=('key', 'window', 'bucket'), name='velocity_bucket_unique'),
+        ),
+    ]
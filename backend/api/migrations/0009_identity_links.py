@@ -0,0 +1,49 @@
+# Generated by Django 4.2.7 on 2026-10-18 06:09
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_velocity_buckets'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdentityCluster',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('size', models.IntegerField(default=0)),
+                ('exposure', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'identity_clusters',
+            },
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='identity_cluster',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='members', to='api.identitycluster'),
+        ),
+        migrations.CreateModel(
+            name='IdentityKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('phone', 'Phone'), ('citizenship', 'Citizenship Number'), ('address', 'Address')], max_length=20)),
+                ('digest', models.CharField(max_length=32)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='identity_keys', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'identity_keys',
+                'indexes': [models.Index(fields=['kind', 'digest'], name='identity_key_lookup_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='identitykey',
+            constraint=models.UniqueConstraint(fields=('user', 'kind'), name='identity_key_unique'),
+        ),
+    ]
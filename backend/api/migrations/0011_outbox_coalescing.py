@@ -0,0 +1,27 @@
+# Generated by Django 4.2.7 on 2026-10-18 06:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_outbox_messages'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboxmessage',
+            name='coalesce_key',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='outboxmessage',
+            name='item_count',
+            field=models.IntegerField(default=1),
+        ),
+        migrations.AddIndex(
+            model_name='outboxmessage',
+            index=models.Index(fields=['coalesce_key', 'status'], name='outbox_coalesce_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.7 on 2026-10-18 07:07
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_metric_snapshots'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PushTicket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nonce', models.CharField(max_length=32, unique=True)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='push_tickets', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'push_tickets',
+            },
+        ),
+        migrations.CreateModel(
+            name='PushListener',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('process', models.CharField(max_length=100)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='push_listeners', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'push_listeners',
+                'unique_together': {('process', 'user')},
+            },
+        ),
+    ]
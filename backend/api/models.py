@@ -1,6 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
 import uuid
 
 class User(AbstractUser):
@@ -22,6 +23,9 @@ class User(AbstractUser):
     citizenship_number = models.CharField(max_length=50, blank=True, null=True)
     date_of_birth = models.DateField(null=True, blank=True)
     profile_picture = models.ImageField(upload_to='profiles/', null=True, blank=True)
+    # Accounts sharing a phone, citizenship number or address (api/identity_links.py);
+    # empty while the account is linked to no other
+    identity_cluster = models.ForeignKey('IdentityCluster', on_delete=models.SET_NULL, null=True, blank=True, related_name='members')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -32,6 +36,45 @@ class User(AbstractUser):
         return f"{self.username} ({self.get_user_type_display()})"
 
 
+class IdentityCluster(models.Model):
+    """Connected component of accounts linked through shared identifiers"""
+    size = models.IntegerField(default=0)
+    # Loan amount of the members' open applications and loans
+    exposure = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'identity_clusters'
+    
+    def __str__(self):
+        return f"Identity cluster {self.pk} ({self.size} accounts)"
+
+
+class IdentityKey(models.Model):
+    """Digest of one normalized identifier (phone, citizenship number, address) of one account"""
+    KINDS = (
+        ('phone', 'Phone'),
+        ('citizenship', 'Citizenship Number'),
+        ('address', 'Address'),
+    )
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='identity_keys')
+    kind = models.CharField(max_length=20, choices=KINDS)
+    digest = models.CharField(max_length=32)
+    
+    class Meta:
+        db_table = 'identity_keys'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'kind'], name='identity_key_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['kind', 'digest'], name='identity_key_lookup_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user_id} {self.kind}"
+
+
 class Vehicle(models.Model):
     """Vehicle Model"""
     VEHICLE_TYPES = (
@@ -109,6 +152,13 @@ class LoanApplication(models.Model):
     fraud_risk_level = models.CharField(max_length=20, blank=True)
     ai_recommendation = models.TextField(blank=True)
     
+    # Written by the fraud sweep (`manage.py sweepfraud`)
+    fraud_flags = models.JSONField(default=list, blank=True)
+    fraud_probability = models.IntegerField(null=True, blank=True)
+    fraud_checked_at = models.DateTimeField(null=True, blank=True)
+    # Address the application was submitted from, for velocity checks
+    submitted_ip = models.GenericIPAddressField(null=True, blank=True)
+    
     customer_remarks = models.TextField(blank=True)
     admin_remarks = models.TextField(blank=True)
     rejection_reason = models.TextField(blank=True)
@@ -133,6 +183,93 @@ class LoanApplication(models.Model):
         return f"{self.application_number} - {self.customer.username}"
 
 
+class ApplicationFeatures(models.Model):
+    """
+    Scoring inputs of an application in one narrow row, so scoring never has
+    to join vehicles and users. Kept in sync by signals (see api/feature_store.py).
+    """
+    application = models.OneToOneField(LoanApplication, on_delete=models.CASCADE, primary_key=True, related_name='features')
+    
+    loan_amount = models.FloatField()
+    down_payment = models.FloatField()
+    monthly_income = models.FloatField()
+    interest_rate = models.FloatField()
+    tenure_months = models.IntegerField()
+    monthly_emi = models.FloatField()
+    vehicle_price = models.FloatField()
+    employment_type = models.CharField(max_length=50)
+    # Age is derived when reading; storing it would go stale every birthday
+    customer_date_of_birth = models.DateField(null=True, blank=True)
+    
+    income_to_loan_ratio = models.FloatField()
+    down_payment_percentage = models.FloatField()
+    emi_to_income_ratio = models.FloatField()
+    loan_to_value_ratio = models.FloatField()
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'application_features'
+    
+    def __str__(self):
+        return f"Features of {self.application_id}"
+
+
+class ScoringJob(models.Model):
+    """Queued AI scoring request, processed by `manage.py runscoringworker`"""
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    )
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    application = models.ForeignKey(LoanApplication, on_delete=models.CASCADE, related_name='scoring_jobs')
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.IntegerField(default=0)
+    worker = models.CharField(max_length=100, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'scoring_jobs'
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='scoring_job_status_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Scoring {self.application.application_number} ({self.status})"
+
+
+class VelocityBucket(models.Model):
+    """
+    Event count of one identity (customer, phone, IP, ...) in one time bucket
+    of one window. Written and read by api/velocity.py; expired buckets are
+    pruned as new events come in.
+    """
+    key = models.CharField(max_length=64)
+    window = models.CharField(max_length=8)
+    bucket = models.BigIntegerField()
+    count = models.IntegerField(default=0)
+    
+    class Meta:
+        db_table = 'velocity_buckets'
+        constraints = [
+            models.UniqueConstraint(fields=['key', 'window', 'bucket'], name='velocity_bucket_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['window', 'bucket'], name='velocity_bucket_expiry_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.key} {self.window}@{self.bucket}: {self.count}"
+
+
 class Document(models.Model):
     """Document Model for KYC"""
     DOCUMENT_TYPES = (
@@ -156,6 +293,21 @@ class Document(models.Model):
     application = models.ForeignKey(LoanApplication, on_delete=models.CASCADE, related_name='documents')
     document_type = models.CharField(max_length=20, choices=DOCUMENT_TYPES)
     file = models.FileField(upload_to='documents/%Y/%m/')
+    # Captured from the upload stream so checks never have to open the file
+    file_size = models.BigIntegerField(null=True, blank=True)
+    mime_type = models.CharField(max_length=100, blank=True)
+    page_count = models.IntegerField(null=True, blank=True)
+    width = models.IntegerField(null=True, blank=True)
+    height = models.IntegerField(null=True, blank=True)
+    sha256 = models.CharField(max_length=64, blank=True, db_index=True)
+    # 64-bit difference hash of images, split into four indexed 16-bit bands
+    phash = models.BigIntegerField(null=True, blank=True)
+    phash_band0 = models.IntegerField(null=True, blank=True, db_index=True)
+    phash_band1 = models.IntegerField(null=True, blank=True, db_index=True)
+    phash_band2 = models.IntegerField(null=True, blank=True, db_index=True)
+    phash_band3 = models.IntegerField(null=True, blank=True, db_index=True)
+    # Earliest matching document submitted by another customer
+    duplicate_of = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='duplicates')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     verified_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
     verification_notes = models.TextField(blank=True)
@@ -165,6 +317,9 @@ class Document(models.Model):
     class Meta:
         db_table = 'documents'
         ordering = ['-uploaded_at']
+        indexes = [
+            models.Index(fields=['status', 'uploaded_at']),
+        ]
     
     def __str__(self):
         return f"{self.get_document_type_display()} - {self.application.application_number}"
@@ -195,6 +350,9 @@ class EMISchedule(models.Model):
         db_table = 'emi_schedules'
         ordering = ['emi_number']
         unique_together = ['application', 'emi_number']
+        indexes = [
+            models.Index(fields=['due_date', 'status'], name='emi_due_date_status_idx'),
+        ]
     
     def __str__(self):
         return f"EMI {self.emi_number} - {self.application.application_number}"
@@ -237,11 +395,126 @@ class Notification(models.Model):
     class Meta:
         db_table = 'notifications'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'is_read', 'created_at'], name='notif_user_unread_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.user.username}"
 
 
+class PushEvent(models.Model):
+    """
+    Event for a user's push stream, written by the 'database' PUSH_BROKER so
+    every ASGI process can pick it up (api/push.py). Kept for PUSH_EVENT_TTL.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='push_events')
+    event = models.CharField(max_length=30)
+    data = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    
+    class Meta:
+        db_table = 'push_events'
+    
+    def __str__(self):
+        return f"{self.event} for {self.user_id}"
+
+
+class PushListener(models.Model):
+    """
+    User with an open push stream in one process, refreshed by that process
+    while the stream lasts. The 'database' PUSH_BROKER only writes events
+    for users listed here.
+    """
+    process = models.CharField(max_length=100)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='push_listeners')
+    expires_at = models.DateTimeField(db_index=True)
+    
+    class Meta:
+        db_table = 'push_listeners'
+        unique_together = ['process', 'user']
+    
+    def __str__(self):
+        return f"{self.user_id} on {self.process}"
+
+
+class PushTicket(models.Model):
+    """Nonce of an issued push ticket, deleted when the ticket opens a stream"""
+    nonce = models.CharField(max_length=32, unique=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='push_tickets')
+    expires_at = models.DateTimeField(db_index=True)
+    
+    class Meta:
+        db_table = 'push_tickets'
+    
+    def __str__(self):
+        return f"Push ticket for {self.user_id}"
+
+
+class OutboxMessage(models.Model):
+    """
+    Email or SMS written in the same transaction as its Notification and
+    delivered by `manage.py deliveroutbox`. Notifications raised while a
+    message with the same coalesce_key is still pending are merged into it
+    (api/outbox.py queue_messages).
+    """
+    CHANNEL_CHOICES = (
+        ('email', 'Email'),
+        ('sms', 'SMS'),
+    )
+    
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    )
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    notification = models.ForeignKey(Notification, on_delete=models.SET_NULL, null=True, blank=True, related_name='outbox_messages')
+    channel = models.CharField(max_length=10, choices=CHANNEL_CHOICES)
+    recipient = models.CharField(max_length=254)
+    subject = models.CharField(max_length=200, blank=True)
+    body = models.TextField()
+    coalesce_key = models.CharField(max_length=100, blank=True)
+    item_count = models.IntegerField(default=1)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.IntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    worker = models.CharField(max_length=100, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'outbox_messages'
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+            models.Index(fields=['coalesce_key', 'status'], name='outbox_coalesce_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.channel} to {self.recipient} ({self.status})"
+
+
+class MetricSnapshot(models.Model):
+    """
+    Metric samples of a worker process outside the web server (e.g.
+    deliveroutbox), published periodically so /api/metrics/ can include them
+    """
+    process = models.CharField(max_length=100, unique=True)
+    samples = models.JSONField()
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    
+    class Meta:
+        db_table = 'metric_snapshots'
+    
+    def __str__(self):
+        return f"Metrics of {self.process}"
+
+
 class ChatMessage(models.Model):
     """Chat Message Model for Chatbot"""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -1,35 +1,170 @@
-from django.core.mail import send_mail
+import http.client
+import json
+import logging
+import threading
+from collections import Counter
+from urllib.parse import urlsplit
+
+from django.core.mail import EmailMessage, get_connection
 from django.conf import settings
-from twilio.rest import Client
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+# SMTP connection and SMS clients of this thread, kept open across sends
+# until close_connections() (deliveroutbox calls it whenever the queue runs dry)
+_clients = threading.local()
+
+
+def email_connection():
+    connection = getattr(_clients, 'email', None)
+    if connection is None:
+        connection = _clients.email = get_connection(fail_silently=False)
+    return connection
+
+
+def send_emails(emails):
+    """
+    Send [(to_email, subject, message)] over this thread's SMTP connection,
+    so a batch costs one connection and TLS handshake instead of one per
+    email. Returns the exception raised for each email, None when sent.
+    """
+    connection = email_connection()
+    errors = []
+    for to_email, subject, message in emails:
+        try:
+            # No-op while the connection is open; reconnects after a failure
+            connection.open()
+            connection.send_messages([
+                EmailMessage(subject, message, settings.DEFAULT_FROM_EMAIL, [to_email], connection=connection)
+            ])
+        except Exception as e:
+            errors.append(e)
+            _close_quietly(connection)
+        else:
+            errors.append(None)
+    return errors
+
 
 def send_email(to_email, subject, message):
-    send_mail(
-        subject,
-        message,
-        settings.EMAIL_HOST_USER,
-        [to_email],
-        fail_silently=False,
-    )
+    error, = send_emails([(to_email, subject, message)])
+    if error is not None:
+        raise error
 
-def send_sms(to_phone, message):
-    client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
-    client.messages.create(
+
+def twilio_client():
+    client = getattr(_clients, 'twilio', None)
+    if client is None or client.username != settings.TWILIO_ACCOUNT_SID:
+        from twilio.http.http_client import TwilioHttpClient
+        from twilio.rest import Client
+        client = _clients.twilio = Client(
+            settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN,
+            http_client=TwilioHttpClient(timeout=settings.SMS_TIMEOUT),
+        )
+    return client
+
+
+def send_twilio_sms(to_phone, message):
+    twilio_client().messages.create(
         body=message,
         from_=settings.TWILIO_PHONE_NUMBER,
         to=to_phone
     )
 
-def notify_user(user, title, message, email=True, sms=True):
-    # Save to Notification model
-    from .models import Notification
-    Notification.objects.create(
-        user=user,
-        title=title,
-        message=message
-    )
-    
-    if email and user.email:
-        send_email(user.email, title, message)
-    
-    if sms and user.phone:
-        send_sms(user.phone, message)
+
+def http_sms_connection():
+    url = urlsplit(settings.SMS_HTTP_URL)
+    cached = getattr(_clients, 'http_sms', None)
+    if cached is None or cached[0] != (url.scheme, url.netloc):
+        connection_class = http.client.HTTPSConnection if url.scheme == 'https' else http.client.HTTPConnection
+        cached = _clients.http_sms = ((url.scheme, url.netloc), connection_class(url.netloc, timeout=settings.SMS_TIMEOUT))
+    return cached[1], url.path or '/'
+
+
+def send_http_sms(to_phone, message):
+    """POST the message as JSON to SMS_HTTP_URL (an SMS gateway, or a local stand-in during development)"""
+    connection, path = http_sms_connection()
+    payload = json.dumps({'from': settings.TWILIO_PHONE_NUMBER, 'to': to_phone, 'body': message})
+    try:
+        connection.request('POST', path, body=payload, headers={'Content-Type': 'application/json'})
+        response = connection.getresponse()
+        response.read()
+    except Exception:
+        connection.close()
+        raise
+    if response.status >= 400:
+        raise RuntimeError(f"SMS gateway returned HTTP {response.status}")
+
+
+def send_console_sms(to_phone, message):
+    logger.info("SMS to %s: %s", to_phone, message)
+
+
+def close_connections():
+    """Close this thread's SMTP connection and SMS gateway connection"""
+    connection = getattr(_clients, 'email', None)
+    if connection is not None:
+        _close_quietly(connection)
+    cached = getattr(_clients, 'http_sms', None)
+    if cached is not None:
+        cached[1].close()
+
+
+def _close_quietly(connection):
+    try:
+        connection.close()
+    except Exception:
+        logger.warning("Error closing the SMTP connection", exc_info=True)
+
+
+SMS_BACKENDS = {
+    'twilio': send_twilio_sms,
+    'http': send_http_sms,
+    'console': send_console_sms,
+}
+
+
+def send_sms(to_phone, message):
+    try:
+        backend = SMS_BACKENDS[settings.SMS_BACKEND]
+    except KeyError:
+        raise ValueError(f"Unknown SMS_BACKEND: {settings.SMS_BACKEND}")
+    backend(to_phone, message)
+
+
+def notify_user(user, title, message, email=True, sms=True, priority='normal'):
+    """
+    Save the Notification and queue its email and SMS in the outbox, in
+    the caller's transaction. `manage.py deliveroutbox` sends them, so the
+    request never waits on the mail server or the SMS provider. Emails and
+    SMS raised close together are merged into one message per channel;
+    priority='low' ones can wait for the daily digest instead.
+    """
+    notification, = notify_users([user], title, message, email=email, sms=sms, priority=priority)
+    return notification
+
+
+def notify_users(users, title, message, email=True, sms=True, priority='normal', batch_size=1000):
+    """notify_user for many users with bulk inserts, e.g. announcements to every customer"""
+    from .models import Notification, OutboxMessage
+    from .outbox import coalesce_key, queue_messages
+    from .push import notification_event, publish
+    from .unread_counts import adjust_unread
+
+    notifications = [Notification(user=user, title=title, message=message) for user in users]
+    messages = []
+    for user, notification in zip(users, notifications):
+        for channel, recipient in (('email', email and user.email), ('sms', sms and user.phone)):
+            if recipient:
+                messages.append(OutboxMessage(
+                    notification=notification, channel=channel, recipient=recipient, subject=title, body=message,
+                    coalesce_key=coalesce_key(user, channel, priority),
+                ))
+
+    with transaction.atomic():
+        Notification.objects.bulk_create(notifications, batch_size=batch_size)
+        queue_messages(messages)
+        adjust_unread(Counter(user.pk for user in users))
+        publish([notification_event(notification) for notification in notifications])
+
+    return notifications
@@ -0,0 +1,187 @@
+import random
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .bulk import bulk_update_rows
+from .circuit_breaker import breaker
+from .metrics import counter, histogram
+from .models import OutboxMessage
+from .notifications import send_email, send_sms
+from .parallel import chunked
+
+
+batch_seconds = histogram('outbox_batch_seconds', 'Time to send one claimed batch of outbox messages, by channel')
+provider_seconds = histogram('notification_provider_seconds', 'Duration of single email and SMS provider calls, by provider and outcome')
+messages_total = counter('outbox_messages_total', 'Outbox delivery attempts, by channel and outcome')
+coalesced_total = counter('outbox_coalesced_total', 'Notifications merged into an already queued message, by channel')
+
+
+SENDERS = {
+    'email': lambda message: send_email(message.recipient, message.subject, message.body),
+    'sms': lambda message: send_sms(message.recipient, message.body),
+}
+
+# Provider behind each channel; every provider gets its own circuit breaker
+PROVIDERS = {
+    'email': lambda: 'email',
+    'sms': lambda: f'sms:{settings.SMS_BACKEND}',
+}
+
+
+def coalesce_key(user, channel, priority):
+    """
+    Low-priority notifications wait for the daily digest when
+    NOTIFICATION_DIGEST is on; the rest share a burst window of
+    NOTIFICATION_COALESCE_SECONDS. No key means the message goes out alone.
+    """
+    if priority == 'low' and settings.NOTIFICATION_DIGEST:
+        return f'digest:{channel}:{user.pk}'
+    if settings.NOTIFICATION_COALESCE_SECONDS:
+        return f'burst:{channel}:{user.pk}'
+    return ''
+
+
+def deliver_after(key, now):
+    if key.startswith('digest:'):
+        digest = timezone.localtime(now).replace(hour=settings.NOTIFICATION_DIGEST_HOUR, minute=0, second=0, microsecond=0)
+        return digest if digest > now else digest + timedelta(days=1)
+    if key:
+        return now + timedelta(seconds=settings.NOTIFICATION_COALESCE_SECONDS)
+    return now
+
+
+def merge_into(target, message):
+    """Append a notification's title and text to a queued message"""
+    if target.item_count == 1:
+        target.body = f"{target.subject}\n{target.body}"
+    target.item_count += 1
+    target.body = f"{target.body}\n\n{message.subject}\n{message.body}"
+    if target.coalesce_key.startswith('digest:'):
+        target.subject = f"Your daily summary: {target.item_count} updates"
+    else:
+        target.subject = f"{target.item_count} new notifications"
+
+
+def queue_messages(messages):
+    """
+    Insert outbox messages, merging each one that has a coalesce_key into
+    the pending message with the same key instead of adding a row. A queued
+    message is only changed while it is still pending and nobody else merged
+    into it since it was read (a conditional UPDATE, like the claims);
+    otherwise the new notifications get their own message.
+    """
+    now = timezone.now()
+    pending = {}
+    for keys in chunked({message.coalesce_key for message in messages if message.coalesce_key}, 500):
+        for queued in OutboxMessage.objects.filter(coalesce_key__in=keys, status='pending').order_by('created_at'):
+            pending.setdefault(queued.coalesce_key, (queued, queued.item_count, []))
+
+    new = []
+    for message in messages:
+        message.next_attempt_at = deliver_after(message.coalesce_key, now)
+        if message.coalesce_key not in pending:
+            new.append(message)
+            if message.coalesce_key:
+                pending[message.coalesce_key] = (message, message.item_count, [])
+            continue
+        target, _, merged = pending[message.coalesce_key]
+        merge_into(target, message)
+        merged.append(message)
+        coalesced_total.inc(channel=message.channel)
+
+    for target, item_count, merged in pending.values():
+        if target._state.adding or not merged:
+            continue
+        updated = OutboxMessage.objects.filter(pk=target.pk, status='pending', item_count=item_count).update(
+            subject=target.subject, body=target.body, item_count=target.item_count
+        )
+        if not updated:
+            new.extend(merged)
+
+    OutboxMessage.objects.bulk_create(new, batch_size=1000)
+
+
+def retry_delay(attempts):
+    """Exponential backoff with jitter: about 30s, 1m, 2m, ... capped at OUTBOX_MAX_BACKOFF"""
+    delay = min(settings.OUTBOX_RETRY_DELAY * 2 ** (attempts - 1), settings.OUTBOX_MAX_BACKOFF)
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def claim_messages(worker, limit):
+    """
+    Atomically move up to `limit` due messages to sending for this worker,
+    with the same conditional UPDATE the scoring job queue uses
+    """
+    now = timezone.now()
+    message_ids = list(
+        OutboxMessage.objects.filter(status='pending', next_attempt_at__lte=now)
+        .order_by('next_attempt_at').values_list('id', flat=True)[:limit]
+    )
+    OutboxMessage.objects.filter(id__in=message_ids, status='pending').update(
+        status='sending', worker=worker, claimed_at=now, attempts=F('attempts') + 1
+    )
+    return list(OutboxMessage.objects.filter(id__in=message_ids, status='sending', worker=worker))
+
+
+def requeue_stale_messages(older_than):
+    """Return messages of workers that died mid-batch to the queue"""
+    return OutboxMessage.objects.filter(
+        status='sending', claimed_at__lt=timezone.now() - timedelta(seconds=older_than)
+    ).update(status='pending', worker='')
+
+
+def deliver_messages(messages):
+    """
+    Send claimed messages over the worker's reused connections and record
+    each outcome. Failed ones are retried with backoff until
+    OUTBOX_MAX_ATTEMPTS. Messages for a provider whose circuit is open, and
+    those left when the batch runs past OUTBOX_BATCH_BUDGET seconds, go
+    back to the queue without using up an attempt. Returns (sent, failed, deferred).
+    """
+    deadline = time.monotonic() + settings.OUTBOX_BATCH_BUDGET
+    channel_seconds = {}
+    sent = failed = deferred = 0
+    for message in messages:
+        provider = PROVIDERS[message.channel]()
+        guard = breaker(provider)
+        if time.monotonic() >= deadline or not guard.allow():
+            deferred += 1
+            messages_total.inc(channel=message.channel, outcome='deferred')
+            message.status = 'pending'
+            message.attempts -= 1
+            message.next_attempt_at = timezone.now() + timedelta(seconds=guard.retry_after())
+            continue
+
+        started = time.perf_counter()
+        try:
+            SENDERS[message.channel](message)
+        except Exception as e:
+            guard.record_failure()
+            outcome = 'failed'
+            failed += 1
+            message.last_error = f"{type(e).__name__}: {e}"[:2000]
+            if message.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+                message.status = 'failed'
+            else:
+                message.status = 'pending'
+                message.next_attempt_at = timezone.now() + retry_delay(message.attempts)
+        else:
+            guard.record_success()
+            outcome = 'sent'
+            sent += 1
+            message.status = 'sent'
+            message.sent_at = timezone.now()
+            message.last_error = ''
+        elapsed = time.perf_counter() - started
+        provider_seconds.observe(elapsed, provider=provider, outcome=outcome)
+        messages_total.inc(channel=message.channel, outcome=outcome)
+        channel_seconds[message.channel] = channel_seconds.get(message.channel, 0) + elapsed
+
+    for channel, seconds in channel_seconds.items():
+        batch_seconds.observe(seconds, channel=channel)
+    bulk_update_rows(OutboxMessage, messages, ['status', 'attempts', 'next_attempt_at', 'sent_at', 'last_error'])
+    return sent, failed, deferred
@@ -0,0 +1,28 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from django.db import connections
+
+
+def chunked(iterable, size):
+    """Split an iterable into lists of at most `size` items"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def process_pool(workers):
+    """
+    Fork a process pool that inherits the configured Django setup.
+    Database connections are closed first so each child opens its own.
+    """
+    connections.close_all()
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('fork'),
+        initializer=connections.close_all,
+    )
@@ -0,0 +1,184 @@
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+
+import numpy as np
+import pandas as pd
+from django.core.cache import cache
+from django.db.models import Count, FloatField, Sum
+from django.db.models.functions import Cast, TruncMonth
+from django.utils import timezone
+
+from ai_engine.amortization import DAYS_PER_INSTALLMENT, to_money
+from .models import EMISchedule, LoanApplication
+
+
+# Loans whose installments count as expected collections
+PROJECTION_STATUSES = ['approved', 'disbursed']
+
+AMOUNT_KEYS = ['emi', 'principal', 'interest', 'outstanding_balance']
+
+
+def _add_months(day, months):
+    month = day.month - 1 + months
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+
+def _empty_bucket():
+    return {'installments': 0, **{key: 0.0 for key in AMOUNT_KEYS}}
+
+
+def stored_installments(start, end):
+    """Aggregate materialized installments by due month and status in the database"""
+    rows = (
+        EMISchedule.objects
+        .filter(application__status__in=PROJECTION_STATUSES, due_date__gte=start, due_date__lt=end)
+        .annotate(month=TruncMonth('due_date'))
+        .values('month', 'status')
+        .annotate(
+            installments=Count('id'),
+            emi=Sum('emi_amount'),
+            principal=Sum('principal_amount'),
+            interest=Sum('interest_amount'),
+            outstanding_balance=Sum('remaining_balance'),
+        )
+    )
+    for row in rows:
+        month = row['month']
+        if isinstance(month, datetime):
+            month = month.date()
+        yield month, row['status'], row
+
+
+def computed_installments(start, months):
+    """
+    NumPy projection for approved loans whose schedule is not materialized.
+
+    Each loan contributes only the installments that can fall inside the
+    window, so the work is (loans x months) regardless of tenure.
+    """
+    loans = (
+        LoanApplication.objects
+        .filter(status__in=PROJECTION_STATUSES, emi_schedules__isnull=True, submitted_at__isnull=False)
+        # Floats skip the per-value Decimal conversion of 100k+ rows
+        .annotate(
+            principal=Cast('loan_amount', FloatField()),
+            rate=Cast('interest_rate', FloatField()),
+            emi=Cast('monthly_emi', FloatField()),
+        )
+        .values_list('principal', 'rate', 'tenure_months', 'emi', 'submitted_at')
+    )
+    loans = list(loans)
+    totals = np.zeros((len(AMOUNT_KEYS) + 1, months))
+    if not loans:
+        return totals
+
+    principal, annual_rate, tenure, stored_emi, submitted_at = zip(*loans)
+    principal = np.array(principal, dtype=np.float64)
+    rate = np.array(annual_rate, dtype=np.float64) / (12 * 100)
+    tenure = np.array(tenure, dtype=np.int64)
+    stored_emi = np.array(stored_emi, dtype=np.float64)
+    anchor = (
+        pd.DatetimeIndex(submitted_at).tz_convert(timezone.get_current_timezone())
+        .tz_localize(None).values.astype('datetime64[D]')
+    )
+
+    has_rate = rate > 0
+    safe_rate = np.where(has_rate, rate, 1.0)
+    growth_n = np.power(1 + rate, tenure)
+    emi = np.where(has_rate, principal * rate * growth_n / np.where(has_rate, growth_n - 1, 1.0), principal / tenure)
+    emi = np.floor(emi * 100 + 0.5) / 100
+    emi = np.where(np.isnan(stored_emi), emi, stored_emi)
+
+    window_start = np.datetime64(start, 'D')
+    window_end = np.datetime64(_add_months(start, months), 'D')
+    first = np.maximum(1, -((anchor - window_start).astype(np.int64) // DAYS_PER_INSTALLMENT))
+    span = int((window_end - window_start).astype(np.int64)) // DAYS_PER_INSTALLMENT + 2
+
+    number = first[:, None] + np.arange(span)[None, :]
+    due = anchor[:, None] + (number * DAYS_PER_INSTALLMENT).astype('timedelta64[D]')
+    valid = (number <= tenure[:, None]) & (due >= window_start) & (due < window_end)
+
+    def balance_after(k):
+        growth = np.power(1 + rate[:, None], k)
+        annuity = np.where(has_rate[:, None], (growth - 1) / safe_rate[:, None], k)
+        return np.maximum(principal[:, None] * growth - emi[:, None] * annuity, 0)
+
+    opening = balance_after(number - 1)
+    interest = opening * rate[:, None]
+    last = number == tenure[:, None]
+    repaid = np.where(last, opening, emi[:, None] - interest)
+    closing = np.where(last, 0, balance_after(number))
+    amounts = {
+        'emi': repaid + interest,
+        'principal': repaid,
+        'interest': interest,
+        'outstanding_balance': closing,
+    }
+
+    month_index = (due.astype('datetime64[M]') - np.datetime64(start, 'M')).astype(np.int64)[valid]
+    totals[0] = np.bincount(month_index, minlength=months)[:months]
+    for position, key in enumerate(AMOUNT_KEYS, start=1):
+        totals[position] = np.bincount(month_index, weights=amounts[key][valid], minlength=months)[:months]
+    return totals
+
+
+def project_cash_flow(months=12, start=None):
+    """
+    Expected monthly collections (EMI, principal, interest) and outstanding
+    balance across approved and disbursed loans, grouped by month and
+    installment status
+    """
+    start = (start or timezone.localdate()).replace(day=1)
+    end = _add_months(start, months)
+    month_starts = [_add_months(start, offset) for offset in range(months)]
+    buckets = {month: defaultdict(_empty_bucket) for month in month_starts}
+
+    for month, status, row in stored_installments(start, end):
+        bucket = buckets[month][status]
+        bucket['installments'] += row['installments']
+        for key in AMOUNT_KEYS:
+            bucket[key] += float(row[key] or 0)
+
+    computed = computed_installments(start, months)
+    for offset, month in enumerate(month_starts):
+        if computed[0, offset]:
+            bucket = buckets[month]['pending']
+            bucket['installments'] += int(computed[0, offset])
+            for position, key in enumerate(AMOUNT_KEYS, start=1):
+                bucket[key] += computed[position, offset]
+
+    projection = []
+    for month in month_starts:
+        total = _empty_bucket()
+        by_status = {}
+        for status, bucket in sorted(buckets[month].items()):
+            for key in ['installments'] + AMOUNT_KEYS:
+                total[key] += bucket[key]
+            by_status[status] = _serialize_bucket(bucket)
+        projection.append({'month': month.strftime('%Y-%m'), **_serialize_bucket(total), 'by_status': by_status})
+
+    return {
+        'start': start.isoformat(),
+        'months': months,
+        'generated_at': timezone.now().isoformat(),
+        'projection': projection,
+    }
+
+
+def _serialize_bucket(bucket):
+    return {
+        'installments': int(bucket['installments']),
+        **{key: to_money(round(bucket[key], 2)) for key in AMOUNT_KEYS},
+    }
+
+
+def cached_cash_flow(months=12, refresh=False):
+    """Cash-flow projection computed at most once per day and horizon"""
+    today = timezone.localdate()
+    key = f'cash-flow:{today.isoformat()}:{months}'
+    result = None if refresh else cache.get(key)
+    if result is None:
+        result = project_cash_flow(months, today)
+        midnight = timezone.make_aware(datetime.combine(today + timedelta(days=1), time.min))
+        cache.set(key, result, max(60, int((midnight - timezone.now()).total_seconds())))
+    return result
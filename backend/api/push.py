@@ -0,0 +1,370 @@
+import asyncio
+import json
+import logging
+import os
+import secrets
+import socket
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core import signing
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .metrics import counter
+from .models import PushEvent, PushListener, PushTicket, User
+from .parallel import chunked
+
+logger = logging.getLogger(__name__)
+
+push_connections = counter('push_connections_total', 'Push streams opened')
+push_events = counter('push_events_total', 'Events written to push streams, by event')
+
+PUSH_TICKET_SALT = 'api.push.ticket'
+
+# Users looked up per query when filtering published events by listener
+LISTENER_BATCH_SIZE = 2000
+
+
+class Subscription:
+    """One open stream: a bounded queue filled on the event loop that serves it"""
+
+    def __init__(self, user_id, loop):
+        self.user_id = user_id
+        self.loop = loop
+        self.queue = asyncio.Queue(settings.PUSH_QUEUE_SIZE)
+
+    def deliver(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # The client stopped reading; end the stream and let it reconnect
+            self.close()
+
+    def close(self):
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+
+class MemoryBroker:
+    """
+    Fans events out to the streams open in this process. Events published
+    by other processes (other web workers, management commands) are not seen.
+    """
+
+    def __init__(self):
+        self.subscribers = defaultdict(set)
+        self.lock = threading.Lock()
+
+    async def subscribe(self, user_id):
+        subscription = Subscription(user_id, asyncio.get_running_loop())
+        with self.lock:
+            self.subscribers[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            subscribers = self.subscribers.get(subscription.user_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self.subscribers[subscription.user_id]
+
+    def publish(self, events):
+        for user_id, event in events:
+            self.dispatch(user_id, event)
+
+    def dispatch(self, user_id, event):
+        """Hand an event to the user's streams; safe to call from any thread"""
+        with self.lock:
+            subscriptions = list(self.subscribers.get(user_id, ()))
+        for subscription in subscriptions:
+            subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+
+
+class DatabaseBroker(MemoryBroker):
+    """
+    Publishes through the push_events table, so events reach streams in
+    every process. Each process reads new rows once per PUSH_POLL_INTERVAL
+    for all of its streams, instead of every client polling the API.
+    Processes record the users they hold streams for in push_listeners, and
+    events for anyone else are never written.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.process = f'{socket.gethostname()}:{os.getpid()}:{id(self):x}'
+        self.poller = None
+        self.pruned_at = 0
+
+    async def subscribe(self, user_id):
+        subscription = await super().subscribe(user_id)
+        if self.poller is None or self.poller.done():
+            self.poller = subscription.loop.create_task(self.poll())
+        try:
+            await sync_to_async(self.listen)([user_id])
+        except Exception:
+            # The poller records the stream on its next refresh
+            logger.exception("Recording push listener failed")
+        return subscription
+
+    def publish(self, events):
+        self.prune()
+        listening = self.listening({user_id for user_id, _ in events})
+        rows = [
+            PushEvent(user_id=user_id, event=event['event'], data=event['data'])
+            for user_id, event in events if user_id in listening
+        ]
+        if rows:
+            PushEvent.objects.bulk_create(rows, batch_size=1000)
+
+    def listening(self, user_ids):
+        """Those of `user_ids` with an open stream in some process"""
+        listening = set()
+        for chunk in chunked(sorted(user_ids), LISTENER_BATCH_SIZE):
+            listening.update(
+                PushListener.objects.filter(user_id__in=chunk, expires_at__gt=timezone.now())
+                .values_list('user_id', flat=True)
+            )
+        return listening
+
+    def listen(self, user_ids, replace=False):
+        """
+        Record or refresh this process's streams of `user_ids` for
+        PUSH_LISTENER_TTL; `replace` also forgets the users not among them
+        """
+        close_old_connections()
+        expires_at = timezone.now() + timedelta(seconds=settings.PUSH_LISTENER_TTL)
+        with transaction.atomic():
+            if replace:
+                PushListener.objects.filter(process=self.process).exclude(user_id__in=user_ids).delete()
+            PushListener.objects.bulk_create(
+                [PushListener(process=self.process, user_id=user_id, expires_at=expires_at) for user_id in user_ids],
+                update_conflicts=True, unique_fields=['process', 'user'], update_fields=['expires_at'],
+            )
+
+    def prune(self):
+        """Delete expired events and listeners, at most once per PUSH_EVENT_TTL"""
+        if time.monotonic() - self.pruned_at < settings.PUSH_EVENT_TTL:
+            return
+        self.pruned_at = time.monotonic()
+        now = timezone.now()
+        PushEvent.objects.filter(created_at__lt=now - timedelta(seconds=settings.PUSH_EVENT_TTL)).delete()
+        PushListener.objects.filter(expires_at__lt=now).delete()
+
+    async def poll(self):
+        # Events already written were published before any stream of this process opened
+        seen = await sync_to_async(self.recent_events)()
+        listened_at = time.monotonic()
+        while True:
+            await asyncio.sleep(settings.PUSH_POLL_INTERVAL)
+            with self.lock:
+                user_ids = list(self.subscribers)
+            try:
+                if not user_ids:
+                    await sync_to_async(self.listen)([], replace=True)
+                    if not self.subscribers:
+                        # The next subscribe starts a new poller
+                        return
+                    # Streams opened meanwhile are recorded on the next pass
+                    listened_at = 0
+                    continue
+                if time.monotonic() - listened_at >= settings.PUSH_LISTENER_TTL / 3:
+                    await sync_to_async(self.listen)(user_ids, replace=True)
+                    listened_at = time.monotonic()
+                rows = await sync_to_async(self.read)(seen)
+            except Exception:
+                logger.exception("Reading push events failed")
+                continue
+            for user_id, event, data in rows:
+                self.dispatch(user_id, {'event': event, 'data': data})
+
+    def recent_events(self):
+        """{id: created_at} of the events within PUSH_COMMIT_WINDOW"""
+        close_old_connections()
+        return dict(PushEvent.objects.filter(created_at__gte=self.window_start()).values_list('id', 'created_at'))
+
+    def window_start(self):
+        return timezone.now() - timedelta(seconds=settings.PUSH_COMMIT_WINDOW)
+
+    def read(self, seen):
+        """
+        (user_id, event, data) of the events within PUSH_COMMIT_WINDOW that
+        are not in `seen`, which is updated in place. Rereading the window
+        rather than reading past the highest id seen also delivers rows that
+        committed after rows with higher ids.
+        """
+        close_old_connections()
+        since = self.window_start()
+        rows = list(
+            PushEvent.objects.filter(created_at__gte=since).order_by('id')
+            .values_list('id', 'created_at', 'user_id', 'event', 'data')
+        )
+        for event_id in [event_id for event_id, created_at in seen.items() if created_at < since]:
+            del seen[event_id]
+        rows = [row for row in rows if row[0] not in seen]
+        seen.update((row[0], row[1]) for row in rows)
+        return [row[2:] for row in rows]
+
+
+BROKERS = {
+    'memory': MemoryBroker,
+    'database': DatabaseBroker,
+}
+
+_broker = None
+_broker_name = None
+_broker_lock = threading.Lock()
+
+
+def push_broker():
+    """Broker chosen by PUSH_BROKER, created once per process"""
+    global _broker, _broker_name
+    name = settings.PUSH_BROKER
+    if name != _broker_name:
+        with _broker_lock:
+            if name not in BROKERS:
+                raise ValueError(f"Unknown PUSH_BROKER: {name}")
+            _broker, _broker_name = BROKERS[name](), name
+    return _broker
+
+
+def publish(events):
+    """Push [(user_id, event, data)] to the users' streams once the current transaction commits"""
+    events = [(user_id, {'event': event, 'data': data}) for user_id, event, data in events]
+    if events:
+        transaction.on_commit(lambda: push_broker().publish(events))
+
+
+def notification_event(notification):
+    return (notification.user_id, 'notification', {
+        'id': str(notification.id),
+        'title': notification.title,
+        'message': notification.message,
+        'created_at': notification.created_at.isoformat(),
+    })
+
+
+def loan_status_event(loan, previous_status):
+    return (loan.customer_id, 'loan_status', {
+        'id': str(loan.id),
+        'application_number': loan.application_number,
+        'status': loan.status,
+        'previous_status': previous_status,
+    })
+
+
+def issue_ticket(user, expires_at):
+    """
+    Signed ticket that opens the user's stream once, within
+    PUSH_TICKET_MAX_AGE seconds. EventSource cannot send an Authorization
+    header, and a query string ends up in access logs, so the stream takes
+    this instead of the access token; its nonce is deleted when redeemed, so
+    a logged ticket cannot be replayed. The stream ends at `expires_at`, the
+    access token's expiry.
+    """
+    now = timezone.now()
+    nonce = secrets.token_urlsafe(16)
+    PushTicket.objects.filter(expires_at__lte=now).delete()
+    PushTicket.objects.create(
+        nonce=nonce, user=user, expires_at=now + timedelta(seconds=settings.PUSH_TICKET_MAX_AGE)
+    )
+    return signing.dumps({'user': user.pk, 'exp': expires_at, 'nonce': nonce}, salt=PUSH_TICKET_SALT)
+
+
+def redeem_ticket(ticket):
+    """(user_id, expires_at) of a fresh, unused ticket of an active user, else None"""
+    try:
+        payload = signing.loads(ticket, salt=PUSH_TICKET_SALT, max_age=settings.PUSH_TICKET_MAX_AGE)
+    except signing.BadSignature:
+        return None
+    if payload['exp'] <= time.time() or 'nonce' not in payload:
+        return None
+    close_old_connections()
+    redeemed, _ = PushTicket.objects.filter(
+        nonce=payload['nonce'], user_id=payload['user'], expires_at__gt=timezone.now()
+    ).delete()
+    if not redeemed or not User.objects.filter(pk=payload['user'], is_active=True).exists():
+        return None
+    return payload['user'], payload['exp']
+
+
+def format_event(event):
+    return f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n".encode()
+
+
+def cors_headers(headers):
+    origin = headers.get(b'origin', b'').decode()
+    if origin and (settings.CORS_ALLOW_ALL_ORIGINS or origin in getattr(settings, 'CORS_ALLOWED_ORIGINS', [])):
+        return [(b'access-control-allow-origin', origin.encode()), (b'vary', b'Origin')]
+    return []
+
+
+async def push_application(scope, receive, send):
+    """
+    ASGI endpoint streaming a user's new notifications and loan status
+    changes as server-sent events, opened with a ?ticket= from
+    POST /api/push/ticket/. It bypasses the Django stack: an open stream is
+    a queue and a suspended coroutine, and a client disconnect ends it
+    (Django 4.2 does not notice disconnects on streaming responses).
+    """
+    headers = dict(scope['headers'])
+    query = parse_qs(scope['query_string'].decode())
+    redeemed = await sync_to_async(redeem_ticket)(query.get('ticket', [''])[0])
+    if redeemed is None:
+        await send({
+            'type': 'http.response.start', 'status': 401,
+            'headers': [(b'content-type', b'application/json')] + cors_headers(headers),
+        })
+        await send({'type': 'http.response.body', 'body': b'{"error": "Invalid ticket"}'})
+        return
+    user_id, expires_at = redeemed
+
+    await send({
+        'type': 'http.response.start', 'status': 200,
+        'headers': [
+            (b'content-type', b'text/event-stream'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'),
+        ] + cors_headers(headers),
+    })
+    push_connections.inc()
+
+    broker = push_broker()
+    subscription = await broker.subscribe(user_id)
+
+    async def watch_disconnect():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        subscription.close()
+
+    watcher = asyncio.ensure_future(watch_disconnect())
+    try:
+        await send({'type': 'http.response.body', 'body': b'retry: 5000\n\n', 'more_body': True})
+        while True:
+            remaining = expires_at - time.time()
+            if remaining <= 0:
+                # The access token the ticket was issued for has expired
+                break
+            try:
+                event = await asyncio.wait_for(
+                    subscription.queue.get(), min(settings.PUSH_HEARTBEAT_SECONDS, remaining)
+                )
+            except asyncio.TimeoutError:
+                if time.time() < expires_at:
+                    await send({'type': 'http.response.body', 'body': b': keep-alive\n\n', 'more_body': True})
+                continue
+            if event is None:
+                break
+            push_events.inc(event=event['event'])
+            await send({'type': 'http.response.body', 'body': format_event(event), 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        watcher.cancel()
+        broker.unsubscribe(subscription)
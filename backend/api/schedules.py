@@ -0,0 +1,241 @@
+import heapq
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.validators import MaxValueValidator
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from ai_engine.amortization import DAYS_PER_INSTALLMENT, amortize, to_money, from_cents
+from .bulk import bulk_update_rows
+from .feature_store import refresh_features
+from .models import EMISchedule, LoanApplication
+
+
+# Rows per INSERT statement when writing schedules in bulk
+BULK_BATCH_SIZE = 500
+
+# Longest tenure a loan application accepts, from the model's validator;
+# bounds the decoding of virtual row IDs
+MAX_TENURE_MONTHS = min(
+    validator.limit_value
+    for validator in LoanApplication._meta.get_field('tenure_months').validators
+    if isinstance(validator, MaxValueValidator)
+)
+
+# Amount columns rewritten when unpaid installments are re-amortized
+REPRICED_FIELDS = ['emi_amount', 'principal_amount', 'interest_amount', 'remaining_balance']
+
+
+def schedule_start_date(loan):
+    """Installments are counted from the day the application was submitted"""
+    if loan.submitted_at:
+        return timezone.localdate(loan.submitted_at)
+    return timezone.localdate()
+
+
+def build_emi_schedule(loan):
+    """Return unsaved EMISchedule rows for the full tenure of a loan"""
+    schedule = amortize(loan.loan_amount, loan.interest_rate, loan.tenure_months, emi=loan.monthly_emi)
+    return [
+        EMISchedule(application=loan, **row)
+        for row in schedule.rows(schedule_start_date(loan))
+    ]
+
+
+def create_emi_schedule(loan):
+    """Write the full schedule of a loan with a single chunked bulk insert"""
+    return EMISchedule.objects.bulk_create(build_emi_schedule(loan), batch_size=BULK_BATCH_SIZE)
+
+
+def is_lazy_schedule_mode():
+    return settings.EMI_SCHEDULE_MODE == 'lazy'
+
+
+def virtual_row_id(loan_id, emi_number):
+    """
+    ID of a computed installment: the loan ID with the installment number
+    XORed into its low bits, so it is stable and can be decoded back
+    """
+    return uuid.UUID(int=loan_id.int ^ emi_number)
+
+
+def virtual_row_candidates(row_id):
+    """{possible loan ID: installment number} a virtual row ID may decode to"""
+    return {uuid.UUID(int=row_id.int ^ number): number for number in range(1, MAX_TENURE_MONTHS + 1)}
+
+
+def virtual_emi_schedule(loan):
+    """
+    Compute the schedule of a loan on demand without touching emi_schedules.
+    Row IDs are derived from the loan so they stay stable between requests.
+    """
+    rows = build_emi_schedule(loan)
+    for row in rows:
+        row.id = virtual_row_id(loan.id, row.emi_number)
+    return rows
+
+
+def find_virtual_row(lazy_loans, row_id):
+    """The computed installment with this ID among `lazy_loans`, or None"""
+    try:
+        candidates = virtual_row_candidates(uuid.UUID(str(row_id)))
+    except ValueError:
+        return None
+    loan = lazy_loans.filter(id__in=list(candidates)).first()
+    if loan is None or candidates[loan.id] > loan.tenure_months:
+        return None
+    return virtual_emi_schedule(loan)[candidates[loan.id] - 1]
+
+
+class ScheduleRows:
+    """
+    Stored installments followed by the computed schedules of lazy loans,
+    sliceable like a queryset. Counting and slicing only build the
+    schedules of the loans that fall inside the requested slice.
+    """
+
+    def __init__(self, stored, lazy_loans):
+        self.stored = stored.order_by('application_id', 'emi_number')
+        self.lazy_loans = lazy_loans.order_by('created_at', 'id')
+
+    def stored_count(self):
+        if not hasattr(self, '_stored_count'):
+            self._stored_count = self.stored.count()
+        return self._stored_count
+
+    def count(self):
+        virtual = self.lazy_loans.aggregate(rows=Sum('tenure_months'))['rows'] or 0
+        return self.stored_count() + virtual
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice) or index.step is not None:
+            raise TypeError("ScheduleRows only supports slices")
+        start, stop = index.start or 0, index.stop
+        stored = self.stored_count()
+        rows = list(self.stored[start:stop]) if start < stored else []
+
+        # Offsets into the computed rows that remain to be returned
+        offset = max(start - stored, 0)
+        end = None if stop is None else stop - stored
+        if end is not None and end <= offset:
+            return rows
+
+        wanted, position, first_position = [], 0, None
+        for loan_id, tenure in self.lazy_loans.values_list('id', 'tenure_months'):
+            if end is not None and position >= end:
+                break
+            if position + tenure > offset:
+                if first_position is None:
+                    first_position = position
+                wanted.append(loan_id)
+            position += tenure
+        if not wanted:
+            return rows
+
+        loans = {loan.id: loan for loan in self.lazy_loans.filter(id__in=wanted)}
+        virtual = [row for loan_id in wanted for row in virtual_emi_schedule(loans[loan_id])]
+        return rows + virtual[offset - first_position:None if end is None else end - first_position]
+
+
+def upcoming_virtual_rows(lazy_loans, today, limit):
+    """
+    The `limit` earliest computed installments due from today on. Due dates
+    follow from each loan's start date, so only the schedules of the loans
+    owning those installments are computed.
+    """
+    candidates = []
+    for loan_id, submitted_at, tenure in lazy_loans.values_list('id', 'submitted_at', 'tenure_months'):
+        start = timezone.localdate(submitted_at) if submitted_at else timezone.localdate()
+        first = max(-(-(today - start).days // DAYS_PER_INSTALLMENT), 1)
+        for number in range(first, min(first + limit, tenure + 1)):
+            candidates.append((start + timedelta(days=DAYS_PER_INSTALLMENT * number), str(loan_id), number))
+
+    chosen = heapq.nsmallest(limit, candidates)
+    loans = {str(loan.id): loan for loan in lazy_loans.filter(id__in={loan_id for _, loan_id, _ in chosen})}
+    schedules = {loan_id: virtual_emi_schedule(loan) for loan_id, loan in loans.items()}
+    return [schedules[loan_id][number - 1] for _, loan_id, number in chosen]
+
+
+def emi_schedule_for(loan):
+    """Stored rows when the schedule is materialized, computed rows otherwise"""
+    rows = list(loan.emi_schedules.all())
+    if rows or loan.status == 'disbursed':
+        return rows
+    return virtual_emi_schedule(loan)
+
+
+def materialize_emi_schedule(loan):
+    """
+    Persist the schedule of a loan unless its rows already exist, keeping
+    the IDs the computed rows were served with
+    """
+    if loan.emi_schedules.exists():
+        return []
+    return EMISchedule.objects.bulk_create(virtual_emi_schedule(loan), batch_size=BULK_BATCH_SIZE)
+
+
+def reprice_loans(loan_ids, annual_rate):
+    """
+    Move a batch of loans to a new interest rate in one transaction.
+
+    Installments that are not pending (paid, partially paid, overdue) are
+    kept as they are. The principal they do not cover is re-amortized over
+    the installments left and written to the pending rows, in order, with
+    bulk update/insert.
+    """
+    annual_rate = to_money(annual_rate)
+    to_update, to_create = [], []
+
+    with transaction.atomic():
+        loans = list(LoanApplication.objects.filter(id__in=loan_ids))
+        rows_by_loan = defaultdict(list)
+        for row in EMISchedule.objects.filter(application_id__in=loan_ids).order_by('emi_number'):
+            rows_by_loan[row.application_id].append(row)
+
+        for loan in loans:
+            rows = rows_by_loan.get(loan.id, [])
+            kept = [row for row in rows if row.status != 'pending']
+            pending = [row for row in rows if row.status == 'pending']
+
+            balance = loan.loan_amount - sum((row.principal_amount for row in kept), Decimal('0'))
+            remaining = loan.tenure_months - len(kept)
+            loan.interest_rate = annual_rate
+            if remaining <= 0 or balance <= 0:
+                continue
+
+            schedule = amortize(balance, annual_rate, remaining)
+            loan.monthly_emi = from_cents(schedule.emi_amount[0])
+            if not rows:
+                continue
+
+            # Pending installments take the new amounts in order; installments
+            # past the stored ones are added after the last of them
+            last = rows[-1].emi_number
+            slots = pending + list(range(last + 1, last + 1 + remaining - len(pending)))
+            start = schedule_start_date(loan)
+            for slot, values in zip(slots, schedule.rows(start)):
+                if isinstance(slot, int):
+                    values.update(
+                        emi_number=slot, due_date=start + timedelta(days=DAYS_PER_INSTALLMENT * slot)
+                    )
+                    to_create.append(EMISchedule(application=loan, **values))
+                    continue
+                for field in REPRICED_FIELDS:
+                    setattr(slot, field, values[field])
+                to_update.append(slot)
+
+        bulk_update_rows(EMISchedule, to_update, REPRICED_FIELDS)
+        EMISchedule.objects.bulk_create(to_create, batch_size=BULK_BATCH_SIZE)
+        bulk_update_rows(LoanApplication, loans, ['interest_rate', 'monthly_emi', 'updated_at'])
+        # Bulk writes skip signals, so refresh the stored features here
+        refresh_features(loan_ids)
+
+    return len(loans)
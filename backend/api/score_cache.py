@@ -0,0 +1,108 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .caching import cache_is_shared
+from .feature_store import stored_features
+from .metrics import counter
+
+
+cache_hits = counter('credit_score_cache_hits_total', 'Credit scores served from the score cache')
+cache_misses = counter('credit_score_cache_misses_total', 'Credit scores computed because the cache had no entry')
+
+
+def feature_hash(scorer, features):
+    """Hash of the extracted features plus everything that changes how they are scored"""
+    payload = json.dumps(
+        {'version': scorer.version, 'rules': scorer.rules.fingerprint, 'weights': scorer.weights, 'features': features},
+        sort_keys=True, default=str,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def loan_key(loan_id):
+    return f'credit-score:loan:{loan_id}'
+
+
+def result_key(digest):
+    return f'credit-score:features:{digest}'
+
+
+def scorer_identity(scorer):
+    """Everything a pointer's result depends on besides the features: rule table and model"""
+    return f'{scorer.version}:{scorer.rules.fingerprint}'
+
+
+def cached_score(scorer, loan):
+    """
+    score_application through the cache.
+
+    Features come from the feature store rather than the vehicle and
+    customer rows. Results are stored under the feature hash; a per-loan
+    pointer to that hash lets repeated requests skip even that. Signals
+    drop the pointer when the loan, its vehicle price or the customer's
+    date of birth change.
+    """
+    result = _pointed_score(scorer, loan)
+    if result is not None:
+        return result
+
+    try:
+        features = stored_features(loan)
+    except Exception:
+        # Let score_application report the error without caching it
+        return scorer.score_application(loan)
+
+    digest = feature_hash(scorer, features)
+    result = cache.get(result_key(digest))
+    if result is not None:
+        cache_hits.inc(layer='features')
+    else:
+        cache_misses.inc()
+        result = scorer.score_extracted(features)
+        cache.set(result_key(digest), result, settings.SCORE_CACHE_TTL)
+
+    if cache_is_shared():
+        cache.set(loan_key(loan.id), (digest, scorer_identity(scorer)), settings.SCORE_CACHE_TTL)
+    return tuple(result)
+
+
+def peek_cached_score(scorer, loan):
+    """Cached result for a loan under the scorer's current rules and model, without scoring"""
+    result = _pointed_score(scorer, loan)
+    if result is not None:
+        return result
+
+    try:
+        features = stored_features(loan)
+    except Exception:
+        return None
+    result = cache.get(result_key(feature_hash(scorer, features)))
+    if result is not None:
+        cache_hits.inc(layer='features')
+        return tuple(result)
+    return None
+
+
+def _pointed_score(scorer, loan):
+    """
+    Result behind the loan's pointer if it was stored under the same rules
+    and model. Pointers are only used with a shared cache: with a
+    per-process cache, another worker's invalidation never reaches them.
+    """
+    if not cache_is_shared():
+        return None
+    pointer = cache.get(loan_key(loan.id))
+    if not isinstance(pointer, tuple) or pointer[1] != scorer_identity(scorer):
+        return None
+    result = cache.get(result_key(pointer[0]))
+    if result is not None:
+        cache_hits.inc(layer='loan')
+        return tuple(result)
+    return None
+
+
+def invalidate_scores(loan_ids):
+    cache.delete_many([loan_key(loan_id) for loan_id in loan_ids])
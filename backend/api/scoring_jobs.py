@@ -0,0 +1,113 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+from ai_engine.credit_scorer import CreditScorer
+from .bulk import bulk_update_rows
+from .feature_store import feature_frame
+from .models import LoanApplication, ScoringJob
+
+
+# A failing job is retried until it has been attempted this many times
+MAX_ATTEMPTS = 3
+
+
+def enqueue_scoring(loan, user=None):
+    """Queue a scoring job for a loan unless one is already waiting or running"""
+    job = loan.scoring_jobs.filter(status__in=['pending', 'running']).first()
+    if job is None:
+        job = ScoringJob.objects.create(application=loan, requested_by=user)
+    return job
+
+
+def claim_jobs(worker, limit):
+    """
+    Atomically move up to `limit` pending jobs to running for this worker.
+    The conditional UPDATE makes concurrent workers skip each other's jobs
+    without needing SELECT ... FOR UPDATE support from the database.
+    """
+    job_ids = list(
+        ScoringJob.objects.filter(status='pending').order_by('created_at').values_list('id', flat=True)[:limit]
+    )
+    ScoringJob.objects.filter(id__in=job_ids, status='pending').update(
+        status='running', worker=worker, started_at=timezone.now(), attempts=F('attempts') + 1
+    )
+    return list(ScoringJob.objects.filter(id__in=job_ids, status='running', worker=worker).values_list('id', flat=True))
+
+
+def requeue_stale_jobs(older_than):
+    """
+    Return jobs of workers that died mid-batch to the queue. Jobs that
+    already used their MAX_ATTEMPTS fail instead, so a loan that crashes
+    the worker is not retried forever. Returns (requeued, failed).
+    """
+    stale = ScoringJob.objects.filter(
+        status='running', started_at__lt=timezone.now() - timedelta(seconds=older_than)
+    )
+    failed = stale.filter(attempts__gte=MAX_ATTEMPTS).update(
+        status='failed', finished_at=timezone.now(), error='Worker stopped while scoring'
+    )
+    return stale.update(status='pending', worker=''), failed
+
+
+def score_loans(scorer, loan_ids):
+    """
+    Score loans with the batch scorer. If the batch fails, the loans are
+    scored one at a time so a bad one only fails its own jobs.
+    Returns ({loan_id: result row}, {loan_id: error}).
+    """
+    try:
+        return dict(scorer.score_features(feature_frame(loan_ids)).iterrows()), {}
+    except Exception:
+        pass
+
+    results, errors = {}, {}
+    for loan_id in loan_ids:
+        try:
+            results.update(scorer.score_features(feature_frame([loan_id])).iterrows())
+        except Exception as e:
+            errors[loan_id] = str(e)
+    return results, errors
+
+
+def process_jobs(job_ids):
+    """
+    Score the loans of claimed jobs with the batch scorer and store the
+    results. Runs in the worker process that claimed the jobs. Jobs whose
+    loan could not be scored are retried until MAX_ATTEMPTS, the others
+    complete. Returns the number of completed jobs.
+    """
+    jobs = ScoringJob.objects.filter(id__in=job_ids)
+    loan_ids = list(jobs.values_list('application_id', flat=True).distinct())
+
+    results, errors = score_loans(CreditScorer(), loan_ids)
+    for loan_id in set(loan_ids) - set(results) - set(errors):
+        errors[loan_id] = 'Application not found'
+
+    try:
+        with transaction.atomic():
+            bulk_update_rows(LoanApplication, [
+                LoanApplication(
+                    id=loan_id,
+                    credit_score=int(row.credit_score),
+                    fraud_risk_level=row.risk_level,
+                    ai_recommendation=row.recommendation,
+                )
+                for loan_id, row in results.items()
+            ], ['credit_score', 'fraud_risk_level', 'ai_recommendation'])
+            completed = jobs.filter(application_id__in=list(results)).update(
+                status='completed', finished_at=timezone.now(), error=''
+            )
+    except Exception as e:
+        errors = {loan_id: str(e) for loan_id in loan_ids}
+        completed = 0
+
+    for loan_id, error in errors.items():
+        jobs.filter(application_id=loan_id).update(
+            status=Case(When(attempts__gte=MAX_ATTEMPTS, then=Value('failed')), default=Value('pending')),
+            finished_at=timezone.now(),
+            error=error,
+        )
+    return completed
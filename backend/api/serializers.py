@@ -3,6 +3,8 @@ from .models import (
     User, Vehicle, LoanApplication, Document, 
     EMISchedule, Payment, Notification, ChatMessage
 )
+from .document_metadata import METADATA_FIELDS
+from .schedules import emi_schedule_for
 
 class UserSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=True, min_length=8)
@@ -56,11 +58,27 @@ class VehicleSerializer(serializers.ModelSerializer):
 
 
 class DocumentSerializer(serializers.ModelSerializer):
+    """What customers see of their own uploads"""
     verified_by_name = serializers.CharField(source='verified_by.get_full_name', read_only=True)
     
     class Meta:
         model = Document
-        fields = '__all__'
+        fields = ['id', 'application', 'document_type', 'file', 'status', 'verified_by', 'verified_by_name',
+                  'verification_notes', 'uploaded_at', 'verified_at']
+        read_only_fields = ['status', 'verified_by', 'verification_notes', 'verified_at']
+
+
+class DocumentReviewSerializer(DocumentSerializer):
+    """Staff view of a document, with the metadata and hashes the fraud checks use"""
+    
+    class Meta(DocumentSerializer.Meta):
+        fields = DocumentSerializer.Meta.fields + METADATA_FIELDS + ['duplicate_of']
+        read_only_fields = METADATA_FIELDS + ['duplicate_of']
+
+
+def document_serializer_class(user):
+    """Customers never see the fraud metadata of documents"""
+    return DocumentSerializer if user.user_type == 'customer' else DocumentReviewSerializer
 
 
 class EMIScheduleSerializer(serializers.ModelSerializer):
@@ -78,14 +96,24 @@ class PaymentSerializer(serializers.ModelSerializer):
 class LoanApplicationSerializer(serializers.ModelSerializer):
     customer_name = serializers.CharField(source='customer.get_full_name', read_only=True)
     vehicle_name = serializers.CharField(source='vehicle.__str__', read_only=True)
-    documents = DocumentSerializer(many=True, read_only=True)
-    emi_schedules = EMIScheduleSerializer(many=True, read_only=True)
+    documents = serializers.SerializerMethodField()
+    emi_schedules = serializers.SerializerMethodField()
     
     class Meta:
         model = LoanApplication
         fields = '__all__'
         read_only_fields = ['application_number', 'credit_score', 'fraud_risk_level', 
-                           'ai_recommendation', 'verified_by', 'approved_by']
+                           'ai_recommendation', 'fraud_flags', 'fraud_probability', 'fraud_checked_at', 'submitted_ip',
+                           'verified_by', 'approved_by']
+    
+    def get_documents(self, obj):
+        request = self.context.get('request')
+        serializer_class = document_serializer_class(request.user) if request else DocumentSerializer
+        return serializer_class(obj.documents.all(), many=True, context=self.context).data
+    
+    def get_emi_schedules(self, obj):
+        """Stored installments, or the computed schedule until disbursal"""
+        return EMIScheduleSerializer(emi_schedule_for(obj), many=True).data
 
 
 class NotificationSerializer(serializers.ModelSerializer):
@@ -94,6 +122,19 @@ class NotificationSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+class EMIQuoteSerializer(serializers.Serializer):
+    """One (principal, rate, tenure) triple for the public EMI calculator"""
+    principal = serializers.DecimalField(max_digits=12, decimal_places=2, min_value=1)
+    rate = serializers.DecimalField(max_digits=5, decimal_places=2, min_value=0, max_value=99, default=12)
+    tenure = serializers.IntegerField(min_value=1, max_value=600)
+
+
+class PrepaymentSerializer(serializers.Serializer):
+    """A prepayment made right after installment `month` has been paid"""
+    amount = serializers.DecimalField(max_digits=12, decimal_places=2, min_value=1)
+    month = serializers.IntegerField(min_value=0)
+
+
 class ChatMessageSerializer(serializers.ModelSerializer):
     class Meta:
         model = ChatMessage
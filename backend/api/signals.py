@@ -0,0 +1,131 @@
+from django.db.models.signals import post_init, post_save, pre_save
+from django.dispatch import receiver
+
+from .document_index import find_duplicate
+from .document_metadata import capture_metadata
+from .feature_store import SOURCE_FIELDS, refresh_features, update_birth_date
+from .identity_links import IDENTITY_FIELDS, link_user, refresh_exposure
+from .models import Document, LoanApplication, User, Vehicle
+from .push import loan_status_event, publish
+from .schedules import materialize_emi_schedule
+from .score_cache import invalidate_scores
+
+
+# Fields written by AI scoring itself; saving only these keeps cached scores
+SCORE_FIELDS = {'credit_score', 'fraud_risk_level', 'ai_recommendation', 'updated_at'}
+
+# Value of a field left out of a deferred load (.only()/.defer())
+UNKNOWN = object()
+
+
+def loaded_values(instance, fields):
+    """
+    The instance's current field values, without fetching deferred ones:
+    reading a deferred field in post_init loads another deferred instance,
+    whose post_init reads it again
+    """
+    return {field: instance.__dict__.get(field, UNKNOWN) for field in fields}
+
+
+def values_changed(loaded, current):
+    """Whether a field saved with a value was changed or not known when loaded"""
+    return any(
+        value is not UNKNOWN and (loaded[field] is UNKNOWN or value != loaded[field])
+        for field, value in current.items()
+    )
+
+
+@receiver(post_save, sender=LoanApplication)
+def materialize_schedule_on_disbursal(sender, instance, **kwargs):
+    """Lazily computed schedules become real rows once the loan is disbursed"""
+    if instance.status == 'disbursed':
+        materialize_emi_schedule(instance)
+
+
+@receiver(post_save, sender=LoanApplication)
+def invalidate_loan_score(sender, instance, created, update_fields=None, **kwargs):
+    if created or (update_fields and set(update_fields) <= SCORE_FIELDS):
+        return
+    invalidate_scores([instance.id])
+
+
+@receiver(post_save, sender=LoanApplication)
+def refresh_loan_features(sender, instance, created, update_fields=None, **kwargs):
+    if not created and update_fields and not set(update_fields) & SOURCE_FIELDS:
+        return
+    refresh_features([instance.id])
+
+
+@receiver(post_save, sender=LoanApplication)
+def refresh_cluster_exposure(sender, instance, created, update_fields=None, **kwargs):
+    if not created and update_fields and not set(update_fields) & {'status', 'loan_amount'}:
+        return
+    refresh_exposure(instance.customer_id)
+
+
+@receiver(post_init, sender=LoanApplication)
+def remember_loan_status(sender, instance, **kwargs):
+    # Rows loaded with .only() without status must not fetch it here
+    instance._loaded_status = instance.__dict__.get('status')
+
+
+@receiver(post_save, sender=LoanApplication)
+def push_loan_status(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields and 'status' not in update_fields:
+        return
+    if created or instance._loaded_status not in (None, instance.status):
+        publish([loan_status_event(instance, None if created else instance._loaded_status)])
+    instance._loaded_status = instance.status
+
+
+@receiver(post_init, sender=Vehicle)
+def remember_vehicle_price(sender, instance, **kwargs):
+    instance._loaded_price = loaded_values(instance, ['price'])
+
+
+@receiver(post_save, sender=Vehicle)
+def invalidate_scores_on_price_change(sender, instance, created, **kwargs):
+    price = loaded_values(instance, ['price'])
+    if not created and values_changed(instance._loaded_price, price):
+        loan_ids = list(instance.loan_applications.values_list('id', flat=True))
+        refresh_features(loan_ids)
+        invalidate_scores(loan_ids)
+    instance._loaded_price = price
+
+
+@receiver(post_init, sender=User)
+def remember_date_of_birth(sender, instance, **kwargs):
+    instance._loaded_date_of_birth = loaded_values(instance, ['date_of_birth'])
+
+
+@receiver(post_init, sender=User)
+def remember_identifiers(sender, instance, **kwargs):
+    instance._loaded_identifiers = loaded_values(instance, IDENTITY_FIELDS.values())
+
+
+@receiver(post_save, sender=User)
+def link_identities(sender, instance, created, **kwargs):
+    identifiers = loaded_values(instance, IDENTITY_FIELDS.values())
+    if created or values_changed(instance._loaded_identifiers, identifiers):
+        link_user(instance)
+    instance._loaded_identifiers = identifiers
+
+
+@receiver(post_save, sender=User)
+def invalidate_scores_on_birth_date_change(sender, instance, created, **kwargs):
+    date_of_birth = loaded_values(instance, ['date_of_birth'])
+    if not created and values_changed(instance._loaded_date_of_birth, date_of_birth):
+        update_birth_date(instance)
+        invalidate_scores(instance.loan_applications.values_list('id', flat=True))
+    instance._loaded_date_of_birth = date_of_birth
+
+
+@receiver(pre_save, sender=Document)
+def capture_document_metadata(sender, instance, **kwargs):
+    """
+    Read a new upload once, before storage takes it, keep its metadata on
+    the row and look it up in the corpus of other customers' documents
+    """
+    if instance.file and not instance.file._committed:
+        capture_metadata(instance)
+        instance.duplicate_of_id = find_duplicate(instance, instance.application.customer_id)
@@ -0,0 +1,44 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from ai_engine.amortization import amortize, calculate_emi
+
+from .schedules import create_emi_schedule
+from .testing import make_loan
+
+
+class AmortizationTests(SimpleTestCase):
+    def test_emi(self):
+        self.assertEqual(calculate_emi(100000, 12, 12), Decimal('8884.88'))
+        self.assertEqual(calculate_emi(120000, 0, 12), Decimal('10000.00'))
+
+    def test_schedule_closes_exactly(self):
+        for principal, rate, tenure in [(100000, 12, 12), (2500000, 10.5, 84), (999999.99, 0, 36)]:
+            schedule = amortize(principal, rate, tenure)
+            self.assertEqual(len(schedule), tenure)
+            self.assertEqual(schedule.remaining_balance[-1], 0)
+            self.assertEqual(schedule.principal_amount.sum(), round(principal * 100))
+            self.assertTrue((schedule.principal_amount + schedule.interest_amount == schedule.emi_amount).all())
+
+    def test_schedule_interest_on_opening_balance(self):
+        rows = list(amortize(100000, 12, 12).rows(timezone.now().date()))
+        self.assertEqual(rows[0]['interest_amount'], Decimal('1000.00'))
+        self.assertEqual(rows[0]['principal_amount'], Decimal('7884.88'))
+        self.assertEqual(rows[1]['interest_amount'], Decimal('921.15'))
+        self.assertEqual(rows[1]['due_date'] - rows[0]['due_date'], timedelta(days=30))
+
+
+class ScheduleInsertTests(TestCase):
+    def test_full_schedule_in_one_insert(self):
+        loan = make_loan(tenure_months=60)
+        with self.assertNumQueries(1):
+            create_emi_schedule(loan)
+
+        rows = list(loan.emi_schedules.order_by('emi_number'))
+        self.assertEqual([row.emi_number for row in rows], list(range(1, 61)))
+        self.assertEqual(sum(row.principal_amount for row in rows), loan.loan_amount)
+        self.assertEqual(rows[0].emi_amount, loan.monthly_emi)
+        self.assertEqual(rows[-1].remaining_balance, 0)
@@ -0,0 +1,93 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+
+from . import circuit_breaker
+from .circuit_breaker import CircuitBreaker
+from .models import OutboxMessage
+from .outbox import claim_messages
+from .test_outbox import OutboxTestCase
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch.object(circuit_breaker.time, 'monotonic', lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = CircuitBreaker('test', failure_threshold=3, reset_timeout=60)
+
+    def test_opens_after_consecutive_failures(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, 'closed')
+        self.assertTrue(self.breaker.allow())
+
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, 'open')
+        self.assertFalse(self.breaker.allow())
+        self.assertEqual(self.breaker.retry_after(), 60)
+
+    def test_single_trial_after_timeout(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+        self.now += 60
+        self.assertEqual(self.breaker.state, 'half_open')
+        self.assertTrue(self.breaker.allow())
+        self.assertFalse(self.breaker.allow())
+
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, 'closed')
+        self.assertTrue(self.breaker.allow())
+
+    def test_failed_trial_reopens(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+        self.now += 60
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, 'open')
+        self.assertEqual(self.breaker.retry_after(), 60)
+
+
+class OutboxDeferralTests(OutboxTestCase):
+    @override_settings(PROVIDER_FAILURE_THRESHOLD=2)
+    def test_open_circuit_defers_without_using_attempts(self):
+        self.queue(5)
+        self.failing = True
+        self.assertEqual(self.deliver(), (0, 2, 3))
+
+        deferred = OutboxMessage.objects.filter(attempts=0)
+        self.assertEqual(deferred.count(), 3)
+        for message in deferred:
+            self.assertEqual(message.status, 'pending')
+            self.assertGreater(message.next_attempt_at, timezone.now() + timedelta(seconds=50))
+        self.assertEqual(circuit_breaker.breaker('email').state, 'open')
+
+    @override_settings(OUTBOX_BATCH_BUDGET=0)
+    def test_batch_over_budget_is_deferred(self):
+        self.queue(2)
+        self.assertEqual(self.deliver(), (0, 0, 2))
+        self.assertEqual(self.sent, [])
+        self.assertEqual(OutboxMessage.objects.filter(status='pending', attempts=0).count(), 2)
+        self.assertEqual(len(claim_messages('worker-2', 10)), 2)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_provider_latency_is_exposed(self):
+        self.queue(1)
+        with mock.patch.dict('api.outbox.SENDERS', {'email': self.send}):
+            call_command('deliveroutbox', '--once', stdout=StringIO())
+
+        response = self.client.get('/api/metrics/', HTTP_X_METRICS_TOKEN='secret')
+        self.assertTrue(any(
+            line.startswith('notification_provider_seconds_count{') and 'outcome="sent"' in line
+            and 'process="deliveroutbox@' in line
+            for line in response.content.decode().splitlines()
+        ))
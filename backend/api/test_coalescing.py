@@ -0,0 +1,57 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .models import OutboxMessage
+from .notifications import notify_user
+from .testing import make_user
+
+
+class OutboxCoalescingTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+
+    @override_settings(NOTIFICATION_COALESCE_SECONDS=120)
+    def test_burst_is_merged_per_channel(self):
+        notify_user(self.user, 'Documents Verified', 'first')
+        notify_user(self.user, 'Loan Approved!', 'second')
+
+        messages = OutboxMessage.objects.order_by('channel')
+        self.assertEqual([message.channel for message in messages], ['email', 'sms'])
+        for message in messages:
+            self.assertEqual(message.item_count, 2)
+            self.assertEqual(message.subject, '2 new notifications')
+            self.assertEqual(message.body, 'Documents Verified\nfirst\n\nLoan Approved!\nsecond')
+            self.assertGreater(message.next_attempt_at, timezone.now() + timedelta(seconds=100))
+
+    @override_settings(NOTIFICATION_COALESCE_SECONDS=120)
+    def test_claimed_message_is_not_merged_into(self):
+        notify_user(self.user, 'first', 'first', sms=False)
+        OutboxMessage.objects.update(status='sending')
+        notify_user(self.user, 'second', 'second', sms=False)
+
+        self.assertEqual(OutboxMessage.objects.count(), 2)
+        self.assertEqual(OutboxMessage.objects.get(status='pending').body, 'second')
+
+    @override_settings(NOTIFICATION_COALESCE_SECONDS=0)
+    def test_no_window_sends_each_alone(self):
+        notify_user(self.user, 'first', 'first', sms=False)
+        notify_user(self.user, 'second', 'second', sms=False)
+
+        self.assertEqual(OutboxMessage.objects.count(), 2)
+        self.assertFalse(OutboxMessage.objects.exclude(coalesce_key='').exists())
+        self.assertFalse(OutboxMessage.objects.filter(next_attempt_at__gt=timezone.now()).exists())
+
+    @override_settings(NOTIFICATION_DIGEST=True, NOTIFICATION_DIGEST_HOUR=9)
+    def test_low_priority_waits_for_digest(self):
+        notify_user(self.user, 'first', 'first', sms=False, priority='low')
+        notify_user(self.user, 'second', 'second', sms=False, priority='low')
+        notify_user(self.user, 'urgent', 'urgent', sms=False)
+
+        digest = OutboxMessage.objects.get(coalesce_key__startswith='digest:')
+        self.assertEqual(digest.subject, 'Your daily summary: 2 updates')
+        due = timezone.localtime(digest.next_attempt_at)
+        self.assertEqual((due.hour, due.minute), (9, 0))
+        self.assertLessEqual(due - timezone.now(), timedelta(days=1))
+        self.assertEqual(OutboxMessage.objects.exclude(pk=digest.pk).get().body, 'urgent')
@@ -0,0 +1,109 @@
+import io
+import shutil
+import tempfile
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from PIL import Image
+from rest_framework.test import APIClient
+
+from .models import Document
+from .testing import make_loan, make_user
+
+
+def png(shade=0, size=64):
+    """A horizontal gradient; `shade` nudges a few pixels without changing its shape"""
+    image = Image.new('L', (size, size))
+    image.putdata([(x * 4 + shade * (y == 0 and x < 4)) % 256 for y in range(size) for x in range(size)])
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+class DocumentTestCase(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        overridden = override_settings(MEDIA_ROOT=media_root)
+        overridden.enable()
+        self.addCleanup(overridden.disable)
+
+    def upload(self, loan, content, name='scan.png'):
+        return Document.objects.create(
+            application=loan, document_type='citizenship', file=SimpleUploadedFile(name, content)
+        )
+
+
+class DuplicateDocumentTests(DocumentTestCase):
+    def test_metadata_is_captured(self):
+        document = self.upload(make_loan(), png())
+        self.assertEqual(document.mime_type, 'image/png')
+        self.assertEqual((document.width, document.height), (64, 64))
+        self.assertEqual(len(document.sha256), 64)
+        self.assertIsNotNone(document.phash)
+
+    def test_same_file_from_another_customer(self):
+        original = self.upload(make_loan(), b'%PDF-1.4 same bytes', 'a.pdf')
+        copy = self.upload(make_loan(), b'%PDF-1.4 same bytes', 'b.pdf')
+        self.assertEqual(copy.sha256, original.sha256)
+        self.assertEqual(copy.duplicate_of, original)
+        self.assertIsNone(original.duplicate_of)
+
+    def test_same_customer_is_not_a_duplicate(self):
+        loan = make_loan()
+        self.upload(loan, png())
+        self.assertIsNone(self.upload(make_loan(customer=loan.customer), png()).duplicate_of)
+
+    def test_near_identical_image(self):
+        original = self.upload(make_loan(), png())
+        rescan = self.upload(make_loan(), png(shade=1))
+        self.assertNotEqual(rescan.sha256, original.sha256)
+        self.assertEqual(rescan.duplicate_of, original)
+
+    def test_different_image(self):
+        self.upload(make_loan(), png())
+        other = Image.new('L', (64, 64))
+        other.putdata([(255 - x * 4) % 256 if y % 16 < 8 else x * 4 for y in range(64) for x in range(64)])
+        buffer = io.BytesIO()
+        other.save(buffer, format='PNG')
+        self.assertIsNone(self.upload(make_loan(), buffer.getvalue()).duplicate_of)
+
+
+class DocumentExposureTests(DocumentTestCase):
+    def setUp(self):
+        super().setUp()
+        self.loan = make_loan()
+        self.original = self.upload(make_loan(), png())
+        self.document = self.upload(self.loan, png())
+        self.client = APIClient()
+
+    def get(self, user, url):
+        self.client.force_authenticate(user)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_customer_does_not_see_fraud_metadata(self):
+        customer = self.loan.customer
+        document = self.get(customer, f'/api/documents/{self.document.pk}/')
+        nested = self.get(customer, f'/api/loans/{self.loan.pk}/')['documents'][0]
+        for data in (document, nested):
+            self.assertEqual(data['id'], str(self.document.pk))
+            for field in ('sha256', 'phash', 'phash_band0', 'duplicate_of', 'mime_type', 'width', 'file_size'):
+                self.assertNotIn(field, data)
+
+    def test_staff_see_fraud_metadata(self):
+        staff = make_user('sales_rep')
+        document = self.get(staff, f'/api/documents/{self.document.pk}/')
+        nested = self.get(staff, f'/api/loans/{self.loan.pk}/')['documents'][0]
+        for data in (document, nested):
+            self.assertEqual(data['duplicate_of'], self.original.pk)
+            self.assertEqual(data['sha256'], self.document.sha256)
+            self.assertEqual(data['mime_type'], 'image/png')
+
+    def test_customer_cannot_verify_through_update(self):
+        self.client.force_authenticate(self.loan.customer)
+        response = self.client.patch(f'/api/documents/{self.document.pk}/', {'status': 'verified'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.document.refresh_from_db()
+        self.assertEqual(self.document.status, 'pending')
@@ -0,0 +1,105 @@
+from decimal import Decimal
+
+from django.test import TestCase
+
+from .identity_links import rebuild_clusters
+from .models import IdentityCluster, IdentityKey, User
+from .testing import make_loan, make_user
+
+
+class IdentityClusterTests(TestCase):
+    def cluster(self, user):
+        user.refresh_from_db()
+        return user.identity_cluster
+
+    def test_shared_phone_links_accounts(self):
+        first = make_user(phone='+977-9841000000')
+        second = make_user(phone='9841 000 000')
+        make_user()
+
+        cluster = self.cluster(first)
+        self.assertIsNotNone(cluster)
+        self.assertEqual(self.cluster(second), cluster)
+        self.assertEqual(cluster.size, 2)
+        # Digests only, never the identifiers themselves
+        self.assertFalse(IdentityKey.objects.filter(digest__contains='9841000000').exists())
+
+    def test_links_are_transitive(self):
+        first = make_user(citizenship_number='12-01-70-00001')
+        second = make_user(citizenship_number='120170 00001', address='Ward 4, Baneshwor, Kathmandu')
+        third = make_user(address='ward 4 baneshwor kathmandu')
+
+        self.assertEqual({self.cluster(user) for user in (first, second, third)}, {self.cluster(first)})
+        self.assertEqual(self.cluster(first).size, 3)
+
+    def test_short_addresses_do_not_link(self):
+        first = make_user(address='Kathmandu')
+        second = make_user(address='Kathmandu')
+        self.assertIsNone(self.cluster(first))
+        self.assertIsNone(self.cluster(second))
+
+    def test_bridging_account_merges_clusters(self):
+        a = make_user(phone='9841000001')
+        make_user(phone='9841000001')
+        c = make_user(citizenship_number='555')
+        make_user(citizenship_number='555')
+        make_user(citizenship_number='555')
+        self.assertNotEqual(self.cluster(a), self.cluster(c))
+
+        bridge = make_user(phone='9841000001', citizenship_number='555')
+        self.assertEqual(IdentityCluster.objects.count(), 1)
+        self.assertEqual(self.cluster(bridge).size, 6)
+        self.assertEqual(User.objects.filter(identity_cluster__isnull=True).count(), 0)
+
+    def test_changed_identifier_links_on_save(self):
+        first = make_user(phone='9841000002')
+        second = make_user(phone='9841000003')
+        self.assertIsNone(self.cluster(second))
+
+        second.phone = '9841000002'
+        second.save()
+        self.assertEqual(self.cluster(second), self.cluster(first))
+
+    def test_exposure_counts_open_applications(self):
+        first = make_user(phone='9841000004')
+        second = make_user(phone='9841000004')
+        make_loan(customer=first, loan_amount=Decimal('1000000'))
+        loan = make_loan(customer=second, loan_amount=Decimal('500000'))
+        make_loan(customer=second, loan_amount=Decimal('700000'), status='rejected')
+        self.assertEqual(self.cluster(first).exposure, Decimal('1500000'))
+
+        loan.status = 'rejected'
+        loan.save(update_fields=['status'])
+        self.assertEqual(self.cluster(first).exposure, Decimal('1000000'))
+
+    def test_rebuild_matches_incremental_links(self):
+        users = [
+            make_user(phone='9841000005'), make_user(phone='9841000005', citizenship_number='777'),
+            make_user(citizenship_number='777'), make_user(phone='9841000006'), make_user(phone='9841000006'),
+            make_user(),
+        ]
+        make_loan(customer=users[0])
+        incremental = [self.cluster(user) for user in users]
+        exposure = incremental[0].exposure
+
+        self.assertEqual(rebuild_clusters(), (2, 5))
+        rebuilt = [self.cluster(user) for user in users]
+        def groups(clusters):
+            return sorted(
+                sorted(i for i, c in enumerate(clusters) if c == cluster) for cluster in set(clusters) if cluster
+            )
+
+        self.assertEqual(groups(rebuilt), groups(incremental))
+        self.assertIsNone(rebuilt[-1])
+        self.assertEqual((rebuilt[0].size, rebuilt[0].exposure), (3, exposure))
+
+    def test_deferred_loads_do_not_fetch_identifiers(self):
+        user = make_user(phone='9841000007')
+        make_user(phone='9841000007')
+
+        with self.assertNumQueries(1):
+            deferred = User.objects.only('id', 'username').get(pk=user.pk)
+        # Saving fields other than the identifiers neither reads nor relinks them
+        with self.assertNumQueries(1):
+            deferred.save(update_fields=['username'])
+        self.assertEqual(deferred.phone, '9841000007')
@@ -0,0 +1,63 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from .metrics import Counter, Histogram, Registry, publish_snapshot, recent_snapshots
+from .models import MetricSnapshot, OutboxMessage
+
+
+class RegistryTests(SimpleTestCase):
+    def test_render_merges_other_processes(self):
+        web, worker = Registry(), Registry()
+        web.register(Counter, 'jobs_total', 'Jobs').inc(2, outcome='ok')
+        worker.register(Counter, 'jobs_total', 'Jobs').inc(3, outcome='ok')
+        worker.register(Histogram, 'batch_seconds', 'Batches', buckets=(1,)).observe(0.5)
+
+        lines = web.render([('worker@host:1', worker.snapshot())]).splitlines()
+        self.assertEqual(lines.count('# TYPE jobs_total counter'), 1)
+        self.assertIn('jobs_total{outcome="ok"} 2', lines)
+        self.assertIn('jobs_total{outcome="ok",process="worker@host:1"} 3', lines)
+        self.assertIn('# TYPE batch_seconds histogram', lines)
+        self.assertIn('batch_seconds_bucket{le="1",process="worker@host:1"} 1', lines)
+        self.assertIn('batch_seconds_count{process="worker@host:1"} 1', lines)
+
+
+@override_settings(METRICS_TOKEN='secret', METRICS_SNAPSHOT_SECONDS=60, METRICS_SNAPSHOT_MAX_AGE=300)
+class MetricSnapshotTests(TestCase):
+    def scrape(self):
+        response = self.client.get('/api/metrics/', HTTP_X_METRICS_TOKEN='secret')
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode().splitlines()
+
+    def test_outbox_worker_metrics_are_exposed(self):
+        OutboxMessage.objects.create(channel='email', recipient='user@example.com', subject='s', body='b')
+        with mock.patch.dict('api.outbox.SENDERS', {'email': lambda message: None}):
+            call_command('deliveroutbox', '--once', stdout=StringIO())
+
+        lines = self.scrape()
+        process = MetricSnapshot.objects.get().process
+        self.assertTrue(process.startswith('deliveroutbox@'))
+        self.assertTrue(any(
+            line.startswith('outbox_batch_seconds_count{') and f'process="{process}"' in line for line in lines
+        ))
+
+    def test_publishing_is_throttled(self):
+        publish_snapshot('worker@host:1', force=True)
+        MetricSnapshot.objects.update(samples={})
+        publish_snapshot('worker@host:1')
+        self.assertEqual(MetricSnapshot.objects.get().samples, {})
+        publish_snapshot('worker@host:1', force=True)
+        self.assertNotEqual(MetricSnapshot.objects.get().samples, {})
+
+    def test_stale_snapshots_are_dropped(self):
+        MetricSnapshot.objects.create(process='worker@host:1', samples={'gone_total': ['counter', 'Gone', []]})
+        MetricSnapshot.objects.update(updated_at=timezone.now() - timedelta(minutes=10))
+        self.assertEqual(list(recent_snapshots()), [])
+        self.assertNotIn('# TYPE gone_total counter', self.scrape())
+
+        publish_snapshot('worker@host:2', force=True)
+        self.assertEqual(list(MetricSnapshot.objects.values_list('process', flat=True)), ['worker@host:2'])
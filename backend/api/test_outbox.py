@@ -0,0 +1,90 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from . import circuit_breaker
+from .models import OutboxMessage
+from .outbox import claim_messages, deliver_messages, requeue_stale_messages
+
+
+@override_settings(OUTBOX_MAX_ATTEMPTS=3, OUTBOX_RETRY_DELAY=30, OUTBOX_BATCH_BUDGET=60,
+                   PROVIDER_FAILURE_THRESHOLD=5, PROVIDER_RESET_TIMEOUT=60)
+class OutboxTestCase(TestCase):
+    """Queues email messages and delivers them through a fake provider"""
+
+    def setUp(self):
+        # Breakers are per process and keep their settings; start each test closed
+        circuit_breaker._breakers.clear()
+        self.addCleanup(circuit_breaker._breakers.clear)
+        self.sent = []
+        self.failing = False
+
+    def send(self, message):
+        if self.failing:
+            raise ConnectionError('provider down')
+        self.sent.append(message.recipient)
+
+    def queue(self, count, **fields):
+        OutboxMessage.objects.bulk_create([
+            OutboxMessage(channel='email', recipient=f'user{n}@example.com', subject='s', body='b', **fields)
+            for n in range(count)
+        ])
+
+    def deliver(self, worker='worker-1', limit=100):
+        with mock.patch.dict('api.outbox.SENDERS', {'email': self.send}):
+            return deliver_messages(claim_messages(worker, limit))
+
+
+class OutboxDeliveryTests(OutboxTestCase):
+    def test_claim_is_exclusive(self):
+        self.queue(3)
+        self.queue(1, next_attempt_at=timezone.now() + timedelta(minutes=5))
+
+        claimed = claim_messages('worker-1', 2)
+        self.assertEqual(len(claimed), 2)
+        self.assertTrue(all(message.status == 'sending' and message.attempts == 1 for message in claimed))
+        self.assertEqual(len(claim_messages('worker-2', 10)), 1)
+        self.assertEqual(claim_messages('worker-3', 10), [])
+
+    def test_sent(self):
+        self.queue(2)
+        self.assertEqual(self.deliver(), (2, 0, 0))
+        self.assertEqual(OutboxMessage.objects.filter(status='sent', sent_at__isnull=False).count(), 2)
+        self.assertEqual(len(self.sent), 2)
+
+    def test_failure_is_retried_with_backoff(self):
+        self.queue(1)
+        self.failing = True
+        self.assertEqual(self.deliver(), (0, 1, 0))
+
+        message = OutboxMessage.objects.get()
+        self.assertEqual((message.status, message.attempts), ('pending', 1))
+        self.assertEqual(message.last_error, 'ConnectionError: provider down')
+        delay = message.next_attempt_at - timezone.now()
+        self.assertTrue(timedelta(seconds=20) < delay <= timedelta(seconds=36))
+        # Not due yet
+        self.assertEqual(claim_messages('worker-1', 10), [])
+
+    def test_gives_up_after_max_attempts(self):
+        self.queue(1)
+        self.failing = True
+        for _ in range(3):
+            OutboxMessage.objects.update(next_attempt_at=timezone.now())
+            self.deliver()
+
+        message = OutboxMessage.objects.get()
+        self.assertEqual((message.status, message.attempts), ('failed', 3))
+        OutboxMessage.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(claim_messages('worker-1', 10), [])
+
+    def test_stale_claims_are_requeued(self):
+        self.queue(2)
+        claim_messages('worker-1', 1)
+        OutboxMessage.objects.filter(status='sending').update(claimed_at=timezone.now() - timedelta(minutes=10))
+        claim_messages('worker-2', 1)
+
+        self.assertEqual(requeue_stale_messages(older_than=300), 1)
+        self.assertEqual(OutboxMessage.objects.get(worker='').status, 'pending')
+        self.assertEqual(OutboxMessage.objects.get(worker='worker-2').status, 'sending')
@@ -0,0 +1,114 @@
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APIClient
+
+from ai_engine.amortization import calculate_emi, simulate_prepayment, simulate_prepayments
+
+from .testing import make_loan
+from .views import MAX_PREPAYMENT_SCENARIOS
+
+
+def remaining_interest(balance, annual_rate, emi, months=None):
+    """Interest paid on a balance month by month, the last installment clearing it"""
+    r = annual_rate / 1200
+    interest = 0
+    paid = 0
+    while balance > 0.005 and (months is None or paid < months):
+        charge = balance * r
+        interest += charge
+        balance = balance + charge - min(emi, balance + charge)
+        paid += 1
+    return interest, paid
+
+
+class PrepaymentTests(SimpleTestCase):
+    principal, rate, tenure = 1000000, 11, 60
+
+    def setUp(self):
+        self.emi = calculate_emi(self.principal, self.rate, self.tenure)
+
+    def outstanding(self, month):
+        balance = self.principal
+        for _ in range(month):
+            balance += balance * self.rate / 1200 - float(self.emi)
+        return balance
+
+    def test_reduce_tenure_matches_month_by_month(self):
+        for month, amount in [(12, 100000), (30, 250000), (1, 5000)]:
+            result, = simulate_prepayments(
+                self.principal, self.rate, self.tenure, self.emi, [month], [amount], 'reduce_tenure'
+            )
+            before = self.outstanding(month)
+            original, _ = remaining_interest(before, self.rate, float(self.emi))
+            interest, months = remaining_interest(before - amount, self.rate, float(self.emi))
+
+            self.assertAlmostEqual(float(result['outstanding_before']), before, delta=0.01)
+            self.assertEqual(result['remaining_tenure'], months)
+            self.assertEqual(result['months_saved'], self.tenure - month - months)
+            self.assertAlmostEqual(float(result['interest_saved']), original - interest, delta=1)
+
+    def test_reduce_emi_keeps_tenure(self):
+        result, = simulate_prepayments(
+            self.principal, self.rate, self.tenure, self.emi, [24], [200000], 'reduce_emi'
+        )
+        left = self.tenure - 24
+        self.assertEqual(result['remaining_tenure'], left)
+        self.assertEqual(result['months_saved'], 0)
+        self.assertEqual(result['new_emi'], calculate_emi(result['outstanding_after'], self.rate, left))
+        original, _ = remaining_interest(self.outstanding(24), self.rate, float(self.emi))
+        interest, _ = remaining_interest(float(result['outstanding_after']), self.rate, float(result['new_emi']), left)
+        self.assertAlmostEqual(float(result['interest_saved']), original - interest, delta=1)
+
+    def test_batch_matches_single_scenarios(self):
+        months, amounts = [6, 12, 48], [50000, 150000, 75000]
+        for strategy in ('reduce_emi', 'reduce_tenure'):
+            batch = simulate_prepayments(self.principal, self.rate, self.tenure, self.emi, months, amounts, strategy)
+            for month, amount, result in zip(months, amounts, batch):
+                single = simulate_prepayment(self.principal, self.rate, self.tenure, self.emi, month, amount, strategy)
+                self.assertEqual(result, {key: value for key, value in single.items() if key != 'schedule'})
+
+    def test_schedule_after_prepayment_closes(self):
+        result = simulate_prepayment(self.principal, self.rate, self.tenure, self.emi, 12, 100000, 'reduce_tenure')
+        schedule = result['schedule']
+        self.assertEqual(len(schedule), result['remaining_tenure'])
+        self.assertEqual(schedule.emi_number[0], 13)
+        self.assertEqual(schedule.principal_amount.sum(), int(result['outstanding_after'].scaleb(2)))
+        self.assertEqual(schedule.remaining_balance[-1], 0)
+
+    def test_prepaying_the_balance_forecloses(self):
+        result = simulate_prepayment(self.principal, self.rate, self.tenure, self.emi, 12, 10 ** 7, 'reduce_emi')
+        self.assertTrue(result['foreclosed'])
+        self.assertEqual(result['schedule'], [])
+        self.assertEqual(result['new_emi'], 0)
+        self.assertEqual(result['months_saved'], self.tenure - 12)
+
+    def test_unknown_strategy(self):
+        with self.assertRaises(ValueError):
+            simulate_prepayments(self.principal, self.rate, self.tenure, self.emi, [1], [1], 'skip_emi')
+
+
+class PrepaymentEndpointTests(TestCase):
+    def setUp(self):
+        self.loan = make_loan(tenure_months=24)
+        self.client = APIClient()
+        self.client.force_authenticate(self.loan.customer)
+        self.url = f'/api/loans/{self.loan.id}/prepayment/'
+
+    def test_single_scenario_returns_both_strategies(self):
+        response = self.client.post(self.url, {'amount': '100000', 'month': 6}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data), {'reduce_emi', 'reduce_tenure'})
+        self.assertEqual(response.data['reduce_emi']['schedule'][0]['emi_number'], 7)
+
+    def test_batch(self):
+        scenarios = [{'amount': '50000', 'month': month} for month in range(1, 11)]
+        response = self.client.post(self.url, {'scenarios': scenarios, 'strategy': 'reduce_tenure'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result['month'] for result in response.data['reduce_tenure']], list(range(1, 11)))
+
+    def test_limits(self):
+        too_many = [{'amount': '1000', 'month': 1}] * (MAX_PREPAYMENT_SCENARIOS + 1)
+        self.assertEqual(self.client.post(self.url, {'scenarios': too_many}, format='json').status_code, 400)
+        self.assertEqual(self.client.post(self.url, {'amount': '1000', 'month': 24}, format='json').status_code, 400)
+        self.assertEqual(
+            self.client.post(self.url, {'amount': '1000', 'month': 1, 'strategy': 'skip'}, format='json').status_code, 400
+        )
@@ -0,0 +1,148 @@
+import asyncio
+import time
+from datetime import timedelta
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.core import signing
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import push
+from .models import PushEvent, PushListener, PushTicket
+from .push import PUSH_TICKET_SALT, DatabaseBroker, issue_ticket, redeem_ticket
+from .testing import make_user
+
+
+@override_settings(PUSH_TICKET_MAX_AGE=60)
+class PushTicketTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.expires_at = int(time.time()) + 300
+
+    def test_ticket_opens_one_stream(self):
+        ticket = issue_ticket(self.user, self.expires_at)
+        self.assertEqual(redeem_ticket(ticket), (self.user.pk, self.expires_at))
+        self.assertIsNone(redeem_ticket(ticket))
+        self.assertFalse(PushTicket.objects.exists())
+
+    def test_invalid_tickets(self):
+        self.assertIsNone(redeem_ticket(''))
+        self.assertIsNone(redeem_ticket(issue_ticket(self.user, self.expires_at) + 'x'))
+        # Signed but never issued
+        self.assertIsNone(redeem_ticket(signing.dumps(
+            {'user': self.user.pk, 'exp': self.expires_at, 'nonce': 'made-up'}, salt=PUSH_TICKET_SALT
+        )))
+        self.assertIsNone(redeem_ticket(signing.dumps({'user': self.user.pk, 'exp': self.expires_at}, salt=PUSH_TICKET_SALT)))
+
+    def test_expired_tickets(self):
+        ticket = issue_ticket(self.user, self.expires_at)
+        with mock.patch('django.core.signing.time.time', return_value=time.time() + 61):
+            self.assertIsNone(redeem_ticket(ticket))
+        # The access token expired first
+        self.assertIsNone(redeem_ticket(issue_ticket(self.user, int(time.time()) - 1)))
+
+        PushTicket.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        issue_ticket(self.user, self.expires_at)
+        self.assertEqual(PushTicket.objects.count(), 1)
+
+    def test_inactive_user(self):
+        ticket = issue_ticket(self.user, self.expires_at)
+        self.user.is_active = False
+        self.user.save()
+        self.assertIsNone(redeem_ticket(ticket))
+
+    def test_endpoint_ties_the_ticket_to_the_access_token(self):
+        token = AccessToken.for_user(self.user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        response = client.post('/api/push/ticket/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(redeem_ticket(response.data['ticket']), (self.user.pk, token['exp']))
+
+
+@override_settings(PUSH_EVENT_TTL=300, PUSH_COMMIT_WINDOW=5, PUSH_LISTENER_TTL=30, PUSH_POLL_INTERVAL=0.01)
+class DatabaseBrokerTests(TestCase):
+    def setUp(self):
+        self.broker = DatabaseBroker()
+        self.listener, self.other = make_user(), make_user()
+
+    def event(self, user, n=1):
+        return (user.pk, {'event': 'notification', 'data': {'n': n}})
+
+    def test_events_are_only_written_for_listeners(self):
+        self.broker.publish([self.event(self.listener), self.event(self.other)])
+        self.assertFalse(PushEvent.objects.exists())
+
+        DatabaseBroker().listen([self.listener.pk])
+        self.broker.publish([self.event(self.listener), self.event(self.other)])
+        self.assertEqual(list(PushEvent.objects.values_list('user_id', flat=True)), [self.listener.pk])
+
+        PushListener.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.broker.publish([self.event(self.listener)])
+        self.assertEqual(PushEvent.objects.count(), 1)
+
+    def test_listen_replaces_only_this_process(self):
+        other_process = DatabaseBroker()
+        other_process.listen([self.listener.pk])
+        self.broker.listen([self.listener.pk, self.other.pk])
+        self.broker.listen([self.other.pk], replace=True)
+
+        self.assertEqual(
+            sorted(PushListener.objects.values_list('process', 'user_id')),
+            sorted([(other_process.process, self.listener.pk), (self.broker.process, self.other.pk)]),
+        )
+
+    def test_publishing_prunes_old_events_and_listeners(self):
+        DatabaseBroker().listen([self.listener.pk])
+        PushListener.objects.create(process='gone', user=self.other, expires_at=timezone.now() - timedelta(seconds=1))
+        PushEvent.objects.create(user=self.listener, event='notification', data={})
+        PushEvent.objects.update(created_at=timezone.now() - timedelta(seconds=301))
+
+        self.broker.publish([self.event(self.listener)])
+        self.assertEqual(PushEvent.objects.count(), 1)
+        self.assertEqual(PushListener.objects.count(), 1)
+
+        # At most once per PUSH_EVENT_TTL
+        PushEvent.objects.update(created_at=timezone.now() - timedelta(seconds=301))
+        self.broker.publish([self.event(self.listener)])
+        self.assertEqual(PushEvent.objects.count(), 2)
+
+    def test_late_commits_are_delivered_once(self):
+        seen = self.broker.recent_events()
+        PushEvent.objects.create(id=10, user=self.listener, event='notification', data={'n': 10})
+        self.assertEqual(self.broker.read(seen), [(self.listener.pk, 'notification', {'n': 10})])
+
+        # A row with a lower id that committed after id 10 was read
+        PushEvent.objects.create(id=5, user=self.listener, event='notification', data={'n': 5})
+        self.assertEqual(self.broker.read(seen), [(self.listener.pk, 'notification', {'n': 5})])
+        self.assertEqual(self.broker.read(seen), [])
+        self.assertEqual(set(seen), {5, 10})
+
+        with mock.patch('api.push.timezone.now', return_value=timezone.now() + timedelta(seconds=6)):
+            self.assertEqual(self.broker.read(seen), [])
+        self.assertEqual(seen, {})
+
+    def test_events_before_the_first_stream_are_skipped(self):
+        PushEvent.objects.create(user=self.listener, event='notification', data={})
+        self.assertEqual(self.broker.read(self.broker.recent_events()), [])
+
+    async def test_stream_receives_events_from_other_processes(self):
+        subscription = await self.broker.subscribe(self.listener.pk)
+        await sync_to_async(DatabaseBroker().publish)([self.event(self.listener, 1), self.event(self.other, 2)])
+
+        event = await asyncio.wait_for(subscription.queue.get(), 5)
+        self.assertEqual(event, {'event': 'notification', 'data': {'n': 1}})
+
+        self.broker.unsubscribe(subscription)
+        await asyncio.wait_for(self.broker.poller, 5)
+        self.assertFalse(await PushListener.objects.filter(process=self.broker.process).aexists())
+
+
+class PushBrokerTests(TestCase):
+    def test_unknown_broker(self):
+        self.addCleanup(setattr, push, '_broker_name', None)
+        with override_settings(PUSH_BROKER='redis'), self.assertRaises(ValueError):
+            push.push_broker()
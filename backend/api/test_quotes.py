@@ -0,0 +1,49 @@
+from decimal import Decimal
+
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APIClient
+
+from ai_engine.amortization import annuity_factor, quote_emi
+
+from .views import MAX_QUOTE_BATCH
+
+
+class QuoteTests(SimpleTestCase):
+    def test_totals(self):
+        quote = quote_emi(100000, 12, 12)
+        self.assertEqual(quote['emi'], Decimal('8884.88'))
+        self.assertEqual(quote['total_payment'], Decimal('8884.88') * 12)
+        self.assertEqual(quote['total_interest'], quote['total_payment'] - Decimal('100000.00'))
+
+    def test_factor_is_shared_across_principals(self):
+        annuity_factor.cache_clear()
+        quote_emi(100000, 12, 36)
+        quote_emi(250000, 12, 36)
+        info = annuity_factor.cache_info()
+        self.assertEqual((info.hits, info.misses), (1, 1))
+
+
+class QuoteEndpointTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_single_quote_is_public_and_cacheable(self):
+        response = self.client.get('/api/emi/quote/', {'principal': '100000', 'rate': '12', 'tenure': '12'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Decimal(response.data['emi']), Decimal('8884.88'))
+        self.assertIn('public', response['Cache-Control'])
+
+    def test_batch(self):
+        response = self.client.post('/api/emi/quote/', {'quotes': [
+            {'principal': '100000', 'rate': '12', 'tenure': 12},
+            {'principal': '120000', 'rate': '0', 'tenure': 12},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([Decimal(quote['emi']) for quote in response.data['quotes']],
+                         [Decimal('8884.88'), Decimal('10000.00')])
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.client.get('/api/emi/quote/', {'principal': '0', 'tenure': '12'}).status_code, 400)
+        self.assertEqual(self.client.post('/api/emi/quote/', {'quotes': []}, format='json').status_code, 400)
+        too_many = [{'principal': '1000', 'tenure': 12}] * (MAX_QUOTE_BATCH + 1)
+        self.assertEqual(self.client.post('/api/emi/quote/', {'quotes': too_many}, format='json').status_code, 400)
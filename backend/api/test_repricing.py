@@ -0,0 +1,79 @@
+from decimal import Decimal
+
+from django.test import TestCase
+
+from ai_engine.amortization import calculate_emi
+
+from .models import EMISchedule
+from .schedules import create_emi_schedule, reprice_loans
+from .testing import make_loan
+
+AMOUNTS = ['emi_amount', 'principal_amount', 'interest_amount', 'remaining_balance']
+
+
+def amounts(row):
+    return [getattr(row, field) for field in AMOUNTS]
+
+
+class RepriceLoansTests(TestCase):
+    def setUp(self):
+        self.loan = make_loan(loan_amount=Decimal('600000'), interest_rate=Decimal('12.00'), tenure_months=12)
+        create_emi_schedule(self.loan)
+
+    def rows(self):
+        return list(EMISchedule.objects.filter(application=self.loan).order_by('emi_number'))
+
+    def settle(self, numbers, status='paid'):
+        EMISchedule.objects.filter(application=self.loan, emi_number__in=numbers).update(status=status)
+
+    def test_unpaid_loan_is_reamortized(self):
+        reprice_loans([self.loan.id], '10')
+        self.loan.refresh_from_db()
+        rows = self.rows()
+
+        self.assertEqual(self.loan.interest_rate, Decimal('10.00'))
+        self.assertEqual(self.loan.monthly_emi, calculate_emi(600000, 10, 12))
+        self.assertEqual(len(rows), 12)
+        self.assertEqual(sum(row.principal_amount for row in rows), Decimal('600000'))
+        self.assertEqual(rows[-1].remaining_balance, 0)
+
+    def test_settled_rows_after_a_gap_are_kept(self):
+        self.settle([1, 2, 4])
+        self.settle([5], status='partial')
+        before = {row.emi_number: amounts(row) for row in self.rows()}
+
+        reprice_loans([self.loan.id], '9')
+        rows = self.rows()
+
+        self.assertEqual(len(rows), 12)
+        for row in rows:
+            if row.emi_number in (1, 2, 4, 5):
+                self.assertEqual(amounts(row), before[row.emi_number])
+            else:
+                self.assertNotEqual(amounts(row), before[row.emi_number])
+        # The kept rows and the re-amortized pending rows repay the loan exactly
+        self.assertEqual(sum(row.principal_amount for row in rows), Decimal('600000'))
+        kept_principal = sum(before[number][1] for number in (1, 2, 4, 5))
+        self.loan.refresh_from_db()
+        self.assertEqual(self.loan.monthly_emi, calculate_emi(Decimal('600000') - kept_principal, 9, 8))
+        self.assertEqual(rows[-1].remaining_balance, 0)
+
+    def test_missing_rows_are_added(self):
+        EMISchedule.objects.filter(application=self.loan, emi_number__gt=10).delete()
+        self.settle([1])
+
+        reprice_loans([self.loan.id], '11')
+        rows = self.rows()
+
+        self.assertEqual([row.emi_number for row in rows], list(range(1, 13)))
+        self.assertEqual(rows[-1].due_date - rows[-2].due_date, rows[1].due_date - rows[0].due_date)
+        self.assertEqual(sum(row.principal_amount for row in rows), Decimal('600000'))
+
+    def test_lazy_loan_only_changes_terms(self):
+        lazy = make_loan(tenure_months=24)
+        reprice_loans([lazy.id], '8.5')
+        lazy.refresh_from_db()
+
+        self.assertEqual(lazy.interest_rate, Decimal('8.50'))
+        self.assertEqual(lazy.monthly_emi, calculate_emi(lazy.loan_amount, '8.5', 24))
+        self.assertFalse(lazy.emi_schedules.exists())
@@ -0,0 +1,76 @@
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
+
+from ai_engine import rule_tables
+from ai_engine.rule_tables import BandTable, RuleSet, active_rules
+
+
+class BandTableTests(SimpleTestCase):
+    def test_inclusive_and_exclusive_breakpoints(self):
+        band = BandTable('test', 'x', ['>=10', '>20', '>=20.5'], [1, 2, 3, 4])
+        for value, expected in [(-5, 1), (9.99, 1), (10, 2), (20, 2), (20.25, 3), (20.5, 4), (1e9, 4)]:
+            self.assertEqual(band.score(value), expected, value)
+        self.assertEqual(band.lookup([9.99, 10, 20, 20.25, 20.5]).tolist(), [1, 2, 2, 3, 4])
+
+    def test_single_lookups_match_batch_lookups(self):
+        rules = RuleSet.load(settings.CREDIT_RULES_FILE)
+        for band in rules.bands.values():
+            thresholds = [threshold for threshold, _ in band.breakpoints]
+            values = sorted({value for t in thresholds for value in (t - 1e-6, t, t + 1e-6)} | {-1e9, 0, 1e9})
+            self.assertEqual([band.score(value) for value in values], band.lookup(np.array(values)).tolist(), band.name)
+
+    def test_invalid_breakpoints(self):
+        for breakpoints in (['10'], ['>=__import__("os")'], ['>="10"'], ['>=20', '>=10']):
+            with self.assertRaises(ValueError):
+                BandTable('test', 'x', breakpoints, [0] * (len(breakpoints) + 1))
+        with self.assertRaises(ValueError):
+            BandTable('test', 'x', ['>=10'], [1])
+
+
+class ActiveRulesTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.path = os.path.join(directory, 'rules.json')
+        shutil.copy(settings.CREDIT_RULES_FILE, self.path)
+
+        for name in ('_active_rules', '_active_mtime', '_next_check'):
+            self.addCleanup(setattr, rule_tables, name, getattr(rule_tables, name))
+        rule_tables._active_rules = None
+        overridden = override_settings(CREDIT_RULES_FILE=self.path, CREDIT_RULES_RELOAD_SECONDS=0)
+        overridden.enable()
+        self.addCleanup(overridden.disable)
+
+    def write(self, change):
+        with open(self.path) as rules_file:
+            table = json.load(rules_file)
+        change(table)
+        with open(self.path, 'w') as rules_file:
+            json.dump(table, rules_file)
+        # Make sure the modification time moves even on coarse clocks
+        stat = os.stat(self.path)
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    def test_edited_table_is_reloaded(self):
+        loaded = active_rules()
+        self.write(lambda table: table.update(version='edited'))
+        self.assertIsNot(active_rules(), loaded)
+        self.assertEqual(active_rules().version, 'edited')
+
+    def test_broken_or_missing_table_keeps_the_loaded_one(self):
+        loaded = active_rules()
+        self.write(lambda table: table.pop('weights'))
+        self.assertIs(active_rules(), loaded)
+        os.remove(self.path)
+        self.assertIs(active_rules(), loaded)
+
+    def test_missing_table_without_a_loaded_one_raises(self):
+        os.remove(self.path)
+        with self.assertRaises(OSError):
+            active_rules()
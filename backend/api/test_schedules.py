@@ -0,0 +1,112 @@
+import uuid
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from .models import EMISchedule, LoanApplication
+from .schedules import (
+    MAX_TENURE_MONTHS, ScheduleRows, create_emi_schedule, find_virtual_row, materialize_emi_schedule,
+    virtual_emi_schedule, virtual_row_candidates, virtual_row_id,
+)
+from .testing import make_loan, make_user
+
+
+def lazy_loans():
+    return LoanApplication.objects.exclude(status='disbursed').filter(emi_schedules__isnull=True)
+
+
+class VirtualRowIdTests(TestCase):
+    def test_round_trip(self):
+        for _ in range(20):
+            loan_id = uuid.uuid4()
+            for number in (1, 2, 7, MAX_TENURE_MONTHS):
+                self.assertEqual(virtual_row_candidates(virtual_row_id(loan_id, number))[loan_id], number)
+
+    def test_tenure_limit_follows_the_model(self):
+        self.assertEqual(MAX_TENURE_MONTHS, 120)
+
+    def test_find_virtual_row(self):
+        loan = make_loan(tenure_months=12)
+        row = find_virtual_row(lazy_loans(), virtual_row_id(loan.id, 5))
+        self.assertEqual((row.application_id, row.emi_number), (loan.id, 5))
+        self.assertIsNone(find_virtual_row(lazy_loans(), virtual_row_id(loan.id, 13)))
+        self.assertIsNone(find_virtual_row(lazy_loans(), uuid.uuid4()))
+        self.assertIsNone(find_virtual_row(lazy_loans(), 'notauuid'))
+
+    def test_materialized_rows_keep_their_ids(self):
+        loan = make_loan(tenure_months=12)
+        served = [row.id for row in virtual_emi_schedule(loan)]
+        loan.status = 'disbursed'
+        loan.save()
+
+        stored = list(loan.emi_schedules.order_by('emi_number').values_list('id', flat=True))
+        self.assertEqual(stored, served)
+        self.assertEqual(materialize_emi_schedule(loan), [])
+        self.assertEqual(loan.emi_schedules.count(), 12)
+
+
+class ScheduleRowsTests(TestCase):
+    def setUp(self):
+        customer = make_user()
+        for tenure in (6, 9):
+            create_emi_schedule(make_loan(customer=customer, tenure_months=tenure))
+        for tenure in (12, 7, 24):
+            make_loan(customer=customer, tenure_months=tenure)
+        self.rows = ScheduleRows(EMISchedule.objects.all(), lazy_loans())
+        self.expected = [(row.application_id, row.emi_number) for row in self.rows.stored] + [
+            (row.application_id, row.emi_number)
+            for loan in self.rows.lazy_loans for row in virtual_emi_schedule(loan)
+        ]
+
+    def test_count(self):
+        self.assertEqual(self.rows.count(), 6 + 9 + 12 + 7 + 24)
+        self.assertEqual(len(self.expected), self.rows.count())
+
+    def test_slices_match_the_full_listing(self):
+        for start, stop in [(0, 5), (0, 15), (10, 20), (15, 16), (14, 40), (30, 58), (50, None), (58, 70), (70, 80)]:
+            page = [(row.application_id, row.emi_number) for row in self.rows[start:stop]]
+            self.assertEqual(page, self.expected[start:stop], (start, stop))
+
+    def test_page_only_builds_the_loans_in_it(self):
+        rows = ScheduleRows(EMISchedule.objects.all(), lazy_loans())
+        # Stored count, lazy loan tenures, then the two loans the page spans
+        with self.assertNumQueries(3), mock.patch('api.schedules.virtual_emi_schedule',
+                                                  wraps=virtual_emi_schedule) as build:
+            rows[20:30]
+        self.assertEqual(build.call_count, 2)
+
+
+@override_settings(REST_FRAMEWORK={
+    'DEFAULT_AUTHENTICATION_CLASSES': (), 'DEFAULT_PERMISSION_CLASSES': [],
+    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination', 'PAGE_SIZE': 20,
+})
+class EMIScheduleAPITests(TestCase):
+    def setUp(self):
+        self.customer = make_user()
+        self.loan = make_loan(customer=self.customer, tenure_months=24)
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+
+    def test_lists_computed_rows(self):
+        response = self.client.get('/api/emi-schedules/', {'application': str(self.loan.id), 'page': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 24)
+        self.assertEqual([row['emi_number'] for row in response.data['results']], [21, 22, 23, 24])
+
+    def test_retrieves_a_computed_row(self):
+        row_id = virtual_row_id(self.loan.id, 3)
+        response = self.client.get(f'/api/emi-schedules/{row_id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['emi_number'], 3)
+
+    def test_other_customers_rows_are_hidden(self):
+        other = make_loan(tenure_months=12)
+        response = self.client.get('/api/emi-schedules/', {'application': str(other.id)})
+        self.assertEqual(response.data['count'], 0)
+        self.assertEqual(self.client.get(f'/api/emi-schedules/{virtual_row_id(other.id, 1)}/').status_code, 404)
+
+    def test_invalid_application_is_a_bad_request(self):
+        response = self.client.get('/api/emi-schedules/', {'application': 'notauuid'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('application', response.data)
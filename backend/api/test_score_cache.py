@@ -0,0 +1,90 @@
+import shutil
+import tempfile
+from datetime import date
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from ai_engine.credit_scorer import CreditScorer
+
+from .score_cache import cached_score, loan_key, peek_cached_score
+from .testing import make_loan
+
+
+class SharedCacheTestCase(TestCase):
+    """Runs against a file-based cache, which every process shares"""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        overridden = override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directory,
+        }})
+        overridden.enable()
+        self.addCleanup(overridden.disable)
+
+
+class ScoreCacheInvalidationTests(SharedCacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.scorer = CreditScorer(use_model=False)
+        self.loan = make_loan()
+        self.score = cached_score(self.scorer, self.loan)
+
+    def assertPointer(self, present):
+        self.assertEqual(cache.get(loan_key(self.loan.id)) is not None, present)
+
+    def test_result_is_served_from_the_pointer(self):
+        self.assertPointer(True)
+        self.assertEqual(peek_cached_score(self.scorer, self.loan), self.score)
+        self.assertEqual(self.score, self.scorer.score_application(self.loan))
+
+    def test_loan_change_drops_the_pointer(self):
+        self.loan.loan_amount = Decimal('2500000')
+        self.loan.save()
+        self.assertPointer(False)
+        self.assertEqual(cached_score(self.scorer, self.loan), self.scorer.score_application(self.loan))
+
+    def test_saving_scores_keeps_the_pointer(self):
+        self.loan.credit_score = self.score[0]
+        self.loan.save(update_fields=['credit_score', 'updated_at'])
+        self.assertPointer(True)
+
+    def test_vehicle_price_change_drops_the_pointer(self):
+        vehicle = self.loan.vehicle
+        vehicle.price = Decimal('1200000')
+        vehicle.save()
+        self.assertPointer(False)
+        self.loan.refresh_from_db()
+        self.assertEqual(cached_score(self.scorer, self.loan), self.scorer.score_application(self.loan))
+
+    def test_birth_date_change_drops_the_pointer(self):
+        customer = self.loan.customer
+        customer.date_of_birth = date(1950, 1, 1)
+        customer.save()
+        self.assertPointer(False)
+        self.loan.refresh_from_db()
+        self.assertEqual(cached_score(self.scorer, self.loan), self.scorer.score_application(self.loan))
+
+    def test_other_user_fields_keep_the_pointer(self):
+        customer = self.loan.customer
+        customer.first_name = 'Renamed'
+        customer.save()
+        self.assertPointer(True)
+
+    def test_pointer_is_ignored_under_other_rules(self):
+        rules = self.scorer.rules
+        other = CreditScorer(use_model=False, rules=rules)
+        other.version = f'{rules.version}-candidate'
+        self.assertIsNone(peek_cached_score(other, self.loan))
+
+
+class UnsharedScoreCacheTests(TestCase):
+    def test_no_pointers_in_a_per_process_cache(self):
+        loan = make_loan()
+        scorer = CreditScorer(use_model=False)
+        self.assertEqual(cached_score(scorer, loan), scorer.score_application(loan))
+        self.assertIsNone(cache.get(loan_key(loan.id)))
+        # The feature-hash entry is still found
+        self.assertEqual(peek_cached_score(scorer, loan), scorer.score_application(loan))
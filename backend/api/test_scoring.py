@@ -0,0 +1,52 @@
+import random
+from datetime import date
+from decimal import Decimal
+
+from django.test import TestCase
+
+from ai_engine.credit_scorer import CreditScorer
+
+from .models import LoanApplication
+from .testing import make_loan, make_user, make_vehicle
+
+# Every type in the rule table plus one it does not list
+EMPLOYMENT_TYPES = ['government', 'private_company', 'business_owner', 'self_employed', 'freelancer', 'other', 'unlisted']
+
+
+class BatchScoringTests(TestCase):
+    """score_batch must agree with score_application on every application"""
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(7)
+        vehicles = [make_vehicle(price=Decimal(price)) for price in (800000, 2500000, 6000000)]
+        for n in range(40):
+            born = None if n % 5 == 0 else date(rng.randint(1940, 2008), rng.randint(1, 12), rng.randint(1, 28))
+            customer = make_user(date_of_birth=born)
+            amount = Decimal(rng.choice([200000, 750000, 1500000, 4000000]))
+            make_loan(
+                customer=customer, vehicle=rng.choice(vehicles), loan_amount=amount,
+                down_payment=Decimal(rng.choice([0, 20000, 300000, 1200000])),
+                monthly_income=Decimal(rng.choice([15000, 60000, 250000, 900000])),
+                interest_rate=Decimal(rng.choice(['0', '9.5', '14'])),
+                tenure_months=rng.choice([6, 12, 36, 60, 120]),
+                employment_type=rng.choice(EMPLOYMENT_TYPES),
+            )
+
+    def test_batch_matches_single_scoring(self):
+        scorer = CreditScorer(use_model=False)
+        batch = scorer.score_batch(LoanApplication.objects.all())
+        self.assertEqual(len(batch), 40)
+        self.assertGreater(batch['risk_level'].nunique(), 2)
+
+        for loan in LoanApplication.objects.select_related('customer', 'vehicle'):
+            row = batch.loc[loan.id]
+            self.assertEqual(
+                (int(row['credit_score']), row['risk_level'], row['recommendation']),
+                scorer.score_application(loan),
+                loan.application_number,
+            )
+
+    def test_batch_is_one_query(self):
+        with self.assertNumQueries(1):
+            CreditScorer(use_model=False).score_batch(LoanApplication.objects.all())
@@ -0,0 +1,63 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from ai_engine.credit_scorer import CreditScorer
+
+from . import scoring_jobs
+from .models import ScoringJob
+from .scoring_jobs import MAX_ATTEMPTS, claim_jobs, enqueue_scoring, process_jobs, requeue_stale_jobs
+from .testing import make_loan
+
+
+class ScoringJobTests(TestCase):
+    def setUp(self):
+        self.loans = [make_loan() for _ in range(4)]
+        self.jobs = [enqueue_scoring(loan) for loan in self.loans]
+
+    def test_enqueue_reuses_the_waiting_job(self):
+        self.assertEqual(enqueue_scoring(self.loans[0]), self.jobs[0])
+        self.assertEqual(ScoringJob.objects.count(), 4)
+
+    def test_claimed_jobs_are_scored(self):
+        job_ids = claim_jobs('worker-1', 10)
+        self.assertEqual(claim_jobs('worker-2', 10), [])
+        self.assertEqual(process_jobs(job_ids), 4)
+
+        scorer = CreditScorer()
+        for loan in self.loans:
+            loan.refresh_from_db()
+            self.assertEqual((loan.credit_score, loan.fraud_risk_level, loan.ai_recommendation),
+                             scorer.score_application(loan))
+        self.assertEqual(ScoringJob.objects.filter(status='completed').count(), 4)
+
+    def test_a_failing_loan_only_fails_its_own_job(self):
+        bad = self.loans[1].id
+        feature_frame = scoring_jobs.feature_frame
+
+        def frame(loan_ids):
+            if bad in loan_ids:
+                raise ValueError('broken features')
+            return feature_frame(loan_ids)
+
+        with mock.patch.object(scoring_jobs, 'feature_frame', frame):
+            for attempt in range(1, MAX_ATTEMPTS + 1):
+                self.assertEqual(process_jobs(claim_jobs('worker-1', 10)), 3 if attempt == 1 else 0)
+                job = ScoringJob.objects.get(application_id=bad)
+                self.assertEqual((job.attempts, job.error), (attempt, 'broken features'))
+                self.assertEqual(job.status, 'failed' if attempt == MAX_ATTEMPTS else 'pending')
+
+        self.assertEqual(ScoringJob.objects.filter(status='completed').count(), 3)
+
+    def test_stale_jobs_are_requeued_until_out_of_attempts(self):
+        claim_jobs('worker-1', 10)
+        ScoringJob.objects.update(started_at=timezone.now() - timedelta(hours=1))
+        ScoringJob.objects.filter(pk=self.jobs[0].pk).update(attempts=MAX_ATTEMPTS)
+
+        self.assertEqual(requeue_stale_jobs(600), (3, 1))
+        failed = ScoringJob.objects.get(pk=self.jobs[0].pk)
+        self.assertEqual((failed.status, failed.error), ('failed', 'Worker stopped while scoring'))
+        self.assertEqual(ScoringJob.objects.filter(status='pending', worker='').count(), 3)
+        self.assertEqual(requeue_stale_jobs(600), (0, 0))
@@ -0,0 +1,90 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from .models import Notification
+from .notifications import notify_user
+from .test_score_cache import SharedCacheTestCase
+from .testing import make_user
+from .unread_counts import unread_count, unread_hits, unread_key
+
+
+class UnreadCountTestsMixin:
+    def setUp(self):
+        super().setUp()
+        self.user = make_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def notify(self, count=1):
+        with self.captureOnCommitCallbacks(execute=True):
+            return [notify_user(self.user, 'Title', 'Message', email=False, sms=False) for _ in range(count)]
+
+    def post(self, url):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.post(url).status_code, 200)
+
+    def api_count(self):
+        return self.client.get('/api/notifications/unread_count/').data['unread_count']
+
+    def test_counts_follow_notifications(self):
+        first, second, third = self.notify(3)
+        self.assertEqual(self.api_count(), 3)
+
+        self.post(f'/api/notifications/{first.pk}/mark_read/')
+        self.post(f'/api/notifications/{first.pk}/mark_read/')
+        self.assertEqual(self.api_count(), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.delete(f'/api/notifications/{second.pk}/').status_code, 204)
+        self.assertEqual(self.api_count(), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f'/api/notifications/{third.pk}/', {'is_read': True}, format='json')
+        self.assertEqual(self.api_count(), 0)
+
+        self.notify(2)
+        self.post('/api/notifications/mark_all_read/')
+        self.assertEqual(self.api_count(), 0)
+
+    def test_other_users_are_not_counted(self):
+        self.notify()
+        notify_user(make_user(), 'Title', 'Message', email=False, sms=False)
+        self.assertEqual(unread_count(self.user.pk), 1)
+
+
+class SharedUnreadCountTests(UnreadCountTestsMixin, SharedCacheTestCase):
+    def test_counts_are_adjusted_in_the_cache(self):
+        self.assertEqual(unread_count(self.user.pk), 0)
+        self.notify(2)
+
+        hits = unread_hits.value()
+        with self.assertNumQueries(0):
+            self.assertEqual(unread_count(self.user.pk), 2)
+        self.assertEqual(unread_hits.value(), hits + 1)
+
+    def test_rolled_back_notifications_are_not_counted(self):
+        self.assertEqual(unread_count(self.user.pk), 0)
+        with self.captureOnCommitCallbacks(execute=False):
+            notify_user(self.user, 'Title', 'Message', email=False, sms=False)
+        self.assertEqual(unread_count(self.user.pk), 0)
+
+    def test_negative_count_is_recounted(self):
+        cache.set(unread_key(self.user.pk), 0)
+        Notification.objects.create(user=self.user, title='Title', message='Message')
+        notification = Notification.objects.create(user=self.user, title='Title', message='Message')
+
+        self.post(f'/api/notifications/{notification.pk}/mark_read/')
+        self.assertIsNone(cache.get(unread_key(self.user.pk)))
+        self.assertEqual(unread_count(self.user.pk), 1)
+
+
+class UnsharedUnreadCountTests(UnreadCountTestsMixin, TestCase):
+    def test_per_process_cache_is_not_used(self):
+        cache.set(unread_key(self.user.pk), 5)
+        self.addCleanup(cache.delete, unread_key(self.user.pk))
+        # Notifications created by another worker adjust only that worker's cache
+        Notification.objects.create(user=self.user, title='Title', message='Message')
+
+        with self.assertNumQueries(1):
+            self.assertEqual(unread_count(self.user.pk), 1)
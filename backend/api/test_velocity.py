@@ -0,0 +1,96 @@
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+
+from . import velocity
+from .models import VelocityBucket
+from .velocity import bucket_counts, client_ip, record, velocities, velocity_backend
+
+
+class ClientIpTests(SimpleTestCase):
+    def ip(self, remote_addr='10.0.0.1', forwarded=None):
+        headers = {'HTTP_X_FORWARDED_FOR': forwarded} if forwarded is not None else {}
+        return client_ip(RequestFactory().get('/', REMOTE_ADDR=remote_addr, **headers))
+
+    def test_direct_connections_ignore_forwarded_for(self):
+        self.assertEqual(self.ip(forwarded='1.2.3.4'), '10.0.0.1')
+
+    @override_settings(TRUSTED_PROXY_COUNT=1)
+    def test_one_proxy_takes_the_entry_it_appended(self):
+        self.assertEqual(self.ip(forwarded='203.0.113.7'), '203.0.113.7')
+        # The client forged the first entry; the proxy appended the real address
+        self.assertEqual(self.ip(forwarded='1.2.3.4, 203.0.113.7'), '203.0.113.7')
+
+    @override_settings(TRUSTED_PROXY_COUNT=2)
+    def test_two_proxies(self):
+        self.assertEqual(self.ip(forwarded='1.2.3.4, 203.0.113.7, 10.0.0.9'), '203.0.113.7')
+        # Fewer hops than proxies: the request did not come through them all
+        self.assertEqual(self.ip(forwarded='203.0.113.7'), '10.0.0.1')
+
+    @override_settings(TRUSTED_PROXY_COUNT=1)
+    def test_invalid_addresses(self):
+        self.assertIsNone(self.ip(forwarded='unknown'))
+        self.assertEqual(self.ip(forwarded=' 2001:DB8::1 '), '2001:db8::1')
+        self.assertIsNone(self.ip(remote_addr='', forwarded=''))
+
+
+class VelocityTestsMixin:
+    now = 1_700_000_000
+
+    def setUp(self):
+        # A fresh backend per test; the memory one would keep counts between tests
+        velocity._backend_name = None
+        self.addCleanup(setattr, velocity, '_backend_name', None)
+
+    def count(self, value, window, dimension='phone', at=None):
+        return velocities([('application', dimension, value, window)], at=at or self.now)[
+            'application', dimension, value, window
+        ]
+
+    def test_windows(self):
+        record('application', {'phone': '9841000000'}, at=self.now - 2 * 60 * 60)
+        record('application', {'phone': '9841000000'}, at=self.now - 10 * 60)
+        record('application', {'phone': '9841000000'}, at=self.now)
+
+        self.assertEqual(self.count('9841000000', '1h'), 2)
+        self.assertEqual(self.count('9841000000', '24h'), 3)
+        self.assertEqual(self.count('9841000000', '30d'), 3)
+        self.assertEqual(self.count('9841000000', '24h', at=self.now + 25 * 60 * 60), 0)
+
+    def test_identities_are_normalized_and_counted_separately(self):
+        record('application', {'phone': '+977 984-100-0000', 'customer': 7, 'ip': None}, at=self.now)
+        record('application', {'phone': '9841000000'}, at=self.now)
+
+        self.assertEqual(self.count('98 4100 0000', '1h'), 2)
+        self.assertEqual(self.count(7, '1h', dimension='customer'), 1)
+        self.assertEqual(self.count('9841000001', '1h'), 0)
+        self.assertEqual(self.count('', '1h'), 0)
+
+    def test_prune_keeps_live_buckets(self):
+        record('application', {'phone': '9841000000'}, at=self.now - 40 * 24 * 60 * 60)
+        record('application', {'phone': '9841000000'}, at=self.now)
+        velocity_backend().prune(self.now)
+        self.assertEqual(self.count('9841000000', '30d'), 1)
+
+    def test_loaded_counts_match_recorded_ones(self):
+        events = [('application', {'phone': '9841000000', 'customer': 1}, self.now - offset) for offset in (0, 90, 4000)]
+        velocity_backend().load(bucket_counts(events))
+        loaded = [self.count('9841000000', window) for window in velocity.WINDOWS]
+
+        velocity_backend().clear(['application'])
+        for event, identities, at in events:
+            record(event, identities, at=at)
+        self.assertEqual([self.count('9841000000', window) for window in velocity.WINDOWS], loaded)
+        self.assertEqual(loaded, [2, 3, 3])
+
+
+@override_settings(VELOCITY_BACKEND='memory')
+class MemoryVelocityTests(VelocityTestsMixin, SimpleTestCase):
+    pass
+
+
+@override_settings(VELOCITY_BACKEND='database')
+class DatabaseVelocityTests(VelocityTestsMixin, TestCase):
+    def test_one_row_per_bucket(self):
+        for _ in range(3):
+            record('application', {'phone': '9841000000'}, at=self.now)
+        self.assertEqual(VelocityBucket.objects.count(), len(velocity.WINDOWS))
+        self.assertEqual(set(VelocityBucket.objects.values_list('count', flat=True)), {3})
@@ -0,0 +1,49 @@
+"""Fixtures shared by the api test modules"""
+import itertools
+from decimal import Decimal
+
+from django.utils import timezone
+
+from ai_engine.amortization import calculate_emi
+from .models import LoanApplication, User, Vehicle
+
+
+_sequence = itertools.count(1)
+
+
+def make_user(user_type='customer', **fields):
+    n = next(_sequence)
+    fields = {
+        'username': f'user{n}',
+        'email': f'user{n}@example.com',
+        'phone': f'+97798{n:08d}',
+        'user_type': user_type,
+        **fields,
+    }
+    return User.objects.create_user(password='password', **fields)
+
+
+def make_vehicle(price=Decimal('3000000'), **fields):
+    fields = {
+        'name': 'Test Vehicle', 'brand': 'Brand', 'model': 'Model', 'year': 2024,
+        'vehicle_type': 'car', 'fuel_type': 'petrol', 'price': price,
+        **fields,
+    }
+    return Vehicle.objects.create(**fields)
+
+
+def make_loan(customer=None, vehicle=None, loan_amount=Decimal('1000000'), interest_rate=Decimal('12.00'),
+              tenure_months=24, **fields):
+    fields = {
+        'down_payment': Decimal('500000'),
+        'monthly_income': Decimal('150000'),
+        'employment_type': 'salaried',
+        'status': 'submitted',
+        'submitted_at': timezone.now(),
+        'monthly_emi': calculate_emi(loan_amount, interest_rate, tenure_months),
+        **fields,
+    }
+    return LoanApplication.objects.create(
+        customer=customer or make_user(), vehicle=vehicle or make_vehicle(),
+        loan_amount=loan_amount, interest_rate=interest_rate, tenure_months=tenure_months, **fields
+    )
@@ -0,0 +1,64 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .caching import cache_is_shared
+from .metrics import counter
+from .models import Notification
+
+
+unread_hits = counter('unread_count_cache_hits_total', 'Unread notification counts served from the cache')
+unread_misses = counter('unread_count_cache_misses_total', 'Unread notification counts recounted from the table')
+
+
+def unread_key(user_id):
+    return f'notifications:unread:{user_id}'
+
+
+def unread_count(user_id):
+    """
+    A user's unread notifications. With a shared cache the count is cached
+    and adjusted as notifications are created and read, so polling it is a
+    cache read; a missing or expired entry, or a per-process cache that
+    other workers' adjustments never reach, is counted with the
+    (user, is_read, created_at) index.
+    """
+    if not cache_is_shared():
+        return Notification.objects.filter(user_id=user_id, is_read=False).count()
+
+    count = cache.get(unread_key(user_id))
+    if count is not None:
+        unread_hits.inc()
+        return count
+
+    unread_misses.inc()
+    count = Notification.objects.filter(user_id=user_id, is_read=False).count()
+    cache.set(unread_key(user_id), count, settings.UNREAD_COUNT_TTL)
+    return count
+
+
+def adjust_unread(changes):
+    """
+    Add {user_id: delta} to the cached counts once the transaction commits.
+    Users without a cached count are left alone; their next read recounts.
+    """
+    def apply():
+        for user_id, delta in changes.items():
+            try:
+                if cache.incr(unread_key(user_id), delta) < 0:
+                    cache.delete(unread_key(user_id))
+            except ValueError:
+                pass
+
+    changes = {user_id: delta for user_id, delta in changes.items() if delta}
+    if changes:
+        transaction.on_commit(apply)
+
+
+def reset_unread(user_id):
+    """Cache a count of zero once the transaction commits, e.g. after marking everything read"""
+    transaction.on_commit(lambda: cache.set(unread_key(user_id), 0, settings.UNREAD_COUNT_TTL))
+
+
+def forget_unread(user_id):
+    transaction.on_commit(lambda: cache.delete(unread_key(user_id)))
@@ -17,8 +17,18 @@ urlpatterns = [
     path('auth/profile/', views.get_profile, name='profile'),
     path('auth/profile/update/', views.update_profile, name='update-profile'),
     
+    # EMI calculator
+    path('emi/quote/', views.emi_quote, name='emi-quote'),
+    
     # Dashboard
     path('dashboard/stats/', views.dashboard_stats, name='dashboard-stats'),
+    path('dashboard/cash-flow/', views.cash_flow_projection, name='cash-flow-projection'),
+    
+    # Push streams (served by vehicle_finance/asgi.py at /api/push/)
+    path('push/ticket/', views.push_ticket, name='push-ticket'),
+    
+    # Monitoring
+    path('metrics/', views.metrics, name='metrics'),
     
     # Router URLs
     path('', include(router.urls)),
@@ -0,0 +1,245 @@
+import hashlib
+import ipaddress
+import re
+import threading
+import time
+from collections import defaultdict
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q, Sum
+
+from .models import VelocityBucket
+from .parallel import chunked
+
+
+# name: (span in seconds, bucket width in seconds). A window sums the buckets
+# that started within its span, so counts are exact to one bucket width.
+WINDOWS = {
+    '1h': (60 * 60, 5 * 60),
+    '24h': (24 * 60 * 60, 60 * 60),
+    '30d': (30 * 24 * 60 * 60, 24 * 60 * 60),
+}
+
+# (key, window) pairs read per query, within the bound-parameter limits of SQLite
+READ_BATCH_SIZE = 2000
+
+
+def normalize(dimension, value):
+    """Canonical form of an identity value, so '98-4100 0000' and '9841000000' count together"""
+    value = str(value).strip()
+    if dimension == 'phone':
+        value = re.sub(r'\D', '', value)[-10:]
+    elif dimension == 'citizenship':
+        value = re.sub(r'[^0-9A-Za-z]', '', value).upper()
+    elif dimension == 'address':
+        value = ' '.join(re.sub(r'[^0-9a-z]+', ' ', value.lower()).split())
+    elif dimension == 'username':
+        value = value.lower()
+    return value
+
+
+def identity_digest(dimension, value):
+    """Digest of a normalized identity value, stored instead of phone or document numbers"""
+    return hashlib.blake2b(normalize(dimension, value).encode(), digest_size=12).hexdigest()
+
+
+def counter_key(event, dimension, value):
+    return f'{event}:{dimension}:{identity_digest(dimension, value)}'
+
+
+def bucket_index(window, at):
+    return int(at // WINDOWS[window][1])
+
+
+def first_live_bucket(window, at):
+    span, width = WINDOWS[window]
+    return bucket_index(window, at) - span // width + 1
+
+
+class MemoryBackend:
+    """Buckets in a dict of this process. Counts are not shared between workers."""
+
+    def __init__(self):
+        self.buckets = defaultdict(dict)
+        self.lock = threading.Lock()
+
+    def increment(self, keys, at):
+        with self.lock:
+            for key in keys:
+                for window in WINDOWS:
+                    buckets = self.buckets[key, window]
+                    index = bucket_index(window, at)
+                    buckets[index] = buckets.get(index, 0) + 1
+
+    def counts(self, key_windows, at):
+        live = {window: first_live_bucket(window, at) for window in WINDOWS}
+        with self.lock:
+            return {
+                (key, window): sum(
+                    count for index, count in self.buckets.get((key, window), {}).items() if index >= live[window]
+                )
+                for key, window in key_windows
+            }
+
+    def load(self, counts):
+        with self.lock:
+            for (key, window, index), count in counts.items():
+                self.buckets[key, window][index] = count
+
+    def prune(self, at):
+        with self.lock:
+            for (key, window), buckets in list(self.buckets.items()):
+                live = first_live_bucket(window, at)
+                for index in [index for index in buckets if index < live]:
+                    del buckets[index]
+                if not buckets:
+                    del self.buckets[key, window]
+
+    def clear(self, events):
+        with self.lock:
+            for key, window in list(self.buckets):
+                if key.split(':', 1)[0] in events:
+                    del self.buckets[key, window]
+
+
+class DatabaseBackend:
+    """Buckets in velocity_buckets, shared by every worker"""
+
+    def increment(self, keys, at):
+        rows = [
+            VelocityBucket(key=key, window=window, bucket=bucket_index(window, at))
+            for key in keys for window in WINDOWS
+        ]
+        with transaction.atomic():
+            VelocityBucket.objects.bulk_create(rows, ignore_conflicts=True)
+            VelocityBucket.objects.filter(
+                reduce(or_, [Q(key=row.key, window=row.window, bucket=row.bucket) for row in rows])
+            ).update(count=F('count') + 1)
+
+    def counts(self, key_windows, at):
+        counts = dict.fromkeys(key_windows, 0)
+        for chunk in chunked(key_windows, READ_BATCH_SIZE):
+            by_window = defaultdict(list)
+            for key, window in chunk:
+                by_window[window].append(key)
+            rows = (
+                VelocityBucket.objects
+                .filter(reduce(or_, [
+                    Q(window=window, key__in=keys, bucket__gte=first_live_bucket(window, at))
+                    for window, keys in by_window.items()
+                ]))
+                .values('key', 'window')
+                .annotate(total=Sum('count'))
+                .values_list('key', 'window', 'total')
+            )
+            for key, window, total in rows:
+                counts[key, window] = total
+        return counts
+
+    def load(self, counts):
+        VelocityBucket.objects.bulk_create(
+            [VelocityBucket(key=key, window=window, bucket=index, count=count) for (key, window, index), count in counts.items()],
+            batch_size=5000, update_conflicts=True, unique_fields=['key', 'window', 'bucket'], update_fields=['count'],
+        )
+
+    def prune(self, at):
+        VelocityBucket.objects.filter(reduce(or_, [
+            Q(window=window, bucket__lt=first_live_bucket(window, at)) for window in WINDOWS
+        ])).delete()
+
+    def clear(self, events):
+        VelocityBucket.objects.filter(reduce(or_, [Q(key__startswith=f'{event}:') for event in events])).delete()
+
+
+BACKENDS = {
+    'memory': MemoryBackend,
+    'database': DatabaseBackend,
+}
+
+_backend = None
+_backend_name = None
+_next_prune = 0
+_backend_lock = threading.Lock()
+
+
+def velocity_backend():
+    """Backend chosen by VELOCITY_BACKEND, created once per process"""
+    global _backend, _backend_name
+    name = settings.VELOCITY_BACKEND
+    if name != _backend_name:
+        with _backend_lock:
+            if name not in BACKENDS:
+                raise ValueError(f"Unknown VELOCITY_BACKEND: {name}")
+            _backend, _backend_name = BACKENDS[name](), name
+    return _backend
+
+
+def record(event, identities, at=None):
+    """
+    Count one event (e.g. 'application') against each identity in
+    `identities` ({'customer': id, 'phone': ..., 'ip': ...}). Empty values
+    are skipped. Expired buckets are dropped every VELOCITY_PRUNE_SECONDS.
+    """
+    global _next_prune
+    at = time.time() if at is None else at
+    keys = [counter_key(event, dimension, value) for dimension, value in identities.items() if value]
+    if not keys:
+        return
+    backend = velocity_backend()
+    backend.increment(keys, at)
+
+    if time.monotonic() >= _next_prune:
+        _next_prune = time.monotonic() + settings.VELOCITY_PRUNE_SECONDS
+        backend.prune(at)
+
+
+def bucket_counts(events):
+    """
+    Bucket counts {(key, window, bucket): count} of many past (event,
+    identities, timestamp) triples, for rebuilding counters in bulk
+    """
+    counts = defaultdict(int)
+    for event, identities, at in events:
+        for dimension, value in identities.items():
+            if value:
+                key = counter_key(event, dimension, value)
+                for window in WINDOWS:
+                    counts[key, window, bucket_index(window, at)] += 1
+    return counts
+
+
+def velocities(queries, at=None):
+    """
+    Counts for many (event, dimension, value, window) queries, read in
+    batches of READ_BATCH_SIZE. Returns {query: count}; queries with an empty value count 0.
+    """
+    at = time.time() if at is None else at
+    keyed = {
+        query: (counter_key(*query[:3]), query[3])
+        for query in queries if query[2]
+    }
+    counts = velocity_backend().counts(set(keyed.values()), at)
+    return {query: counts[keyed[query]] if query in keyed else 0 for query in queries}
+
+
+def application_identities(customer_id, phone, citizenship_number, ip=None):
+    return {'customer': customer_id, 'phone': phone, 'citizenship': citizenship_number, 'ip': ip}
+
+
+def client_ip(request):
+    """
+    Address of the client. Entries before the ones our TRUSTED_PROXY_COUNT
+    proxies appended to X-Forwarded-For are set by the client and ignored.
+    None when the address is missing or not an IP.
+    """
+    address = request.META.get('REMOTE_ADDR', '')
+    hops = [hop.strip() for hop in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if hop.strip()]
+    if settings.TRUSTED_PROXY_COUNT and len(hops) >= settings.TRUSTED_PROXY_COUNT:
+        address = hops[-settings.TRUSTED_PROXY_COUNT]
+    try:
+        return str(ipaddress.ip_address(address))
+    except ValueError:
+        return None
@@ -1,14 +1,19 @@
+import uuid
+
 from rest_framework import viewsets, status, filters
-from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.decorators import action, api_view, authentication_classes, permission_classes
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
 from django.utils import timezone
+from django.db import transaction
 from django.db.models import Q
-from datetime import timedelta
-from decimal import Decimal
-import math
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.utils.crypto import constant_time_compare
+from django.utils.cache import patch_cache_control
 
 from .models import (
     User, Vehicle, LoanApplication, Document,
@@ -16,11 +21,25 @@ from .models import (
 )
 from .serializers import (
     UserSerializer, VehicleSerializer, LoanApplicationSerializer,
-    DocumentSerializer, EMIScheduleSerializer, PaymentSerializer,
-    NotificationSerializer
+    EMIScheduleSerializer, PaymentSerializer,
+    NotificationSerializer, EMIQuoteSerializer, PrepaymentSerializer, document_serializer_class
+)
+from ai_engine.amortization import (
+    calculate_emi, quote_emi, simulate_prepayment, simulate_prepayments, PREPAYMENT_STRATEGIES
 )
 from ai_engine.credit_scorer import CreditScorer
 from .notifications import notify_user
+from .metrics import recent_snapshots, registry
+from .projections import cached_cash_flow
+from .push import issue_ticket
+from .score_cache import cached_score, peek_cached_score
+from .scoring_jobs import enqueue_scoring
+from .unread_counts import adjust_unread, forget_unread, reset_unread, unread_count
+from .velocity import application_identities, client_ip, record
+from .schedules import (
+    ScheduleRows, create_emi_schedule, find_virtual_row, is_lazy_schedule_mode, schedule_start_date,
+    upcoming_virtual_rows,
+)
 
 
 # ----------------- Authentication Views ----------------- #
@@ -47,13 +66,16 @@ def login(request):
     password = request.data.get('password')
 
     user = authenticate(username=username, password=password)
+    ip = client_ip(request)
     if user:
+        record('login', {'customer': user.pk, 'ip': ip})
         refresh = RefreshToken.for_user(user)
         return Response({
             'user': UserSerializer(user).data,
             'refresh': str(refresh),
             'access': str(refresh.access_token),
         })
+    record('login_failed', {'username': username, 'ip': ip})
     return Response({'error': 'Invalid credentials'}, status=status.HTTP_401_UNAUTHORIZED)
 
 
@@ -119,6 +141,10 @@ class VehicleViewSet(viewsets.ModelViewSet):
 
 # ----------------- Loan Application ViewSet ----------------- #
 
+# Upper bound on prepayment scenarios simulated by a single request
+MAX_PREPAYMENT_SCENARIOS = 500
+
+
 class LoanApplicationViewSet(viewsets.ModelViewSet):
     serializer_class = LoanApplicationSerializer
     permission_classes = [IsAuthenticated]
@@ -132,54 +158,79 @@ class LoanApplicationViewSet(viewsets.ModelViewSet):
         return LoanApplication.objects.none()
 
     def perform_create(self, serializer):
-        loan = serializer.save(
-            customer=self.request.user,
-            status='submitted',
-            submitted_at=timezone.now()
-        )
-        self.calculate_emi(loan)
-
-        notify_user(
-            user=loan.customer,
-            title='Loan Application Submitted',
-            message=f'Your loan application {loan.application_number} has been submitted successfully.'
-        )
-
-    def calculate_emi(self, loan):
-        P = float(loan.loan_amount)
-        r = float(loan.interest_rate) / (12 * 100)
-        n = loan.tenure_months
+        customer = self.request.user
+        ip = client_ip(self.request)
+        with transaction.atomic():
+            loan = serializer.save(
+                customer=customer,
+                status='submitted',
+                submitted_at=timezone.now(),
+                submitted_ip=ip,
+                monthly_emi=self.calculate_emi(serializer.validated_data)
+            )
+            if not is_lazy_schedule_mode():
+                self.generate_emi_schedule(loan)
+
+            notify_user(
+                user=loan.customer,
+                title='Loan Application Submitted',
+                message=f'Your loan application {loan.application_number} has been submitted successfully.',
+                priority='low'
+            )
 
-        if r == 0:
-            emi = P / n
-        else:
-            emi = P * r * math.pow(1 + r, n) / (math.pow(1 + r, n) - 1)
+        record('application', application_identities(customer.pk, customer.phone, customer.citizenship_number, ip))
 
-        loan.monthly_emi = round(Decimal(emi), 2)
-        loan.save()
-        self.generate_emi_schedule(loan)
+    def calculate_emi(self, data):
+        interest_rate = data.get('interest_rate', LoanApplication._meta.get_field('interest_rate').get_default())
+        return calculate_emi(data['loan_amount'], interest_rate, data['tenure_months'])
 
     def generate_emi_schedule(self, loan):
-        remaining_balance = float(loan.loan_amount)
-        monthly_rate = float(loan.interest_rate) / (12 * 100)
-        emi_amount = float(loan.monthly_emi)
-
-        for i in range(1, loan.tenure_months + 1):
-            interest = remaining_balance * monthly_rate
-            principal = emi_amount - interest
-            remaining_balance -= principal
-
-            due_date = timezone.now().date() + timedelta(days=30 * i)
-
-            EMISchedule.objects.create(
-                application=loan,
-                emi_number=i,
-                due_date=due_date,
-                emi_amount=loan.monthly_emi,
-                principal_amount=round(Decimal(principal), 2),
-                interest_amount=round(Decimal(interest), 2),
-                remaining_balance=max(round(Decimal(remaining_balance), 2), Decimal(0))
-            )
+        create_emi_schedule(loan)
+
+    @action(detail=True, methods=['post'])
+    def prepayment(self, request, pk=None):
+        """
+        Simulate a prepayment: {"amount", "month", "strategy"?} returns the
+        outcome with the recomputed remaining schedule; {"scenarios": [...]}
+        evaluates many prepayments at once. Without a strategy both
+        'reduce_emi' and 'reduce_tenure' are returned.
+        """
+        loan = self.get_object()
+        strategy = request.data.get('strategy')
+        if strategy is not None and strategy not in PREPAYMENT_STRATEGIES:
+            return Response({'error': f'strategy must be one of {", ".join(PREPAYMENT_STRATEGIES)}'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        strategies = [strategy] if strategy else list(PREPAYMENT_STRATEGIES)
+
+        batch = 'scenarios' in request.data
+        if batch and isinstance(request.data['scenarios'], list) and len(request.data['scenarios']) > MAX_PREPAYMENT_SCENARIOS:
+            return Response({'error': f'At most {MAX_PREPAYMENT_SCENARIOS} scenarios per request'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        serializer = PrepaymentSerializer(
+            data=request.data['scenarios'] if batch else request.data, many=batch
+        )
+        serializer.is_valid(raise_exception=True)
+        scenarios = serializer.validated_data if batch else [serializer.validated_data]
+        if any(item['month'] >= loan.tenure_months for item in scenarios):
+            return Response({'error': f'month must be lower than the tenure of {loan.tenure_months} months'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        emi = loan.monthly_emi or calculate_emi(loan.loan_amount, loan.interest_rate, loan.tenure_months)
+        terms = (loan.loan_amount, loan.interest_rate, loan.tenure_months, emi)
+
+        if batch:
+            months = [item['month'] for item in scenarios]
+            amounts = [item['amount'] for item in scenarios]
+            return Response({
+                name: simulate_prepayments(*terms, months, amounts, name) for name in strategies
+            })
+
+        results = {}
+        for name in strategies:
+            result = simulate_prepayment(*terms, scenarios[0]['month'], scenarios[0]['amount'], name)
+            result['schedule'] = list(result['schedule'].rows(schedule_start_date(loan))) if result['schedule'] else []
+            results[name] = result
+        return Response(results)
 
     @action(detail=True, methods=['post'])
     def verify_documents(self, request, pk=None):
@@ -190,26 +241,44 @@ class LoanApplicationViewSet(viewsets.ModelViewSet):
         loan.status = 'documents_verified'
         loan.verified_by = request.user
         loan.verified_at = timezone.now()
-        loan.save()
-
-        notify_user(
-            user=loan.customer,
-            title='Documents Verified',
-            message=f'Your documents for application {loan.application_number} have been verified.'
-        )
+        with transaction.atomic():
+            loan.save()
+            notify_user(
+                user=loan.customer,
+                title='Documents Verified',
+                message=f'Your documents for application {loan.application_number} have been verified.',
+                priority='low'
+            )
 
         return Response({'message': 'Documents verified successfully'})
 
-    @action(detail=True, methods=['post'])
+    @action(detail=True, methods=['get', 'post'])
     def ai_score(self, request, pk=None):
+        """
+        POST queues the application for scoring and returns 202 with the job;
+        cached scores are returned right away. GET reports the latest job.
+        """
         loan = self.get_object()
-        scorer = CreditScorer()
-        score, risk_level, recommendation = scorer.score_application(loan)
+        if request.method == 'GET':
+            return Response(self.scoring_status(loan))
+
+        if settings.AI_SCORING_ASYNC:
+            job = loan.scoring_jobs.order_by('-created_at').first()
+            if job and job.status == 'completed' and job.finished_at >= loan.updated_at:
+                # Scored by the worker since the application last changed
+                return Response(self.scoring_status(loan))
+            result = peek_cached_score(CreditScorer(), loan)
+            if result is None:
+                job = enqueue_scoring(loan, request.user)
+                return Response({'job_id': job.id, 'status': job.status}, status=status.HTTP_202_ACCEPTED)
+        else:
+            result = cached_score(CreditScorer(), loan)
 
+        score, risk_level, recommendation = result
         loan.credit_score = score
         loan.fraud_risk_level = risk_level
         loan.ai_recommendation = recommendation
-        loan.save()
+        loan.save(update_fields=['credit_score', 'fraud_risk_level', 'ai_recommendation', 'updated_at'])
 
         return Response({
             'credit_score': score,
@@ -217,6 +286,18 @@ class LoanApplicationViewSet(viewsets.ModelViewSet):
             'recommendation': recommendation
         })
 
+    def scoring_status(self, loan):
+        job = loan.scoring_jobs.order_by('-created_at').first()
+        return {
+            'job_id': job.id if job else None,
+            'status': job.status if job else ('completed' if loan.credit_score is not None else 'not_requested'),
+            'error': job.error if job else '',
+            'finished_at': job.finished_at if job else None,
+            'credit_score': loan.credit_score,
+            'risk_level': loan.fraud_risk_level,
+            'recommendation': loan.ai_recommendation,
+        }
+
     @action(detail=True, methods=['post'])
     def approve(self, request, pk=None):
         loan = self.get_object()
@@ -226,13 +307,13 @@ class LoanApplicationViewSet(viewsets.ModelViewSet):
         loan.status = 'approved'
         loan.approved_by = request.user
         loan.approved_at = timezone.now()
-        loan.save()
-
-        notify_user(
-            user=loan.customer,
-            title='Loan Approved!',
-            message=f'Your loan application {loan.application_number} has been approved.'
-        )
+        with transaction.atomic():
+            loan.save()
+            notify_user(
+                user=loan.customer,
+                title='Loan Approved!',
+                message=f'Your loan application {loan.application_number} has been approved.'
+            )
 
         return Response({'message': 'Loan approved successfully'})
 
@@ -245,13 +326,13 @@ class LoanApplicationViewSet(viewsets.ModelViewSet):
         reason = request.data.get('reason', '')
         loan.status = 'rejected'
         loan.rejection_reason = reason
-        loan.save()
-
-        notify_user(
-            user=loan.customer,
-            title='Loan Application Rejected',
-            message=f'Your loan application {loan.application_number} has been rejected. Reason: {reason}'
-        )
+        with transaction.atomic():
+            loan.save()
+            notify_user(
+                user=loan.customer,
+                title='Loan Application Rejected',
+                message=f'Your loan application {loan.application_number} has been rejected. Reason: {reason}'
+            )
 
         return Response({'message': 'Loan rejected'})
 
@@ -259,14 +340,22 @@ class LoanApplicationViewSet(viewsets.ModelViewSet):
 # ----------------- Document ViewSet ----------------- #
 
 class DocumentViewSet(viewsets.ModelViewSet):
-    serializer_class = DocumentSerializer
     permission_classes = [IsAuthenticated]
 
+    def get_serializer_class(self):
+        return document_serializer_class(self.request.user)
+
     def get_queryset(self):
         user = self.request.user
+        # Listings only read the metadata recorded at upload, never the files
+        documents = Document.objects.select_related('verified_by')
         if user.user_type == 'customer':
-            return Document.objects.filter(application__customer=user)
-        return Document.objects.all()
+            return documents.filter(application__customer=user)
+        return documents
+
+    def perform_create(self, serializer):
+        serializer.save()
+        record('document', {'customer': self.request.user.pk, 'ip': client_ip(self.request)})
 
     @action(detail=True, methods=['post'])
     def verify(self, request, pk=None):
@@ -286,23 +375,74 @@ class DocumentViewSet(viewsets.ModelViewSet):
 # ----------------- EMI Schedule ViewSet ----------------- #
 
 class EMIScheduleViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Stored installments plus the on-demand schedules of loans whose rows
+    are not materialized yet (see EMI_SCHEDULE_MODE)
+    """
     serializer_class = EMIScheduleSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
         user = self.request.user
         if user.user_type == 'customer':
-            return EMISchedule.objects.filter(application__customer=user)
-        return EMISchedule.objects.all()
+            queryset = EMISchedule.objects.filter(application__customer=user)
+        else:
+            queryset = EMISchedule.objects.all()
+
+        application = self.application_filter()
+        if application:
+            queryset = queryset.filter(application_id=application)
+        return queryset
+
+    def application_filter(self):
+        """The ?application= loan ID, or None; anything else is a 400"""
+        application = self.request.query_params.get('application')
+        if not application:
+            return None
+        try:
+            return uuid.UUID(application)
+        except ValueError:
+            raise ValidationError({'application': 'Not a valid loan application ID'})
+
+    def get_lazy_loans(self):
+        user = self.request.user
+        loans = LoanApplication.objects.exclude(status='disbursed').filter(
+            monthly_emi__isnull=False, emi_schedules__isnull=True
+        )
+        if user.user_type == 'customer':
+            loans = loans.filter(customer=user)
+
+        application = self.application_filter()
+        if application:
+            loans = loans.filter(id=application)
+        return loans
+
+    def get_object(self):
+        try:
+            return super().get_object()
+        except Http404:
+            row = find_virtual_row(self.get_lazy_loans(), self.kwargs['pk'])
+            if row is None:
+                raise
+            return row
+
+    def list(self, request, *args, **kwargs):
+        rows = ScheduleRows(self.get_queryset(), self.get_lazy_loans())
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return Response(self.get_serializer(rows[0:None], many=True).data)
 
     @action(detail=False, methods=['get'])
     def upcoming(self, request):
         today = timezone.now().date()
-        upcoming = self.get_queryset().filter(
+        upcoming = list(self.get_queryset().filter(
             status='pending',
             due_date__gte=today
-        ).order_by('due_date')[:5]
-        serializer = self.get_serializer(upcoming, many=True)
+        ).order_by('due_date')[:5])
+        upcoming += upcoming_virtual_rows(self.get_lazy_loans(), today, 5)
+        upcoming.sort(key=lambda row: row.due_date)
+        serializer = self.get_serializer(upcoming[:5], many=True)
         return Response(serializer.data)
 
 
@@ -328,19 +468,80 @@ class NotificationViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         return Notification.objects.filter(user=self.request.user)
 
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        forget_unread(self.request.user.pk)
+
+    def perform_destroy(self, instance):
+        instance.delete()
+        if not instance.is_read:
+            adjust_unread({self.request.user.pk: -1})
+
+    @action(detail=False, methods=['get'])
+    def unread_count(self, request):
+        return Response({'unread_count': unread_count(request.user.pk)})
+
     @action(detail=True, methods=['post'])
     def mark_read(self, request, pk=None):
         notification = self.get_object()
-        notification.is_read = True
-        notification.save()
+        if Notification.objects.filter(pk=notification.pk, is_read=False).update(is_read=True):
+            adjust_unread({request.user.pk: -1})
         return Response({'message': 'Marked as read'})
 
     @action(detail=False, methods=['post'])
     def mark_all_read(self, request):
-        self.get_queryset().update(is_read=True)
+        self.get_queryset().filter(is_read=False).update(is_read=True)
+        reset_unread(request.user.pk)
         return Response({'message': 'All notifications marked as read'})
 
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def push_ticket(request):
+    """Ticket for opening the /api/push/ stream, valid for PUSH_TICKET_MAX_AGE seconds"""
+    return Response({'ticket': issue_ticket(request.user, request.auth['exp'])})
+
+
+# ----------------- EMI Quotes ----------------- #
+
+# Upper bound on quotes computed by a single batch request
+MAX_QUOTE_BATCH = 500
+
+# Quotes only depend on their inputs, so GET responses can be cached downstream
+QUOTE_CACHE_SECONDS = 24 * 60 * 60
+
+
+def _quote(data):
+    return quote_emi(data['principal'], data['rate'], data['tenure'])
+
+
+@api_view(['GET', 'POST'])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def emi_quote(request):
+    """
+    GET ?principal=&rate=&tenure= returns a single cacheable quote.
+    POST {"quotes": [{"principal", "rate", "tenure"}, ...]} returns a batch.
+    """
+    if request.method == 'GET':
+        serializer = EMIQuoteSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        response = Response(_quote(serializer.validated_data))
+        patch_cache_control(response, public=True, max_age=QUOTE_CACHE_SECONDS)
+        return response
+
+    quotes = request.data.get('quotes')
+    if not isinstance(quotes, list) or not quotes:
+        return Response({'error': 'quotes must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(quotes) > MAX_QUOTE_BATCH:
+        return Response({'error': f'At most {MAX_QUOTE_BATCH} quotes per request'},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    serializer = EMIQuoteSerializer(data=quotes, many=True)
+    serializer.is_valid(raise_exception=True)
+    return Response({'quotes': [_quote(item) for item in serializer.validated_data]})
+
+
 # ----------------- Dashboard Statistics ----------------- #
 
 @api_view(['GET'])
@@ -378,3 +579,38 @@ def dashboard_stats(request):
         }
 
     return Response(stats)
+
+
+# Longest cash-flow horizon served by the API
+MAX_PROJECTION_MONTHS = 120
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def cash_flow_projection(request):
+    """Expected monthly collections by month and installment status"""
+    if request.user.user_type not in ['finance_manager', 'admin']:
+        return Response({'error': 'Only finance managers can view cash-flow projections'}, status=403)
+
+    try:
+        months = int(request.query_params.get('months', 12))
+    except ValueError:
+        return Response({'error': 'months must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    if not 1 <= months <= MAX_PROJECTION_MONTHS:
+        return Response({'error': f'months must be between 1 and {MAX_PROJECTION_MONTHS}'},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    return Response(cached_cash_flow(months, refresh=request.query_params.get('refresh') == '1'))
+
+
+# ----------------- Metrics ----------------- #
+
+def metrics(request):
+    """
+    Prometheus text exposition of this worker's in-process metrics and the
+    latest snapshots published by the background workers
+    """
+    token = request.headers.get('X-Metrics-Token', '')
+    if not settings.METRICS_TOKEN or not constant_time_compare(token, settings.METRICS_TOKEN):
+        raise Http404
+    return HttpResponse(registry.render(recent_snapshots()), content_type='text/plain; version=0.0.4')
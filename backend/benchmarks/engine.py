@@ -0,0 +1,131 @@
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from ai_engine.credit_scorer import CreditScorer
+from ai_engine.fraud_detector import FraudDetector
+from api.models import LoanApplication
+from chatbot.bot_logic import VehicleFinanceChatbot
+from .synthetic import SyntheticBook
+
+
+def git_revision():
+    """Commit the numbers belong to, plus whether the tree had local changes"""
+    def git(*args):
+        return subprocess.run(['git', *args], cwd=settings.BASE_DIR, capture_output=True, text=True)
+    try:
+        commit = git('rev-parse', 'HEAD').stdout.strip() or None
+        dirty = git('status', '--porcelain', '--untracked-files=no').stdout.strip() != ''
+    except OSError:
+        return None, None
+    return commit, dirty
+
+
+def measure(func, items, repeat, batch_size=1):
+    """
+    Call func(item) for every item, `repeat` times over. The first pass
+    counts SQL queries and warms caches; timings come from the others.
+    """
+    with CaptureQueriesContext(connection) as queries:
+        for item in items:
+            func(item)
+
+    durations = []
+    for _ in range(repeat):
+        for item in items:
+            started = time.perf_counter()
+            func(item)
+            durations.append(time.perf_counter() - started)
+
+    durations.sort()
+    mean = statistics.fmean(durations)
+    return {
+        'calls': len(durations),
+        'batch_size': batch_size,
+        'mean_us': round(mean * 1e6, 2),
+        'p50_us': round(durations[len(durations) // 2] * 1e6, 2),
+        'p95_us': round(durations[int(len(durations) * 0.95)] * 1e6, 2),
+        'min_us': round(durations[0] * 1e6, 2),
+        'per_item_us': round(mean * 1e6 / batch_size, 2),
+        'items_per_sec': round(batch_size / mean, 1),
+        'queries_per_item': round(len(queries) / len(items) / batch_size, 2),
+    }
+
+
+def run_suite(applications=1000, db_applications=200, repeat=5, seed=42):
+    """
+    Time every engine entry point on a synthetic book.
+
+    In-memory benchmarks score unsaved objects, so they measure pure CPU.
+    DB-backed ones save a book inside a transaction that is rolled back
+    (document files go to a temporary MEDIA_ROOT) and load applications
+    the way the API does, so per-loan queries show up in queries_per_item.
+    """
+    book = SyntheticBook(seed)
+    scorer = CreditScorer()
+    detector = FraudDetector()
+    chatbot = VehicleFinanceChatbot()
+    results = {}
+
+    loans = book.applications(applications)
+    results['credit.extract_features'] = measure(scorer.extract_features, loans, repeat)
+    results['credit.score_application'] = measure(scorer.score_application, loans, repeat)
+    results['chatbot.get_response'] = measure(chatbot.get_response, book.messages(applications), repeat)
+
+    with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+        with transaction.atomic():
+            loan_ids = [loan.id for loan in book.create(db_applications)]
+
+            results['credit.score_application_db'] = measure(
+                lambda loan_id: scorer.score_application(LoanApplication.objects.get(id=loan_id)),
+                loan_ids, repeat,
+            )
+            results['credit.score_batch'] = measure(
+                lambda ids: scorer.score_batch(LoanApplication.objects.filter(id__in=ids)),
+                [loan_ids], repeat, batch_size=len(loan_ids),
+            )
+            results['fraud.comprehensive_fraud_check'] = measure(
+                lambda loan_id: detector.comprehensive_fraud_check(LoanApplication.objects.get(id=loan_id)),
+                loan_ids, repeat,
+            )
+            results['fraud.batch_fraud_check'] = measure(
+                lambda ids: detector.batch_fraud_check(LoanApplication.objects.filter(id__in=ids)),
+                [loan_ids], repeat, batch_size=len(loan_ids),
+            )
+            transaction.set_rollback(True)
+
+    commit, dirty = git_revision()
+    return {
+        'commit': commit,
+        'dirty': dirty,
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'database': connection.vendor,
+        'scorer_version': scorer.version,
+        'parameters': {
+            'applications': applications,
+            'db_applications': db_applications,
+            'repeat': repeat,
+            'seed': seed,
+        },
+        'results': results,
+    }
+
+
+def compare(previous, current):
+    """(name, previous mean, current mean, % change) for benchmarks present in both runs"""
+    rows = []
+    for name, result in current['results'].items():
+        before = previous.get('results', {}).get(name)
+        if before:
+            change = (result['per_item_us'] - before['per_item_us']) / before['per_item_us'] * 100
+            rows.append((name, before['per_item_us'], result['per_item_us'], change))
+    return rows
@@ -0,0 +1,148 @@
+import random
+import uuid
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.files.base import ContentFile
+
+from ai_engine.amortization import calculate_emi, to_money
+from api.document_metadata import extract_metadata
+from api.models import Document, LoanApplication, User, Vehicle
+
+
+EMPLOYMENT_TYPES = [
+    ('government', 0.2),
+    ('private_company', 0.35),
+    ('business_owner', 0.15),
+    ('self_employed', 0.15),
+    ('freelancer', 0.1),
+    ('other', 0.05),
+]
+
+VEHICLES = [
+    # (vehicle_type, brand, model, median price)
+    ('two_wheeler', 'Honda', 'Shine', 250000),
+    ('two_wheeler', 'Yamaha', 'FZ', 400000),
+    ('car', 'Suzuki', 'Swift', 3000000),
+    ('car', 'Hyundai', 'i20', 3800000),
+    ('suv', 'Mahindra', 'Scorpio', 6500000),
+    ('suv', 'Toyota', 'Fortuner', 12000000),
+    ('van', 'Tata', 'Winger', 4500000),
+    ('truck', 'Tata', 'LPT 1613', 7500000),
+]
+
+TENURES = [12, 24, 36, 48, 60, 72, 84, 96]
+
+MESSAGES = [
+    'Hello',
+    'What are the loan requirements?',
+    'What documents do I need?',
+    'Calculate EMI for 1000000 loan for 5 years',
+    'Calculate EMI for 10 lakh 60 months 12% interest',
+    'Show me vehicle types',
+    'What is the interest rate?',
+    'How long does approval take?',
+    'help',
+    'Can I prepay my loan without penalty?',
+]
+
+
+class SyntheticBook:
+    """
+    Seeded generator of realistic users, vehicles and applications.
+    Prices and incomes are log-normal around NPR market figures, down
+    payments 5-50% of the price; the same seed gives the same book.
+    """
+
+    def __init__(self, seed=42):
+        self.random = random.Random(seed)
+        # Unique per run so DB-backed objects never collide with real rows
+        self.token = uuid.UUID(int=self.random.getrandbits(128)).hex[:8]
+        self.sequence = 0
+
+    def next_sequence(self):
+        self.sequence += 1
+        return self.sequence
+
+    def user(self):
+        n = self.next_sequence()
+        age_days = int(self.random.uniform(21, 65) * 365.25)
+        return User(
+            username=f'bench-{self.token}-{n}',
+            email=f'bench-{self.token}-{n}@example.com',
+            phone=f'98{self.random.randint(10000000, 99999999)}',
+            user_type='customer',
+            date_of_birth=None if self.random.random() < 0.05 else date.today() - timedelta(days=age_days),
+            citizenship_number=f'{self.random.randint(10, 77)}-01-{self.random.randint(1000, 99999)}',
+        )
+
+    def vehicle(self):
+        vehicle_type, brand, model, median_price = self.random.choice(VEHICLES)
+        price = median_price * self.random.lognormvariate(0, 0.15)
+        return Vehicle(
+            name=f'{brand} {model}',
+            brand=brand,
+            model=model,
+            year=self.random.randint(2021, 2025),
+            vehicle_type=vehicle_type,
+            fuel_type=self.random.choice(['petrol', 'diesel', 'electric', 'hybrid']),
+            price=to_money(round(price, -3)),
+        )
+
+    def application(self, customer, vehicle):
+        price = float(vehicle.price)
+        down_payment = round(price * self.random.uniform(0.05, 0.5), -3)
+        loan_amount = price - down_payment
+        tenure = self.random.choice(TENURES)
+        income = round(self.random.lognormvariate(11.3, 0.6), -2)  # median ~80k per month
+        employment = self.random.choices(*zip(*EMPLOYMENT_TYPES))[0]
+
+        return LoanApplication(
+            application_number=f'B{self.token[:6]}{self.next_sequence():08d}'[:20],
+            customer=customer,
+            vehicle=vehicle,
+            loan_amount=to_money(loan_amount),
+            down_payment=to_money(down_payment),
+            interest_rate=Decimal('12.00'),
+            tenure_months=tenure,
+            monthly_emi=calculate_emi(loan_amount, 12, tenure),
+            monthly_income=to_money(income),
+            employment_type=employment,
+            status=self.random.choice(['submitted', 'under_review', 'approved', 'rejected']),
+        )
+
+    def applications(self, count, customers=None, vehicles=None):
+        """Unsaved applications with in-memory customers and vehicles (no queries to score)"""
+        customers = customers or [self.user() for _ in range(max(1, count // 3))]
+        vehicles = vehicles or [self.vehicle() for _ in range(max(1, min(count, 50)))]
+        return [
+            self.application(self.random.choice(customers), self.random.choice(vehicles))
+            for _ in range(count)
+        ]
+
+    def messages(self, count):
+        return [self.random.choice(MESSAGES) for _ in range(count)]
+
+    def create(self, count, documents_per_application=2):
+        """
+        Save a book of `count` applications with customers, vehicles and
+        small document files. Call inside a transaction that is rolled back.
+        """
+        customers = User.objects.bulk_create([self.user() for _ in range(max(1, count // 3))])
+        vehicles = Vehicle.objects.bulk_create([self.vehicle() for _ in range(max(1, min(count, 50)))])
+        applications = LoanApplication.objects.bulk_create(self.applications(count, customers, vehicles))
+
+        documents = []
+        for application in applications:
+            for document_type in ['citizenship', 'salary_slip'][:documents_per_application]:
+                document = Document(application=application, document_type=document_type)
+                size = self.random.choice([4000, 50000, 200000])
+                content = ContentFile(b'%PDF-1.4\n' + uuid.UUID(int=self.random.getrandbits(128)).bytes + b'0' * size)
+                document.file.save(f'{document_type}.pdf', content, save=False)
+                # bulk_create skips the pre_save signal that records upload metadata
+                for field, value in extract_metadata(content).items():
+                    setattr(document, field, value)
+                documents.append(document)
+        Document.objects.bulk_create(documents)
+
+        return applications
@@ -1,6 +1,8 @@
 import re
 from datetime import datetime, timedelta
 
+from ai_engine.amortization import quote_emi
+
 
 class VehicleFinanceChatbot:
     """
@@ -365,25 +367,15 @@ Or type "help" to see all available options!
     def calculate_emi(self, principal, rate, tenure):
         """Calculate EMI amount"""
         try:
-            P = float(principal)
-            R = float(rate) / (12 * 100)
-            N = int(tenure)
-            
-            if R == 0:
-                emi = P / N
-            else:
-                emi = P * R * (1 + R)**N / ((1 + R)**N - 1)
-            
-            total_payment = emi * N
-            total_interest = total_payment - P
+            quote = quote_emi(principal, rate, tenure)
             
             return {
-                'emi': round(emi, 2),
-                'total_payment': round(total_payment, 2),
-                'total_interest': round(total_interest, 2),
-                'principal': P,
+                'emi': float(quote['emi']),
+                'total_payment': float(quote['total_payment']),
+                'total_interest': float(quote['total_interest']),
+                'principal': float(principal),
                 'rate': rate,
-                'tenure': N
+                'tenure': quote['tenure']
             }
         except:
             return None
@@ -0,0 +1,9 @@
+# Gunicorn picks this file up automatically from the working directory
+
+
+def post_worker_init(worker):
+    """Load the credit model once per worker before it accepts requests"""
+    from ai_engine.model_registry import active_credit_model
+    model = active_credit_model()
+    if model is not None:
+        worker.log.info("Loaded credit model v%s", model.version)
@@ -13,4 +13,16 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'vehicle_finance.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported once Django is set up
+from api.push import push_application  # noqa: E402
+
+PUSH_PATH = '/api/push/'
+
+
+async def application(scope, receive, send):
+    """Django, except for the long-lived push streams which api.push serves directly"""
+    if scope['type'] == 'http' and scope['path'] == PUSH_PATH:
+        return await push_application(scope, receive, send)
+    return await django_application(scope, receive, send)
@@ -175,15 +175,137 @@ AUTH_USER_MODEL = 'api.User'
 # === File upload limits ===
 MAX_UPLOAD_SIZE = config('MAX_UPLOAD_SIZE', default=5242880, cast=int)  # 5MB default
 
-# Email
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
-EMAIL_HOST = 'smtp.gmail.com'   # or SendGrid SMTP
-EMAIL_PORT = 587
-EMAIL_USE_TLS = True
-EMAIL_HOST_USER = 'your_email@example.com'
-EMAIL_HOST_PASSWORD = 'your_email_password'
-
-# Twilio (SMS)
-TWILIO_ACCOUNT_SID = 'your_twilio_sid'
-TWILIO_AUTH_TOKEN = 'your_twilio_auth_token'
-TWILIO_PHONE_NUMBER = '+1234567890'
+# === Cache ===
+# Local memory by default; point CACHE_BACKEND/CACHE_LOCATION at a shared
+# backend (e.g. database or file based) to share cached data across workers.
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='vehicle-finance'),
+        'OPTIONS': {
+            'MAX_ENTRIES': config('CACHE_MAX_ENTRIES', default=10000, cast=int),
+        },
+    }
+}
+
+# LocMemCache is per process. Point CACHE_BACKEND at a shared cache (e.g.
+# django.core.cache.backends.redis.RedisCache) when running several
+# workers: per-loan score pointers and cached unread counts are only
+# trusted with a shared cache and fall back to slower lookups otherwise.
+
+# Seconds a computed credit score stays cached (entries are also evicted LRU)
+SCORE_CACHE_TTL = config('SCORE_CACHE_TTL', default=24 * 60 * 60, cast=int)
+
+# Seconds a user's cached unread notification count lives before it is
+# recounted (counts are only cached in a shared cache)
+UNREAD_COUNT_TTL = config('UNREAD_COUNT_TTL', default=300, cast=int)
+
+# Queue ai_score requests for `manage.py runscoringworker` instead of scoring in the request
+AI_SCORING_ASYNC = config('AI_SCORING_ASYNC', default=True, cast=bool)
+
+# Versioned rule table with CreditScorer thresholds and weights; edits are
+# picked up by running workers after at most CREDIT_RULES_RELOAD_SECONDS
+CREDIT_RULES_FILE = config('CREDIT_RULES_FILE', default=str(BASE_DIR / 'ai_engine' / 'rules' / 'credit_rules_v1.json'))
+CREDIT_RULES_RELOAD_SECONDS = config('CREDIT_RULES_RELOAD_SECONDS', default=5, cast=int)
+
+# Versioned credit model artifacts written by `manage.py traincreditmodel`
+MODEL_REGISTRY_DIR = config('MODEL_REGISTRY_DIR', default=str(BASE_DIR / 'model_registry'))
+# Serve the latest trained model from CreditScorer (rules are used without one)
+CREDIT_MODEL_ENABLED = config('CREDIT_MODEL_ENABLED', default=True, cast=bool)
+# Seconds between checks of the registry's LATEST pointer by running workers
+CREDIT_MODEL_RELOAD_SECONDS = config('CREDIT_MODEL_RELOAD_SECONDS', default=30, cast=int)
+
+# Shared secret for scraping /api/metrics/ (endpoint is disabled when empty)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+# Workers without an HTTP server (deliveroutbox) store their metrics in the
+# database this often; /api/metrics/ includes snapshots up to MAX_AGE old
+METRICS_SNAPSHOT_SECONDS = config('METRICS_SNAPSHOT_SECONDS', default=15, cast=int)
+METRICS_SNAPSHOT_MAX_AGE = config('METRICS_SNAPSHOT_MAX_AGE', default=300, cast=int)
+
+# === EMI schedules ===
+# 'lazy' computes schedules of non-disbursed loans on demand and only writes
+# emi_schedules rows at disbursal; 'eager' writes every row on submission.
+EMI_SCHEDULE_MODE = config('EMI_SCHEDULE_MODE', default='lazy')
+
+# === Velocity counters ===
+# Sliding-window event counts (applications, logins, uploads) per customer,
+# phone, citizenship number and IP read by the fraud checks. 'database' is
+# shared by all workers; 'memory' keeps them in each process.
+VELOCITY_BACKEND = config('VELOCITY_BACKEND', default='database')
+# Seconds between deletions of expired buckets
+VELOCITY_PRUNE_SECONDS = config('VELOCITY_PRUNE_SECONDS', default=300, cast=int)
+# Proxies in front of the app that append to X-Forwarded-For; the client IP
+# is the entry the outermost of them added. The default 0 uses REMOTE_ADDR and
+# ignores the header, which clients can forge. Behind one proxy (Heroku's
+# router, a single nginx or load balancer) set it to 1; behind a CDN in front
+# of a load balancer, 2. Too high a count lets clients choose their own IP.
+TRUSTED_PROXY_COUNT = config('TRUSTED_PROXY_COUNT', default=0, cast=int)
+
+# === Push ===
+# /api/push/ streams new notifications and loan status changes as
+# server-sent events when served over ASGI (vehicle_finance/asgi.py).
+# 'database' relays events through the push_events table so every worker
+# and management command (deliveroutbox, runscoringworker) reaches every
+# stream (one query per process per PUSH_POLL_INTERVAL); 'memory' only
+# delivers events published in the same process.
+PUSH_BROKER = config('PUSH_BROKER', default='database')
+PUSH_POLL_INTERVAL = config('PUSH_POLL_INTERVAL', default=1.0, cast=float)
+# Seconds a relayed event is kept in push_events
+PUSH_EVENT_TTL = config('PUSH_EVENT_TTL', default=300, cast=int)
+# Events are read again for this many seconds after they were created, so
+# rows that commit late (or come from a host whose clock is behind) are
+# still delivered; ids already delivered are skipped
+PUSH_COMMIT_WINDOW = config('PUSH_COMMIT_WINDOW', default=5, cast=int)
+# Seconds a process's record of its open streams outlives its last refresh;
+# events for users without an open stream anywhere are not written
+PUSH_LISTENER_TTL = config('PUSH_LISTENER_TTL', default=30, cast=int)
+# Idle streams get a comment line this often so proxies keep them open
+PUSH_HEARTBEAT_SECONDS = config('PUSH_HEARTBEAT_SECONDS', default=20, cast=int)
+# Events buffered per stream; a client that falls further behind is disconnected
+PUSH_QUEUE_SIZE = config('PUSH_QUEUE_SIZE', default=100, cast=int)
+# Seconds a ticket from /api/push/ticket/ can be used to open a stream (once)
+PUSH_TICKET_MAX_AGE = config('PUSH_TICKET_MAX_AGE', default=60, cast=int)
+
+# === Notifications ===
+# notify_user only queues messages; `manage.py deliveroutbox` sends them.
+# Point EMAIL_HOST/EMAIL_PORT and SMS_BACKEND='http' with SMS_HTTP_URL at
+# local stand-in servers to exercise delivery without real providers.
+EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.smtp.EmailBackend')
+EMAIL_HOST = config('EMAIL_HOST', default='smtp.gmail.com')   # or SendGrid SMTP
+EMAIL_PORT = config('EMAIL_PORT', default=587, cast=int)
+EMAIL_USE_TLS = config('EMAIL_USE_TLS', default=True, cast=bool)
+EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
+EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
+EMAIL_TIMEOUT = config('EMAIL_TIMEOUT', default=10, cast=float)
+DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default=EMAIL_HOST_USER or 'webmaster@localhost')
+
+# SMS: 'twilio', 'http' (POST JSON to SMS_HTTP_URL) or 'console' (log only)
+SMS_BACKEND = config('SMS_BACKEND', default='twilio')
+SMS_HTTP_URL = config('SMS_HTTP_URL', default='http://localhost:8025/sms')
+SMS_TIMEOUT = config('SMS_TIMEOUT', default=10, cast=float)
+TWILIO_ACCOUNT_SID = config('TWILIO_ACCOUNT_SID', default='')
+TWILIO_AUTH_TOKEN = config('TWILIO_AUTH_TOKEN', default='')
+TWILIO_PHONE_NUMBER = config('TWILIO_PHONE_NUMBER', default='')
+
+# Delivery attempts per message, and the first retry delay in seconds
+# (doubled on every further attempt, up to OUTBOX_MAX_BACKOFF)
+OUTBOX_MAX_ATTEMPTS = config('OUTBOX_MAX_ATTEMPTS', default=5, cast=int)
+OUTBOX_RETRY_DELAY = config('OUTBOX_RETRY_DELAY', default=30, cast=int)
+OUTBOX_MAX_BACKOFF = config('OUTBOX_MAX_BACKOFF', default=3600, cast=int)
+# Seconds a worker spends sending one batch before returning the rest to
+# the queue; keep it well below deliveroutbox --stale-after
+OUTBOX_BATCH_BUDGET = config('OUTBOX_BATCH_BUDGET', default=60, cast=int)
+
+# Emails and SMS for the same user raised within this many seconds of the
+# first one are sent together as a single message (0 sends each at once)
+NOTIFICATION_COALESCE_SECONDS = config('NOTIFICATION_COALESCE_SECONDS', default=120, cast=int)
+# Hold low-priority emails and SMS for one daily digest sent at this hour
+# (TIME_ZONE); in-app notifications always appear immediately
+NOTIFICATION_DIGEST = config('NOTIFICATION_DIGEST', default=False, cast=bool)
+NOTIFICATION_DIGEST_HOUR = config('NOTIFICATION_DIGEST_HOUR', default=9, cast=int)
+
+# Circuit breaker per provider: after this many consecutive failures the
+# worker stops calling it for PROVIDER_RESET_TIMEOUT seconds and defers its
+# messages, then lets one trial call through
+PROVIDER_FAILURE_THRESHOLD = config('PROVIDER_FAILURE_THRESHOLD', default=5, cast=int)
+PROVIDER_RESET_TIMEOUT = config('PROVIDER_RESET_TIMEOUT', default=60, cast=int)
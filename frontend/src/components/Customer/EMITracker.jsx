@@ -3,7 +3,7 @@ import { FaMoneyBillWave, FaCheckCircle, FaClock, FaExclamationTriangle } from '
 import toast from 'react-hot-toast';
 import Navbar from '../Shared/Navbar';
 import loanService from '../../services/loans';
-import { formatCurrency } from '../../utils/emiCalculator';
+import { formatCurrency } from '../../utils/format';
 
 const EMITracker = () => {
   const [emiSchedules, setEmiSchedules] = useState([]);
@@ -5,7 +5,8 @@ import toast from 'react-hot-toast';
 import Navbar from '../Shared/Navbar';
 import vehicleService from '../../services/vehicles';
 import loanService from '../../services/loans';
-import { calculateLoanDetails, formatCurrency } from '../../utils/emiCalculator';
+import emiService from '../../services/emi';
+import { formatCurrency } from '../../utils/format';
 import { EMPLOYMENT_TYPES } from '../../utils/constants';
 
 const LoanApplication = () => {
@@ -32,14 +33,35 @@ const LoanApplication = () => {
   }, []);
 
   useEffect(() => {
-    if (formData.loan_amount && formData.interest_rate && formData.tenure_months) {
-      const details = calculateLoanDetails(
-        formData.loan_amount,
-        formData.interest_rate,
-        formData.tenure_months
-      );
-      setEmiPreview(details);
-    }
+    if (!formData.loan_amount || !formData.interest_rate || !formData.tenure_months) return undefined;
+
+    // Quote from the server's EMI calculator once typing pauses
+    let cancelled = false;
+    const timer = setTimeout(async () => {
+      try {
+        const quote = await emiService.getQuote(
+          formData.loan_amount,
+          formData.interest_rate,
+          formData.tenure_months
+        );
+        if (cancelled) return;
+        setEmiPreview({
+          emi: parseFloat(quote.emi),
+          totalPayment: parseFloat(quote.total_payment),
+          totalInterest: parseFloat(quote.total_interest),
+          principal: parseFloat(quote.principal),
+          interestRate: parseFloat(quote.rate),
+          tenure: quote.tenure,
+        });
+      } catch (error) {
+        if (!cancelled) setEmiPreview(null);
+      }
+    }, 300);
+
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
   }, [formData.loan_amount, formData.interest_rate, formData.tenure_months]);
 
   const loadVehicles = async () => {
@@ -1,10 +1,14 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
 import { FaCheckCircle, FaTimesCircle, FaRobot, FaChartLine } from 'react-icons/fa';
 import toast from 'react-hot-toast';
 import Navbar from '../Shared/Navbar';
 import loanService from '../../services/loans';
 
+// Scoring runs on the scoring worker; poll its job until it finishes
+const SCORE_POLL_INTERVAL = 2000;
+const SCORE_POLL_ATTEMPTS = 60;
+
 const LoanApproval = () => {
   const { id } = useParams();
   const navigate = useNavigate();
@@ -14,11 +18,37 @@ const LoanApproval = () => {
   const [processing, setProcessing] = useState(false);
   const [rejectionReason, setRejectionReason] = useState('');
   const [showRejectModal, setShowRejectModal] = useState(false);
+  const [scoring, setScoring] = useState(false);
+  const scorePoll = useRef(null);
 
   useEffect(() => {
     loadApplication();
+    return () => clearTimeout(scorePoll.current);
   }, [id]);
 
+  const pollAIScore = (attempt = 0) => {
+    scorePoll.current = setTimeout(async () => {
+      try {
+        const scoreData = await loanService.getAIScoreStatus(id);
+        if (scoreData.status === 'completed') {
+          setAiScore(scoreData);
+          setScoring(false);
+        } else if (scoreData.status === 'failed') {
+          toast.error('AI scoring failed');
+          setScoring(false);
+        } else if (attempt + 1 < SCORE_POLL_ATTEMPTS) {
+          pollAIScore(attempt + 1);
+        } else {
+          toast.error('AI scoring is taking longer than expected');
+          setScoring(false);
+        }
+      } catch (error) {
+        toast.error('Failed to load AI score');
+        setScoring(false);
+      }
+    }, SCORE_POLL_INTERVAL);
+  };
+
   const loadApplication = async () => {
     try {
       const data = await loanService.getById(id);
@@ -27,7 +57,12 @@ const LoanApproval = () => {
       // Get AI score if not already calculated
       if (!data.credit_score) {
         const scoreData = await loanService.getAIScore(id);
-        setAiScore(scoreData);
+        if (scoreData.job_id && scoreData.status !== 'completed') {
+          setScoring(true);
+          pollAIScore();
+        } else {
+          setAiScore(scoreData);
+        }
       }
     } catch (error) {
       toast.error('Failed to load application');
@@ -83,6 +118,7 @@ const LoanApproval = () => {
 
   const creditScore = application.credit_score || aiScore?.credit_score || 0;
   const riskLevel = application.fraud_risk_level || aiScore?.risk_level || 'medium';
+  const recommendation = application.ai_recommendation || aiScore?.recommendation;
 
   return (
     <div className="min-h-screen bg-gray-100">
@@ -112,10 +148,11 @@ const LoanApproval = () => {
                     creditScore >= 750 ? 'text-green-600' :
                     creditScore >= 600 ? 'text-yellow-600' :
                     'text-red-600'}`}>
-                    {creditScore}
+                    {scoring ? '...' : creditScore}
                   </p>
                   <p className="text-xs text-gray-600 mt-2">
-                    {creditScore >= 750 ? 'Excellent' :
+                    {scoring ? 'Scoring in progress' :
+                     creditScore >= 750 ? 'Excellent' :
                      creditScore >= 600 ? 'Good' :
                      'Fair'}
                   </p>
@@ -136,11 +173,11 @@ const LoanApproval = () => {
                   </p>
                 </div>
 
-                {application.ai_recommendation && (
+                {recommendation && (
                   <div className="p-4 bg-gray-50 rounded-lg text-sm">
                     <p className="font-medium text-gray-700 mb-2">AI Recommendation:</p>
                     <p className="text-gray-600 whitespace-pre-wrap">
-                      {application.ai_recommendation}
+                      {recommendation}
                     </p>
                   </div>
                 )}
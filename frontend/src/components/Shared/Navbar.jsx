@@ -1,13 +1,53 @@
-import React, { useState } from 'react';
+import React, { useEffect, useState } from 'react';
 import { Link, useNavigate } from 'react-router-dom';
 import { FaCar, FaBell, FaUser, FaSignOutAlt, FaBars, FaTimes, FaChevronDown } from 'react-icons/fa';
 import authService from '../../services/auth';
+import notificationService from '../../services/notifications';
+
+// How often the bell polls the unread count when push is unavailable
+const UNREAD_POLL_INTERVAL = 30000;
+// Slow safety poll while streaming, in case an event is missed (e.g. a
+// notification published while the stream was reconnecting)
+const UNREAD_RESYNC_INTERVAL = 5 * 60 * 1000;
 
 const Navbar = () => {
   const navigate = useNavigate();
   const user = authService.getCurrentUser();
   const [isMenuOpen, setIsMenuOpen] = useState(false);
   const [isProfileOpen, setIsProfileOpen] = useState(false);
+  const [unreadCount, setUnreadCount] = useState(0);
+
+  useEffect(() => {
+    if (!user) return undefined;
+
+    const loadUnreadCount = async () => {
+      try {
+        setUnreadCount(await notificationService.getUnreadCount());
+      } catch (error) {
+        console.error('Error loading unread notifications:', error);
+      }
+    };
+
+    // New notifications are pushed; poll often only if the stream is refused
+    let interval = setInterval(loadUnreadCount, UNREAD_RESYNC_INTERVAL);
+    let polling = false;
+    const unsubscribe = notificationService.subscribe({
+      onOpen: loadUnreadCount,
+      onNotification: () => setUnreadCount((count) => count + 1),
+      onClosed: () => {
+        if (polling) return;
+        polling = true;
+        clearInterval(interval);
+        loadUnreadCount();
+        interval = setInterval(loadUnreadCount, UNREAD_POLL_INTERVAL);
+      },
+    });
+
+    return () => {
+      unsubscribe();
+      clearInterval(interval);
+    };
+  }, [user?.id]);
 
   const handleLogout = () => {
     authService.logout();
@@ -66,7 +106,9 @@ const Navbar = () => {
             {/* Notifications */}
             <button className="relative p-2 text-gray-700 hover:bg-gray-100 rounded-lg transition-all">
               <FaBell className="text-xl" />
-              <span className="absolute top-1 right-1 w-2 h-2 bg-red-500 rounded-full animate-pulse"></span>
+              {unreadCount > 0 && (
+                <span className="absolute top-1 right-1 w-2 h-2 bg-red-500 rounded-full animate-pulse"></span>
+              )}
             </button>
 
             {/* Profile Dropdown */}
@@ -0,0 +1,19 @@
+import api from './api';
+
+const emiService = {
+  // Get a single EMI quote (cacheable GET)
+  getQuote: async (principal, rate, tenure) => {
+    const response = await api.get('/emi/quote/', {
+      params: { principal, rate, tenure }
+    });
+    return response.data;
+  },
+
+  // Get quotes for many (principal, rate, tenure) combinations at once
+  getQuotes: async (quotes) => {
+    const response = await api.post('/emi/quote/', { quotes });
+    return response.data.quotes;
+  },
+};
+
+export default emiService;
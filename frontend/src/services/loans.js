@@ -46,12 +46,18 @@ const loanService = {
     return response.data;
   },
 
-  // Get AI score
+  // Request AI scoring (202 with a job id while scoring runs in the background)
   getAIScore: async (id) => {
     const response = await api.post(`/loans/${id}/ai_score/`);
     return response.data;
   },
 
+  // Get AI scoring status and the latest scores
+  getAIScoreStatus: async (id) => {
+    const response = await api.get(`/loans/${id}/ai_score/`);
+    return response.data;
+  },
+
   // Approve loan (Finance Manager)
   approve: async (id) => {
     const response = await api.post(`/loans/${id}/approve/`);
@@ -64,6 +70,18 @@ const loanService = {
     return response.data;
   },
 
+  // Simulate a prepayment (omit strategy to compare reduce_emi and reduce_tenure)
+  simulatePrepayment: async (id, amount, month, strategy) => {
+    const response = await api.post(`/loans/${id}/prepayment/`, { amount, month, strategy });
+    return response.data;
+  },
+
+  // Simulate many prepayment scenarios in one call
+  simulatePrepayments: async (id, scenarios, strategy) => {
+    const response = await api.post(`/loans/${id}/prepayment/`, { scenarios, strategy });
+    return response.data;
+  },
+
   // Get EMI schedules
   getEMISchedules: async (applicationId) => {
     const response = await api.get('/emi-schedules/', {
@@ -7,6 +7,67 @@ const notificationService = {
     return response.data;
   },
 
+  // Get the number of unread notifications (cached on the server, cheap to poll)
+  getUnreadCount: async () => {
+    const response = await api.get('/notifications/unread_count/');
+    return response.data.unread_count;
+  },
+
+  // Stream new notifications and loan status changes as they happen.
+  // handlers: { onNotification, onLoanStatus, onOpen, onClosed }. Returns a function that stops the stream.
+  subscribe: ({ onNotification, onLoanStatus, onOpen, onClosed } = {}) => {
+    let source = null;
+    let stopped = false;
+
+    // EventSource cannot send the Authorization header, so each connection
+    // is opened with a short-lived ticket fetched through the API client
+    const connect = async () => {
+      let ticket;
+      try {
+        const response = await api.post('/push/ticket/');
+        ticket = response.data.ticket;
+      } catch (error) {
+        if (onClosed) onClosed();
+        return;
+      }
+      if (stopped) return;
+
+      let opened = false;
+      const stream = new EventSource(`${api.defaults.baseURL}/push/?ticket=${encodeURIComponent(ticket)}`);
+      source = stream;
+
+      stream.addEventListener('open', (event) => {
+        opened = true;
+        if (onOpen) onOpen(event);
+      });
+      if (onNotification) {
+        stream.addEventListener('notification', (event) => onNotification(JSON.parse(event.data)));
+      }
+      if (onLoanStatus) {
+        stream.addEventListener('loan_status', (event) => onLoanStatus(JSON.parse(event.data)));
+      }
+      // EventSource reconnects by itself with the same ticket, which the
+      // server refuses since tickets are single-use (and streams end when the
+      // access token expires): fetch a new ticket then, but give up if this
+      // one never opened a stream
+      stream.addEventListener('error', () => {
+        if (stream.readyState !== EventSource.CLOSED || stopped) return;
+        if (opened) {
+          connect();
+        } else if (onClosed) {
+          onClosed();
+        }
+      });
+    };
+
+    connect();
+
+    return () => {
+      stopped = true;
+      if (source) source.close();
+    };
+  },
+
   // Mark notification as read
   markAsRead: async (id) => {
     const response = await api.post(`/notifications/${id}/mark_read/`);
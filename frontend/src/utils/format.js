@@ -0,0 +1,12 @@
+export const formatCurrency = (amount) => {
+  return new Intl.NumberFormat('en-NP', {
+    style: 'currency',
+    currency: 'NPR',
+    minimumFractionDigits: 0,
+    maximumFractionDigits: 0,
+  }).format(amount);
+};
+
+export const formatNumber = (number) => {
+  return new Intl.NumberFormat('en-NP').format(number);
+};